@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class BlobstoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'blobstore'
+
+    def ready(self):
+        from .signals import connect_variant_signals
+        connect_variant_signals()
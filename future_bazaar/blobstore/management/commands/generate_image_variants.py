@@ -0,0 +1,59 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from django.core.management.base import BaseCommand
+
+from blobstore.variants import (
+    generate_variants, get_executor, iter_stored_blobs, public_sources, shutdown_executor, variant_formats,
+    variant_sizes,
+)
+
+
+class Command(BaseCommand):
+    help = "Generate the resized image variants of blobs already in the blob store."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source', action='append', choices=public_sources(),
+            help="Only process images of this column (repeatable). Defaults to all public image columns.",
+        )
+        parser.add_argument('--force', action='store_true', help="Regenerate variants that already exist.")
+        parser.add_argument(
+            '--max-pending', type=int, default=64,
+            help="Images queued in the process pool at once, bounding memory use.",
+        )
+
+    def handle(self, *args, **options):
+        executor = get_executor()
+        started = time.monotonic()
+        images = written = failed = 0
+        pending = set()
+
+        def collect(done):
+            nonlocal written, failed
+            for future in done:
+                try:
+                    written += future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"{future.blob_name}: {e}")
+
+        try:
+            for name in iter_stored_blobs(options['source'] or public_sources()):
+                if len(pending) >= options['max_pending']:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                future = executor.submit(generate_variants, name, options['force'])
+                future.blob_name = name
+                pending.add(future)
+                images += 1
+            collect(wait(pending).done)
+        finally:
+            shutdown_executor()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {images} images ({len(variant_sizes())} sizes x {len(variant_formats())} formats): "
+            f"wrote {written} variants, {failed} failed, in {elapsed:.1f}s "
+            f"({images / elapsed if elapsed else 0:.1f} images/s)"
+        ))
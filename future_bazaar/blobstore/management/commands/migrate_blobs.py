@@ -0,0 +1,74 @@
+import time
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from blobstore.registry import BLOB_SOURCES, get_source_model
+from blobstore.storage import get_blob_storage
+
+
+class Command(BaseCommand):
+    help = "Move images stored inline in BinaryField columns into the blob store, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source', action='append', choices=sorted(BLOB_SOURCES),
+            help="Only migrate this image column (repeatable). Defaults to all of them.",
+        )
+        parser.add_argument('--batch-size', type=int, default=100, help="Rows loaded and committed per batch.")
+        parser.add_argument(
+            '--keep-legacy', action='store_true',
+            help="Copy the bytes without clearing the BinaryField columns.",
+        )
+        parser.add_argument(
+            '--vacuum', action='store_true',
+            help="Run VACUUM afterwards so SQLite returns the freed pages to the filesystem.",
+        )
+
+    def handle(self, *args, **options):
+        storage = get_blob_storage()
+        for name in options['source'] or sorted(BLOB_SOURCES):
+            started = time.monotonic()
+            moved, size = self.migrate_source(storage, BLOB_SOURCES[name], options['batch_size'], options['keep_legacy'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: moved {moved} images ({size / 1024 / 1024:.1f} MiB) in {time.monotonic() - started:.1f}s"
+            ))
+
+        if options['vacuum'] and connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM')
+            self.stdout.write("Database vacuumed.")
+
+    def migrate_source(self, storage, source, batch_size: int, keep_legacy: bool):
+        model = get_source_model(source)
+        pending = model._base_manager.filter(**{
+            f'{source.legacy_field}__isnull': False,
+            source.file_field: '',
+        }).order_by('pk')
+
+        moved = size = 0
+        last_pk = None
+        while True:
+            # Keyset over the primary key so each batch is a bounded index range
+            batch = pending if last_pk is None else pending.filter(pk__gt=last_pk)
+            rows = list(batch.values_list('pk', source.legacy_field)[:batch_size])
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+
+            stored = []
+            for pk, data in rows:
+                if data:
+                    stored.append((pk, storage.save(None, ContentFile(bytes(data)))))
+                    size += len(data)
+
+            with transaction.atomic():
+                for pk, name in stored:
+                    values = {source.file_field: name}
+                    if not keep_legacy:
+                        values[source.legacy_field] = None
+                    # Skip rows that got a new upload in the meantime
+                    model._base_manager.filter(pk=pk, **{source.file_field: ''}).update(**values)
+            moved += len(stored)
+        return moved, size
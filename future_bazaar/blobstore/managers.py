@@ -0,0 +1,50 @@
+from typing import List
+
+from django.db import models
+from django.db.models import BooleanField, ExpressionWrapper, Q
+
+
+def blob_field_names(model) -> List[str]:
+    """Names of the binary (inline image) columns of a model."""
+    return [field.attname for field in model._meta.concrete_fields if isinstance(field, models.BinaryField)]
+
+
+def blob_flag_name(field_name: str) -> str:
+    """Annotation telling whether a deferred binary column holds bytes, e.g. has_banner_image."""
+    return f'has_{field_name}'
+
+
+def blob_flag(field_name: str) -> ExpressionWrapper:
+    # Computed by the database, without reading the bytes
+    return ExpressionWrapper(Q(**{f'{field_name}__isnull': False}), output_field=BooleanField())
+
+
+class BlobDeferringQuerySet(models.QuerySet):
+    def with_blobs(self):
+        """
+        Load the binary columns as well. Clears every deferred field, so call
+        it before any defer()/only() of your own.
+        """
+        return self.defer(None)
+
+
+class BlobDeferringManagerMixin:
+    """
+    Manager mixin whose querysets defer the model's binary columns, so list
+    and lookup queries never pull inline image bytes. Each row is annotated
+    with has_<column> instead, so callers can tell whether there is an
+    image without loading it. Reading a deferred column on an instance
+    still works, at the cost of one query; use with_blobs() when the bytes
+    of many rows are needed.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        blob_fields = blob_field_names(self.model)
+        if not blob_fields:
+            return queryset
+        return queryset.defer(*blob_fields).annotate(**{blob_flag_name(name): blob_flag(name) for name in blob_fields})
+
+
+class BlobDeferringManager(BlobDeferringManagerMixin, models.Manager.from_queryset(BlobDeferringQuerySet)):
+    pass
@@ -0,0 +1,22 @@
+from collections import namedtuple
+
+from django.apps import apps
+
+
+# model: app label and model name, legacy_field: BinaryField still holding
+# not yet migrated bytes, file_field: FileField pointing into the blob store,
+# public: whether the image may be served by row id (otherwise only by digest)
+BlobSource = namedtuple('BlobSource', ['model', 'legacy_field', 'file_field', 'public'], defaults=(True,))
+
+BLOB_SOURCES = {
+    'category-image': BlobSource('product.Category', 'image', 'image_file'),
+    'product-banner': BlobSource('product.Product', 'banner_image', 'banner_image_file'),
+    'product-image': BlobSource('product.ProductImage', 'image', 'image_file'),
+    'hero-banner': BlobSource('product.HeroSection', 'banner_image', 'banner_image_file'),
+    'seller-shop-photo': BlobSource('user.Seller', 'shop_photo', 'shop_photo_file'),
+    'user-profile-photo': BlobSource('user.UserModel', 'profile_photo', 'profile_photo_file', public=False),
+}
+
+
+def get_source_model(source: BlobSource):
+    return apps.get_model(source.model)
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from .registry import BLOB_SOURCES, get_source_model
+from .variants import has_variants, schedule_variants
+
+
+def _make_variants_receiver(file_field: str):
+    def queue_image_variants(sender, instance, update_fields=None, raw=False, **kwargs) -> None:
+        """Generate resized variants of a newly stored image once the save is committed."""
+        if raw or (update_fields is not None and file_field not in update_fields):
+            return
+        name = getattr(instance, file_field).name
+        if name and not has_variants(name):
+            transaction.on_commit(lambda: schedule_variants(name))
+    return queue_image_variants
+
+
+def connect_variant_signals() -> None:
+    for source_name, source in BLOB_SOURCES.items():
+        if source.public:
+            post_save.connect(
+                _make_variants_receiver(source.file_field),
+                sender=get_source_model(source),
+                dispatch_uid=f'blobstore-variants-{source_name}',
+                weak=False,
+            )
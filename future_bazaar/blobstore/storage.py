@@ -0,0 +1,94 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, storages
+
+
+class ContentAddressedStorageMixin:
+    """
+    Storage mixin that names every file after the SHA-256 of its content.
+
+    Uploads are streamed in chunks to a temporary file while hashing, so they
+    are never held in memory, and identical content is only stored once.
+    The name passed to save() is ignored.
+    """
+    chunk_size = 64 * 1024
+
+    def blob_name(self, digest: str) -> str:
+        return f"{digest[:2]}/{digest[2:4]}/{digest}"
+
+    def get_temp_dir(self):
+        return None
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+
+        digest = hashlib.sha256()
+        temp_path = self._write_temp_file(content, digest)
+        name = self.blob_name(digest.hexdigest())
+        try:
+            if not self.exists(name):
+                self.store_temp_file(name, temp_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return name
+
+    def save_derived(self, name: str, content) -> str:
+        """
+        Store content computed from a blob (e.g. a resized variant) under the
+        exact, deterministic `name`, replacing any previous file atomically.
+        """
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        temp_path = self._write_temp_file(content)
+        try:
+            self.store_temp_file(name, temp_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return name
+
+    def _write_temp_file(self, content, digest=None) -> str:
+        temp_dir = self.get_temp_dir()
+        if temp_dir:
+            os.makedirs(temp_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=temp_dir, delete=False) as temp_file:
+            for chunk in content.chunks(self.chunk_size):
+                if digest is not None:
+                    digest.update(chunk)
+                temp_file.write(chunk)
+        return temp_file.name
+
+    def store_temp_file(self, name: str, temp_path: str) -> None:
+        """Move a fully written temporary file to `name`."""
+        if self.exists(name):
+            self.delete(name)
+        with open(temp_path, 'rb') as temp_file:
+            self._save(name, File(temp_file, name))
+
+
+class ContentAddressedFileSystemStorage(ContentAddressedStorageMixin, FileSystemStorage):
+    """Local filesystem backend of the content-addressed blob store."""
+
+    def get_temp_dir(self):
+        # Same filesystem as the blobs, so storing is an atomic rename
+        return os.path.join(self.location, 'tmp')
+
+    def store_temp_file(self, name: str, temp_path: str) -> None:
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(temp_path, self.file_permissions_mode)
+        # Identical content may be stored concurrently; replacing is harmless
+        os.replace(temp_path, full_path)
+
+
+def get_blob_storage():
+    """Return the storage configured as STORAGES['blobs']."""
+    return storages['blobs']
@@ -0,0 +1,82 @@
+from concurrent.futures import Future
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from user.tests import TemporaryBlobStorageMixin
+from . import variants
+from .storage import get_blob_storage
+from .utils import stored_blob_url
+
+
+class BlobRangeTests(TemporaryBlobStorageMixin, TestCase):
+    CONTENT = b'0123456789'
+
+    def setUp(self):
+        self.url = stored_blob_url(get_blob_storage().save(None, ContentFile(self.CONTENT, 'digits.txt')))
+
+    def get(self, byte_range: str):
+        response = self.client.get(self.url, HTTP_RANGE=byte_range)
+        return response.status_code, b''.join(response.streaming_content) if response.streaming else b''
+
+    def test_satisfiable_ranges(self):
+        self.assertEqual(self.get('bytes=2-4'), (206, b'234'))
+        self.assertEqual(self.get('bytes=7-'), (206, b'789'))
+        self.assertEqual(self.get('bytes=-2'), (206, b'89'))
+        self.assertEqual(self.get('bytes=8-100'), (206, b'89'))
+
+    def test_range_ending_before_it_starts_is_ignored(self):
+        self.assertEqual(self.get('bytes=5-2'), (200, self.CONTENT))
+
+    def test_range_past_the_end_is_unsatisfiable(self):
+        self.assertEqual(self.get('bytes=10-')[0], 416)
+        self.assertEqual(self.get('bytes=20-30')[0], 416)
+
+
+class FutureExecutor:
+    """Hands out futures the test completes itself, or completed ones with `finish`."""
+
+    def __init__(self, finish: bool = False):
+        self.finish = finish
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        if self.finish:
+            future.set_result(None)
+        self.futures.append(future)
+        return future
+
+
+@override_settings(BLOB_VARIANTS_ENABLED=True)
+class ScheduleVariantsTests(SimpleTestCase):
+    BLOB = 'a' * 64
+
+    def schedule(self, executor: FutureExecutor, **kwargs):
+        with mock.patch.object(variants, 'get_executor', return_value=executor):
+            return variants.schedule_variants(self.BLOB, **kwargs)
+
+    def setUp(self):
+        patcher = mock.patch.dict(variants._pending, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_in_flight_blob_is_queued_once_unless_forced(self):
+        executor = FutureExecutor()
+        first = self.schedule(executor)
+        self.assertIs(self.schedule(executor), first)
+
+        forced = self.schedule(executor, force=True)
+        self.assertIsNot(forced, first)
+        first.set_result(None)  # Finishing the replaced run keeps the forced one registered
+        self.assertIs(self.schedule(executor), forced)
+        forced.set_result(None)
+        self.assertEqual(variants._pending, {})
+
+    def test_finished_run_leaves_no_entry_behind(self):
+        executor = FutureExecutor(finish=True)
+        self.schedule(executor)
+        self.schedule(executor)
+        self.assertEqual(len(executor.futures), 2)
+        self.assertEqual(variants._pending, {})
@@ -0,0 +1,11 @@
+from django.urls import path, re_path
+from .views import serve_blob, serve_blob_variant, serve_source_image
+
+urlpatterns = [
+    re_path(r'^(?P<digest>[0-9a-f]{64})/$', serve_blob, name='serve_blob'),
+    re_path(
+        r'^(?P<digest>[0-9a-f]{64})/variants/(?P<size>[0-9]+)\.(?P<fmt>[a-z]+)$',
+        serve_blob_variant, name='serve_blob_variant',
+    ),
+    path('<slug:source_name>/<int:pk>/', serve_source_image, name='serve_source_image'),
+]
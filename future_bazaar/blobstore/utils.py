@@ -0,0 +1,63 @@
+import os
+from typing import Optional
+
+from django.urls import reverse
+
+from .managers import blob_flag_name
+from .registry import BLOB_SOURCES
+
+
+def read_blob(instance, legacy_field: str, file_field: str) -> Optional[bytes]:
+    """
+    Return the bytes of an image, from the blob store when the row has been
+    migrated and from the legacy BinaryField otherwise.
+    """
+    stored_file = getattr(instance, file_field)
+    if stored_file:
+        with stored_file.open('rb') as blob:
+            return blob.read()
+    legacy = getattr(instance, legacy_field)
+    return bytes(legacy) if legacy else None
+
+
+def guess_image_type(header: bytes) -> str:
+    """Guess the content type of an image from its first bytes."""
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def blob_url(instance, source_name: str) -> Optional[str]:
+    """
+    Return the URL an image is served from: the immutable content-addressed
+    URL once it is in the blob store, the per-row URL while it still lives in
+    the legacy column, and None when there is no image.
+    """
+    source = BLOB_SOURCES[source_name]
+    stored_file = getattr(instance, source.file_field)
+    if stored_file:
+        return stored_blob_url(stored_file.name)
+    if source.legacy_field in instance.__dict__:
+        has_legacy = bool(instance.__dict__[source.legacy_field])
+    else:
+        # Deferred: the manager's has_<column> annotation tells, without loading the bytes
+        has_legacy = instance.__dict__.get(blob_flag_name(source.legacy_field), True)
+    if not source.public or not has_legacy:
+        return None
+    return source_image_url(source_name, instance.pk)
+
+
+def stored_blob_url(name: str) -> str:
+    """URL of a blob by its storage name, for callers holding column values rather than instances."""
+    return reverse('serve_blob', kwargs={'digest': os.path.basename(name)})
+
+
+def source_image_url(source_name: str, pk) -> str:
+    """URL of the image of one row, served from wherever it is stored."""
+    return reverse('serve_source_image', kwargs={'source_name': source_name, 'pk': pk})
@@ -0,0 +1,185 @@
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.urls import reverse
+from PIL import Image, ImageOps
+
+from .registry import BLOB_SOURCES, get_source_model
+from .storage import get_blob_storage
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VARIANT_SIZES = (64, 256, 1024)
+DEFAULT_VARIANT_FORMATS = ('webp', 'jpeg')
+VARIANT_CONTENT_TYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.RLock()  # Also held around get_executor() by schedule_variants
+_pending: Dict[str, Future] = {}  # digest -> generation in progress
+
+
+def variant_sizes() -> Tuple[int, ...]:
+    return tuple(getattr(settings, 'BLOB_VARIANT_SIZES', DEFAULT_VARIANT_SIZES))
+
+
+def variant_formats() -> Tuple[str, ...]:
+    return tuple(getattr(settings, 'BLOB_VARIANT_FORMATS', DEFAULT_VARIANT_FORMATS))
+
+
+def variant_name(digest: str, size: int, fmt: str) -> str:
+    """Deterministic storage name of one variant of a blob."""
+    return f"derived/{digest[:2]}/{digest}/{size}.{fmt}"
+
+
+def variant_urls(instance, source_name: str) -> Optional[Dict[str, Dict[str, str]]]:
+    """
+    Return {size: {format: url}} for the resized variants of an image, or None
+    while the image is not in the blob store yet.
+
+    The URLs are valid before the variants exist: until the background job
+    has produced them they redirect to the original image.
+    """
+    stored_file = getattr(instance, BLOB_SOURCES[source_name].file_field)
+    if not stored_file:
+        return None
+    digest = os.path.basename(stored_file.name)
+    return {
+        str(size): {
+            fmt: reverse('serve_blob_variant', kwargs={'digest': digest, 'size': size, 'fmt': fmt})
+            for fmt in variant_formats()
+        }
+        for size in variant_sizes()
+    }
+
+
+def _render(image, size: int, fmt: str) -> bytes:
+    variant = image.copy()
+    variant.thumbnail((size, size), Image.LANCZOS)
+    output = io.BytesIO()
+    quality = getattr(settings, 'BLOB_VARIANT_QUALITY', 80)
+    if fmt == 'jpeg':
+        if variant.mode != 'RGB':
+            # JPEG has no alpha channel: flatten onto white
+            rgba = variant.convert('RGBA')
+            variant = Image.new('RGB', rgba.size, (255, 255, 255))
+            variant.paste(rgba, mask=rgba.getchannel('A'))
+        variant.save(output, 'JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        if variant.mode not in ('RGB', 'RGBA'):
+            variant = variant.convert('RGBA')
+        variant.save(output, 'WEBP', quality=quality, method=4)
+    return output.getvalue()
+
+
+def generate_variants(blob_name: str, force: bool = False) -> int:
+    """
+    Produce every configured variant of a stored blob. Runs inside the worker
+    processes; returns the number of files written.
+    """
+    storage = get_blob_storage()
+    digest = os.path.basename(blob_name)
+    missing = [
+        (size, fmt) for size in variant_sizes() for fmt in variant_formats()
+        if force or not storage.exists(variant_name(digest, size, fmt))
+    ]
+    if not missing or not storage.exists(blob_name):
+        return 0
+
+    with storage.open(blob_name, 'rb') as blob:
+        image = Image.open(blob)
+        image.draft('RGB', (max(size for size, _ in missing),) * 2)  # Cheap JPEG downscale on decode
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    for size, fmt in missing:
+        storage.save_derived(variant_name(digest, size, fmt), ContentFile(_render(image, size, fmt)))
+    return len(missing)
+
+
+def _init_worker() -> None:
+    # Spawned workers start from a fresh interpreter
+    import django
+    django.setup()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Return the process pool image variants are generated in."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'BLOB_VARIANT_WORKERS', None) or os.cpu_count(),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+    return _executor
+
+
+def shutdown_executor(wait: bool = True) -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
+
+
+def _done(digest: str, future: Future) -> None:
+    with _executor_lock:
+        if _pending.get(digest) is future:  # Not a forced run that replaced it
+            del _pending[digest]
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.error(f"Failed to generate variants of {digest}: {error}")
+
+
+def has_variants(blob_name: str) -> bool:
+    """Whether the last variant generate_variants() writes for a blob exists."""
+    digest = os.path.basename(blob_name)
+    return get_blob_storage().exists(variant_name(digest, variant_sizes()[-1], variant_formats()[-1]))
+
+
+def schedule_variants(blob_name: str, force: bool = False) -> Optional[Future]:
+    """
+    Queue variant generation for a stored blob without blocking the caller.
+    A blob already being processed is not queued twice, unless `force`.
+    """
+    if not blob_name or not getattr(settings, 'BLOB_VARIANTS_ENABLED', True):
+        return None
+    digest = os.path.basename(blob_name)
+    with _executor_lock:
+        if digest in _pending and not force:
+            return _pending[digest]
+        future = get_executor().submit(generate_variants, blob_name, force)
+        _pending[digest] = future
+    # Outside the lock: a future done already runs the callback right here
+    future.add_done_callback(lambda f: _done(digest, f))
+    return future
+
+
+def iter_stored_blobs(source_names: Iterable[str]) -> Iterable[str]:
+    """Yield the distinct blob names referenced by the given image columns."""
+    seen = set()
+    for source_name in source_names:
+        source = BLOB_SOURCES[source_name]
+        names = (
+            get_source_model(source)._base_manager.exclude(**{source.file_field: ''})
+            .values_list(source.file_field, flat=True).order_by(source.file_field).distinct()
+        )
+        for name in names.iterator():
+            if name not in seen:
+                seen.add(name)
+                yield name
+
+
+def public_sources() -> List[str]:
+    return sorted(name for name, source in BLOB_SOURCES.items() if source.public)
@@ -0,0 +1,198 @@
+import hashlib
+import os
+import re
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from .registry import BLOB_SOURCES, get_source_model
+from .storage import get_blob_storage
+from .utils import guess_image_type
+from .variants import variant_formats, variant_name, variant_sizes
+
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Per-row URLs change content when the image is replaced, so clients revalidate
+MUTABLE_CACHE_CONTROL = 'public, max-age=0, must-revalidate'
+STREAM_CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _parse_range(request, size: int, etag: str) -> Tuple[Optional[Tuple[int, int]], bool]:
+    """
+    Parse a single-range Range header.
+
+    Returns ((start, end), satisfiable); (None, True) means serve the whole
+    body. Multiple ranges and stale If-Range validators fall back to the
+    whole body.
+    """
+    header = request.headers.get('Range')
+    if not header or request.headers.get('If-Range', etag) != etag:
+        return None, True
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None, True
+
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return None, False
+        start, end = max(size - length, 0), size - 1
+    else:
+        start = int(first)
+        if last and int(last) < start:
+            # Syntactically invalid (RFC 7233 2.1): ignore the header
+            return None, True
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return None, False
+    return (start, end), True
+
+
+def _stream(blob, start: int, length: int):
+    try:
+        blob.seek(start)
+        while length > 0:
+            chunk = blob.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        blob.close()
+
+
+def _finish(response, etag: str, last_modified: Optional[float], cache_control: str, content_type: Optional[str]):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control
+    if content_type:
+        response['Content-Type'] = content_type
+    response['Accept-Ranges'] = 'bytes'
+    response['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+
+def _stored_blob_response(request, name: str, cache_control: str, etag: Optional[str] = None):
+    storage = get_blob_storage()
+    if not name or not storage.exists(name):
+        raise Http404("Image not found.")
+
+    etag = quote_etag(etag or os.path.basename(name))
+    last_modified = storage.get_modified_time(name).timestamp()
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return _finish(not_modified, etag, last_modified, cache_control, None)
+
+    blob = storage.open(name, 'rb')
+    content_type = guess_image_type(blob.read(12))
+
+    sendfile_mode = getattr(settings, 'BLOB_SENDFILE_MODE', None)
+    if sendfile_mode:
+        # The front proxy serves the bytes (and handles Range) itself
+        blob.close()
+        response = HttpResponse()
+        if sendfile_mode == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = getattr(settings, 'BLOB_ACCEL_REDIRECT_PREFIX', '/protected-blobs/') + name
+        else:
+            response['X-Sendfile'] = storage.path(name)
+        return _finish(response, etag, last_modified, cache_control, content_type)
+
+    size = storage.size(name)
+    byte_range, satisfiable = _parse_range(request, size, etag)
+    if not satisfiable:
+        blob.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return _finish(response, etag, last_modified, cache_control, content_type)
+
+    start, end = byte_range or (0, size - 1)
+    response = StreamingHttpResponse(_stream(blob, start, end - start + 1), status=206 if byte_range else 200)
+    response['Content-Length'] = str(end - start + 1)
+    if byte_range:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return _finish(response, etag, last_modified, cache_control, content_type)
+
+
+def _bytes_response(request, data: bytes, cache_control: str):
+    etag = quote_etag(hashlib.sha256(data).hexdigest())
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return _finish(not_modified, etag, None, cache_control, None)
+
+    content_type = guess_image_type(data[:12])
+    byte_range, satisfiable = _parse_range(request, len(data), etag)
+    if not satisfiable:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{len(data)}'
+        return _finish(response, etag, None, cache_control, content_type)
+    if byte_range:
+        start, end = byte_range
+        response = HttpResponse(data[start:end + 1], status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{len(data)}'
+    else:
+        response = HttpResponse(data)
+    return _finish(response, etag, None, cache_control, content_type)
+
+
+@require_safe
+def serve_blob(request, digest: str):
+    """
+    Serve an image from the blob store by its SHA-256. The content behind a
+    digest never changes, so responses are cacheable forever.
+    """
+    name = get_blob_storage().blob_name(digest)
+    return _stored_blob_response(request, name, IMMUTABLE_CACHE_CONTROL)
+
+
+@require_safe
+def serve_blob_variant(request, digest: str, size: str, fmt: str):
+    """
+    Serve a resized variant of a blob. Until the background job has produced
+    it, redirect to the original image without letting the redirect be cached.
+    """
+    size = int(size)
+    if size not in variant_sizes() or fmt not in variant_formats():
+        raise Http404("Unknown image variant.")
+    storage = get_blob_storage()
+    name = variant_name(digest, size, fmt)
+    if storage.exists(name):
+        return _stored_blob_response(request, name, IMMUTABLE_CACHE_CONTROL, etag=f'{digest}-{size}-{fmt}')
+
+    if not storage.exists(storage.blob_name(digest)):
+        raise Http404("Image not found.")
+    response = HttpResponseRedirect(reverse('serve_blob', kwargs={'digest': digest}))
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@require_safe
+def serve_source_image(request, source_name: str, pk: int):
+    """
+    Serve the current image of one row, from the blob store or from the
+    legacy BinaryField when the row has not been migrated yet.
+    """
+    source = BLOB_SOURCES.get(source_name)
+    if source is None or not source.public:
+        raise Http404("Unknown image type.")
+    model = get_source_model(source)
+
+    row = model._base_manager.filter(pk=pk).values(source.file_field).first()
+    if row is None:
+        raise Http404("Image not found.")
+    if row[source.file_field]:
+        return _stored_blob_response(request, row[source.file_field], MUTABLE_CACHE_CONTROL)
+
+    data = model._base_manager.filter(pk=pk).values_list(source.legacy_field, flat=True).first()
+    if not data:
+        raise Http404("Image not found.")
+    return _bytes_response(request, bytes(data), MUTABLE_CACHE_CONTROL)
@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'rest_framework_simplejwt.token_blacklist',
     'drf_yasg',
+    'blobstore',
     'user',
     'product'
 ]
@@ -86,6 +87,71 @@ SIMPLE_JWT = {
 
 }
 
+# Access token revocation (logout), see user/utils/token_revocation.py
+TOKEN_REVOCATION_BLOOM_CAPACITY = 1_000_000  # revoked tokens before the false positive rate degrades
+TOKEN_REVOCATION_LRU_SIZE = 10000
+TOKEN_REVOCATION_SYNC_INTERVAL = 2  # seconds before tokens revoked by other processes are seen
+TOKEN_REVOCATION_REBUILD_INTERVAL = 3600  # seconds; rebuilding drops expired tokens from the filter
+
+# Expired token rows are purged in the background, see user/utils/token_purge.py
+TOKEN_PURGE_INTERVAL = 3600  # seconds, None disables the job (purge_expired_tokens still works)
+TOKEN_PURGE_BATCH_SIZE = 1000
+TOKEN_PURGE_PAUSE = 0.05  # seconds between batches
+
+# Cached user (and seller profile) snapshots used by CustomJWTAuthentication
+AUTH_USER_CACHE_TTL = 60  # seconds, 0 disables the cache
+
+# Password checks on login run on a bounded pool; beyond workers + queue, logins get a 503
+LOGIN_HASHER_WORKERS = int(os.environ.get('LOGIN_HASHER_WORKERS', 2))
+LOGIN_HASHER_QUEUE_SIZE = 16
+LOGIN_HASHER_RETRY_AFTER = 1  # seconds, sent as Retry-After
+
+# Per-view rate limits, see user/utils/rate_limit.py. 'local' keeps token buckets in each
+# process (burst, then rate); 'cache' counts a sliding window in the shared cache.
+RATE_LIMITS = {
+    'login_ip': {'rate': '30/min', 'backend': 'cache'},
+    'login_identifier': {'rate': '10/min', 'backend': 'cache'},
+    'signup_ip': {'rate': '20/hour', 'backend': 'cache'},
+    'nearby_search_ip': {'rate': '60/min', 'burst': 20, 'backend': 'local'},
+}
+RATE_LIMIT_CACHE_ALIAS = 'default'
+# Reverse proxies in front of the app, as django-ipware counts them (proxy_count, proxy_trusted_ips).
+# Forwarding headers are ignored unless one is set, so clients cannot pick the IP they are limited by.
+CLIENT_IP_PROXY_COUNT = None
+CLIENT_IP_TRUSTED_PROXIES = []
+RATE_LIMIT_LOCAL_MAX_KEYS = 100000
+
+# Bulk user import (import_users command and admin API), see user/utils/user_import.py
+USER_IMPORT_BATCH_SIZE = 500  # rows per uniqueness check and bulk insert
+USER_IMPORT_HASH_WORKERS = None  # password hashing processes, None for the CPU count
+
+# Bulk product create/update (products/bulk/): items per request, all validated and written at once
+PRODUCT_BULK_MAX_ITEMS = 1000
+
+# Catalog file import (import_catalog command), see product/utils/catalog_import.py
+CATALOG_IMPORT_IMAGE_WORKERS = 8  # images fetched and stored at once
+CATALOG_IMPORT_MAX_IMAGE_BYTES = 10 * 1024 * 1024
+CATALOG_EXPORT_CHUNK_SIZE = 2000  # rows per QuerySet.iterator() fetch when streaming an export
+
+# Stock reservations, see product/utils/stock_reservation.py; expired ones are released by
+# the release_expired_reservations command, or when a reservation of the product runs short
+STOCK_RESERVATION_TTL = 15 * 60  # seconds units are held before returning to the stock
+STOCK_RESERVATION_MAX_QUANTITY = 100  # units per reservation
+STOCK_MAX_SHARDS = 64
+
+# Product search ranks only the newest matches of very common words, see product/utils/product_search.py;
+# a query matching more products than this never returns the older ones
+PRODUCT_SEARCH_MAX_CANDIDATES = 20000  # None ranks every match
+
+# In-memory typeahead indexes, see product/utils/typeahead.py; rebuilt in the background
+# to pick up writes of other processes and bulk updates that send no signals
+TYPEAHEAD_MAX_AGE = 600  # seconds
+TYPEAHEAD_MAX_CHANGES = 5000  # incremental changes before an early rebuild, each one slows lookups a little
+TYPEAHEAD_BUILD_WAIT = 5  # seconds a lookup waits for the first build before answering with no suggestions
+# True starts the build in the background from a process's first request instead of its first lookup.
+# Off here: test client requests would start builds racing the tests' writes
+TYPEAHEAD_WARM_ON_REQUEST = False
+
 PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.PBKDF2PasswordHasher',
     'django.contrib.auth.hashers.Argon2PasswordHasher',
@@ -93,6 +159,20 @@ PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.ScryptPasswordHasher',
 ]
 
+# Nearby sellers search
+# "memory" ranks sellers from an in-process NumPy snapshot, "database" uses the
+# indexed SQL prefilter. Precision "geodesic" re-measures the final top-k with geopy.
+NEARBY_SELLERS_ENGINE = 'memory'
+NEARBY_SELLERS_PRECISION = 'haversine'
+NEARBY_SELLERS_SNAPSHOT_MAX_AGE = 300  # seconds before the snapshot is fully reloaded
+NEARBY_SELLERS_MAX_RADIUS_KM = 100
+# Nearby results are cached per quantized location cell; 0 disables the cache
+NEARBY_SELLERS_CACHE_TTL = 60  # seconds
+NEARBY_SELLERS_CACHE_CELL_DEG = 0.002  # roughly 200 m
+
+# Serialized category trees, invalidated by a per-seller version on every category change
+CATEGORY_TREE_CACHE_TTL = 3600  # seconds, 0 disables the cache
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -134,6 +214,25 @@ DATABASES = {
 }
 
 
+# Approximate admin location from their IP address. Point GEOIP_DATABASE_PATH
+# at a GeoLite2/GeoIP2 City .mmdb file (requires the geoip2 package) to avoid
+# online Nominatim lookups.
+GEOIP_DATABASE_PATH = os.environ.get('GEOIP_DATABASE_PATH')
+GEOIP_CACHE_TTL_DAYS = 30
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Cache versions are used for invalidation, so multi-process deployments
+# should point this at a shared backend (Redis/Memcached).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -170,6 +269,37 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# File storages
+# https://docs.djangoproject.com/en/4.2/ref/settings/#storages
+# "blobs" holds every uploaded image, named after the SHA-256 of its content.
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'blobs': {
+        'BACKEND': 'blobstore.storage.ContentAddressedFileSystemStorage',
+        'OPTIONS': {
+            'location': BASE_DIR / 'blobs',
+        },
+    },
+}
+
+# Let the front proxy send blob files: None, 'x-sendfile' (Apache/lighttpd) or
+# 'x-accel-redirect' (nginx, with an internal location mapped to the prefix).
+BLOB_SENDFILE_MODE = None
+BLOB_ACCEL_REDIRECT_PREFIX = '/protected-blobs/'
+
+# Resized variants generated in a background process pool after each upload
+BLOB_VARIANTS_ENABLED = True
+BLOB_VARIANT_SIZES = (64, 256, 1024)
+BLOB_VARIANT_FORMATS = ('webp', 'jpeg')
+BLOB_VARIANT_QUALITY = 80
+BLOB_VARIANT_WORKERS = int(os.environ.get('BLOB_VARIANT_WORKERS', 2))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -38,5 +38,6 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('user/', include('user.url')),
     path('product/', include('product.url')),
+    path('blobs/', include('blobstore.url')),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='swagger-docs'),  # Swagger URL
 ]
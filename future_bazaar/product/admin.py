@@ -4,6 +4,7 @@ from .models import Category, Product, ProductImage, HeroSection
 from django.contrib import admin
 from .models import Category
 from django import forms
+from .utils.stock_reservation import set_stock, with_available_stock
 
 class CategoryAdminForm(forms.ModelForm):
     # Add a field to upload files
@@ -14,13 +15,13 @@ class CategoryAdminForm(forms.ModelForm):
         fields = ['seller', 'name', 'description', 'parent_category', 'is_active', 'image_upload']
 
     def save(self, commit=True):
-        # Override save method to handle BinaryField
+        # Override save method to store the upload in the blob store
         instance = super().save(commit=False)
         
         # Handle file upload if provided
         image_file = self.cleaned_data.get('image_upload')
         if image_file:
-            instance.image = image_file.read()  # Convert file to binary data
+            instance.image_file = image_file  # Streamed to the blob store on save
 
         if commit:
             instance.save()
@@ -36,10 +37,32 @@ class CategoryAdmin(admin.ModelAdmin):
 
 # Registering the Product model
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'seller_id', 'price', 'stock_quantity', 'is_active', 'created_at', 'updated_at')
+    list_display = ('name', 'seller_id', 'price', 'available_stock', 'is_active', 'created_at', 'updated_at')
     list_filter = ('is_active', 'category_id', 'seller_id')
     search_fields = ('name', 'description', 'seller_id__business_name')
 
+    def get_queryset(self, request):
+        return with_available_stock(super().get_queryset(request))
+
+    @admin.display(description='Stock', ordering='available_stock')
+    def available_stock(self, obj):
+        return obj.available_stock
+
+    def get_object(self, request, object_id, from_field=None):
+        obj = super().get_object(request, object_id, from_field)
+        if obj is not None:
+            obj.stock_quantity = obj.available_stock  # The form edits the free units, shards included
+        return obj
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+        # Reservations move the stock while the form is open: never write back the count it was loaded with
+        obj.save(update_fields=[field.name for field in obj._meta.concrete_fields
+                                if not field.primary_key and field.name != 'stock_quantity'])
+        if 'stock_quantity' in form.changed_data:
+            set_stock(obj.pk, form.cleaned_data['stock_quantity'])
+
 # Registering the ProductImage model
 class ProductImageAdmin(admin.ModelAdmin):
     list_display = ('product', 'created_at')
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
 
 
 class ProductConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'product'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .utils.typeahead import catalog_typeahead
+
+        # Otherwise built by the first lookup; never by management commands
+        if getattr(settings, 'TYPEAHEAD_WARM_ON_REQUEST', False):
+            request_started.connect(catalog_typeahead.warm, dispatch_uid='product.warm_typeahead')
@@ -11,13 +11,13 @@ class CategoryAdminForm(forms.ModelForm):
         fields = ['seller', 'name', 'description', 'parent_category', 'is_active', 'image_upload']
 
     def save(self, commit=True):
-        # Override save method to handle BinaryField
+        # Override save method to store the upload in the blob store
         instance = super().save(commit=False)
         
         # Handle file upload if provided
         image_file = self.cleaned_data.get('image_upload')
         if image_file:
-            instance.image = image_file.read()  # Convert file to binary data
+            instance.image_file = image_file  # Streamed to the blob store on save
 
         if commit:
             instance.save()
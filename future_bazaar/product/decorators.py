@@ -1,11 +1,16 @@
 from functools import wraps
 from django.http import JsonResponse
 from django.core.exceptions import PermissionDenied
+from user.utils.seller_context import get_request_seller
 
 def restrict_user_type(allowed_user_type: str):
     """
     Decorator to restrict access to views based on the user type.
+    Seller views also require the seller profile, which is resolved once
+    and shared with the view through get_request_seller().
     """
+    allowed_user_type = allowed_user_type.lower()
+
     def decorator(view_func):
         @wraps(view_func)
         def _wrapped_view(request, *args, **kwargs):
@@ -19,6 +24,9 @@ def restrict_user_type(allowed_user_type: str):
                     {"error": f"Access restricted to {allowed_user_type} users."},
                     status=403
                 )
+
+            if allowed_user_type == 'seller' and get_request_seller(request) is None:
+                return JsonResponse({"error": "Seller profile does not exist for the user."}, status=403)
             
             return view_func(request, *args, **kwargs)
         
@@ -0,0 +1,98 @@
+import datetime
+import random
+import statistics
+import string
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import override_settings
+
+from product.models import Product
+from product.utils.product_search import (_search_basic, _search_fts, fts_match_expression, search_backend,
+                                          search_terms)
+from product.utils.search_index import PRODUCT_SEARCH_TABLE
+from user.models import Seller, UserModel
+
+
+class Command(BaseCommand):
+    help = (
+        "Time product search on synthetic products with a Zipfian vocabulary: FTS5 with the candidate cap, "
+        "FTS5 ranking every match, and the icontains scans it replaced, for rare and common words and "
+        "prefixes. Needs the SQLite FTS5 index. Runs in a transaction that is rolled back, so no rows are "
+        "left behind."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1_000_000)
+        parser.add_argument('--vocabulary', type=int, default=2000, help="Distinct words in names and descriptions.")
+        parser.add_argument('--queries', type=int, default=3, help="Times each query is run per engine.")
+        parser.add_argument('--limit', type=int, default=20, help="Products per page.")
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if search_backend() != 'fts5':
+            raise CommandError("The default database has no FTS5 product index.")
+        rng = random.Random(options['seed'])
+        words = sorted({''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+                        for _ in range(options['vocabulary'])})
+        rng.shuffle(words)  # words[0] is the most common
+        queries = [words[-1], words[len(words) // 20], words[0], words[0][:3], f"{words[0]} {words[9][:3]}"]
+        limit = options['limit']
+        engines = {
+            'fts5': lambda terms: _search_fts(terms, None, None, None, limit),
+            'fts5-all': lambda terms: self._uncapped(terms, limit),
+            'icontains': lambda terms: _search_basic(terms, None, None, None, limit),
+        }
+
+        with transaction.atomic():
+            self._add_products(options['products'], options['batch_size'], words, rng)
+            self.stdout.write(f"{'query':>20} {'matches':>8} {'engine':>10} {'median ms':>10}")
+            for query in queries:
+                terms = search_terms(query)
+                matches = self._count_matches(terms)
+                for name, search in engines.items():
+                    timings = []
+                    for _ in range(options['queries']):
+                        started = time.perf_counter()
+                        search(terms)
+                        timings.append((time.perf_counter() - started) * 1000)
+                    self.stdout.write(f"{query:>20} {matches:>8} {name:>10} {statistics.median(timings):>10.1f}")
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _uncapped(terms, limit):
+        with override_settings(PRODUCT_SEARCH_MAX_CANDIDATES=None):
+            return _search_fts(terms, None, None, None, limit)
+
+    @staticmethod
+    def _count_matches(terms) -> int:
+        with connections['default'].cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {PRODUCT_SEARCH_TABLE} WHERE {PRODUCT_SEARCH_TABLE} MATCH %s",
+                           [fts_match_expression(terms)])
+            return cursor.fetchone()[0]
+
+    def _add_products(self, count: int, batch_size: int, words: list, rng: random.Random) -> None:
+        started = time.monotonic()
+        user = UserModel.objects.create(email='bench-search-seller@example.invalid', contact_number='bench-search',
+                                        first_name='Bench', last_name='Seller', password='!', user_type='seller')
+        seller = Seller.objects.create(
+            user_id=user, business_name='Bench', business_address='-', business_contact_number='-',
+            is_seller_exclusives=False, shop_timing_open=datetime.time(9), shop_timing_close=datetime.time(18),
+            shop_location='-', geo_location_lat=0, geo_location_lng=0, is_approved=True, days_closed='',
+        )
+        weights = [1 / rank for rank in range(1, len(words) + 1)]
+        for low in range(0, count, batch_size):
+            products = []
+            for _ in range(min(batch_size, count - low)):
+                name = ' '.join(rng.choices(words, weights, k=3)).capitalize()
+                products.append(Product(
+                    seller_id=seller, name=name, title=name, description=' '.join(rng.choices(words, weights, k=5)),
+                    price=Decimal('10.00'), discounted_price=Decimal('10.00'), exclusives='none',
+                    default_category='furniture',
+                ))
+            # The insert trigger indexes each row
+            Product.objects.bulk_create(products)
+        self.stderr.write(f"Added {count} products in {time.monotonic() - started:.1f}s")
@@ -0,0 +1,61 @@
+import random
+import statistics
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from product.utils.typeahead import PrefixIndex
+
+
+WORDS = ['teak', 'oak', 'pine', 'walnut', 'chair', 'table', 'stool', 'bench', 'shelf', 'lamp', 'rug', 'sofa',
+         'desk', 'bed', 'cabinet', 'mirror', 'vase', 'clock', 'frame', 'basket']
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the typeahead prefix index on synthetic names: the build, its memory, and lookups per prefix "
+        "length with and without a seller scope, with pending changes that all share one prefix. Needs no "
+        "database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--names', type=int, default=1_000_000)
+        parser.add_argument('--sellers', type=int, default=5000)
+        parser.add_argument('--changes', type=int, default=5000, help="Upserts applied after the build.")
+        parser.add_argument('--lookups', type=int, default=2000, help="Lookups timed per prefix length.")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        sellers = options['sellers']
+
+        def name():
+            words = rng.sample(WORDS, rng.randint(1, 3))
+            return ' '.join(words).title() + ' ' + ''.join(rng.choices(string.ascii_lowercase, k=4))
+
+        rows = [(row_id, name(), rng.randrange(sellers)) for row_id in range(options['names'])]
+        started = time.perf_counter()
+        index = PrefixIndex(rows)
+        self.stdout.write(f"Built {len(rows)} names in {time.perf_counter() - started:.1f}s, "
+                          f"{index.memory_bytes() / 1024 / 1024:.0f} MiB")
+
+        # The worst case for the delta: every pending change under one prefix
+        for _ in range(options['changes']):
+            row_id = rng.randrange(len(rows))
+            index.upsert(row_id, 'Teak ' + name(), rows[row_id][2])
+        del rows
+
+        self.stdout.write(f"{'prefix':>7} {'scope':>7} {'median us':>10} {'p99 us':>8}")
+        for length in (1, 2, 3, 5, 8):
+            prefixes = [name()[:length] for _ in range(options['lookups'])]
+            for scope in ('all', 'seller'):
+                timings = []
+                for prefix in prefixes:
+                    seller_id = rng.randrange(sellers) if scope == 'seller' else None
+                    started = time.perf_counter()
+                    index.search(prefix, seller_id, limit=8)
+                    timings.append((time.perf_counter() - started) * 1_000_000)
+                timings.sort()
+                self.stdout.write(f"{length:>7} {scope:>7} {statistics.median(timings):>10.1f} "
+                                  f"{timings[int(len(timings) * 0.99)]:>8.1f}")
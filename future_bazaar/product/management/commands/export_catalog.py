@@ -0,0 +1,48 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from product.utils.catalog_export import EXPORT_FORMATS, EXPORT_KINDS, export_catalog, export_file_name
+from user.models import Seller
+
+
+class Command(BaseCommand):
+    help = "Stream a seller's products or categories to a CSV or JSON Lines file, optionally gzipped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('seller_id', type=int)
+        parser.add_argument('--kind', choices=EXPORT_KINDS, default='products')
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--gzip', action='store_true', help="Compress the file on the fly.")
+        parser.add_argument('--chunk-size', type=int, help="Rows fetched per query. Defaults to CATALOG_EXPORT_CHUNK_SIZE.")
+        parser.add_argument('--base-url', default='',
+                            help="Site root prefixed to image URLs, e.g. https://shop.example.com.")
+        parser.add_argument(
+            '-o', '--output',
+            help="File to write, '-' for stdout. Defaults to seller-<id>-<kind>.<format>[.gz] here.",
+        )
+
+    def handle(self, *args, **options):
+        seller = Seller.objects.filter(pk=options['seller_id']).first()
+        if seller is None:
+            raise CommandError(f"Seller with ID {options['seller_id']} does not exist.")
+
+        kind, fmt, compress = options['kind'], options['format'], options['gzip']
+        path = options['output'] or export_file_name(seller, kind, fmt, compress)
+        started = time.monotonic()
+        written = 0
+        target = sys.stdout.buffer if path == '-' else open(path, 'wb')
+        try:
+            for chunk in export_catalog(seller, kind, fmt, compress, chunk_size=options['chunk_size'],
+                                        base_url=options['base_url'].rstrip('/')):
+                target.write(chunk)
+                written += len(chunk)
+        finally:
+            if path != '-':
+                target.close()
+
+        if path != '-':
+            self.stdout.write(self.style.SUCCESS(
+                f"Wrote {written / 1024 / 1024:.1f} MiB of {kind} to {path} in {time.monotonic() - started:.1f}s"
+            ))
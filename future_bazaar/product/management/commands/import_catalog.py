@@ -0,0 +1,79 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blobstore.variants import shutdown_executor
+from product.utils.catalog_import import CatalogImporter
+from user.models import Seller
+from user.utils.user_import import IMPORT_FORMATS
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a seller's products from a CSV (with a header row) or JSON Lines file of any size, "
+        "in chunks. Running it again on the same file resumes after the last committed chunk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('seller_id', type=int)
+        parser.add_argument(
+            'path',
+            help="File with name, title, description, price, discounted_price, exclusives and optionally "
+                 "stock_quantity, category (name or Parent/Child path), banner_image and images "
+                 "('|'-separated in CSV, a list in JSON Lines).",
+        )
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Rows committed per transaction.")
+        parser.add_argument('--image-root', help="Directory image paths are relative to. Defaults to the file's.")
+        parser.add_argument('--image-workers', type=int, help="Images fetched and stored in parallel.")
+        parser.add_argument('--restart', action='store_true', help="Ignore the progress of an earlier run.")
+        parser.add_argument('--no-variants', action='store_true', help="Do not pre-render resized image variants.")
+        parser.add_argument('--report', help="Write rejected rows as JSON Lines here instead of stdout.")
+
+    def handle(self, *args, **options):
+        seller = Seller.objects.filter(pk=options['seller_id']).first()
+        if seller is None:
+            raise CommandError(f"Seller with ID {options['seller_id']} does not exist.")
+
+        started = time.monotonic()
+        show_bar = self.stderr.isatty()
+
+        def progress(checkpoint, fraction):
+            rows = checkpoint.products_created + checkpoint.rows_rejected
+            elapsed = time.monotonic() - started
+            filled = int(fraction * 30)
+            line = (f"[{'#' * filled}{'.' * (30 - filled)}] {fraction:6.1%}  {rows} rows, "
+                    f"{checkpoint.products_created} products, {checkpoint.rows_rejected} rejected, {elapsed:.0f}s")
+            self.stderr.write(f"\r{line}" if show_bar else line, ending='')
+            if not show_bar:
+                self.stderr.write('')
+
+        importer = CatalogImporter(
+            seller, options['path'], fmt=options['format'], chunk_size=options['chunk_size'],
+            image_root=options['image_root'], image_workers=options['image_workers'],
+            restart=options['restart'], variants=not options['no_variants'], progress=progress,
+        )
+        report = open(options['report'], 'a', buffering=1) if options['report'] else self.stdout
+        try:
+            for rejected in importer.run():
+                report.write(json.dumps(rejected) + '\n')
+        finally:
+            if options['report']:
+                report.close()
+            if show_bar:
+                self.stderr.write('')
+            shutdown_executor()  # Waits for the image variants queued by the import
+
+        checkpoint = importer.checkpoint
+        if importer.already_imported:
+            self.stdout.write(f"{checkpoint.source_name} was already imported on {checkpoint.completed_at:%Y-%m-%d %H:%M}; "
+                              "use --restart to import it again.")
+            return
+        if importer.resumed_at:
+            self.stdout.write(f"Resumed at byte {importer.resumed_at} of {checkpoint.source_name}.")
+        self.stdout.write(self.style.SUCCESS(
+            f"{checkpoint.source_name}: {checkpoint.products_created} products created, "
+            f"{checkpoint.images_stored} images stored, {checkpoint.rows_rejected} rows rejected "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from product.utils.stock_reservation import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Return the units of stock reservations past their TTL to the stock. Meant to run from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product', type=int, help="Only reservations of this product ID.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Reservations loaded per query.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        released = release_expired_reservations(product_id=options['product'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Released {released} expired reservations in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.17 on 2026-10-17 00:29
+
+import blobstore.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0002_alter_category_table_alter_herosection_table_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='image_file',
+            field=models.FileField(blank=True, storage=blobstore.storage.get_blob_storage, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='herosection',
+            name='banner_image_file',
+            field=models.FileField(blank=True, storage=blobstore.storage.get_blob_storage, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='banner_image_file',
+            field=models.FileField(blank=True, storage=blobstore.storage.get_blob_storage, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='image_file',
+            field=models.FileField(blank=True, storage=blobstore.storage.get_blob_storage, upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='image',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='herosection',
+            name='banner_image',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='banner_image',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
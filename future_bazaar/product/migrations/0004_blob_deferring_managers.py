@@ -0,0 +1,29 @@
+# Generated by Django 4.2.17 on 2026-10-17 00:35
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0003_blob_store_files'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='category',
+            options={'base_manager_name': 'objects'},
+        ),
+        migrations.AlterModelOptions(
+            name='herosection',
+            options={'base_manager_name': 'objects'},
+        ),
+        migrations.AlterModelOptions(
+            name='product',
+            options={'base_manager_name': 'objects'},
+        ),
+        migrations.AlterModelOptions(
+            name='productimage',
+            options={'base_manager_name': 'objects'},
+        ),
+    ]
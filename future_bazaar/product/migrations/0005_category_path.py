@@ -0,0 +1,50 @@
+# Generated by Django 4.2.17 on 2026-10-17 00:36
+
+from django.db import migrations, models
+
+from product.utils.category_tree import path_segment
+
+
+def populate_category_paths(apps, schema_editor):
+    Category = apps.get_model('product', 'Category')
+    parents = dict(Category.objects.values_list('category_id', 'parent_category_id'))
+
+    children = {}
+    for category_id, parent_id in parents.items():
+        # Categories pointing at a missing parent are treated as roots
+        children.setdefault(parent_id if parent_id in parents else None, []).append(category_id)
+
+    # Walk down from the roots; categories caught in a parent cycle are never reached and keep ''
+    updates = []
+    stack = [(category_id, '') for category_id in children.get(None, [])]
+    while stack:
+        category_id, parent_path = stack.pop()
+        path = parent_path + path_segment(category_id)
+        updates.append(Category(category_id=category_id, path=path, depth=path.count('/') - 1))
+        stack.extend((child_id, path) for child_id in children.get(category_id, []))
+    Category.objects.bulk_update(updates, ['path', 'depth'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0004_blob_deferring_managers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['seller', 'path'], name='category_seller_path_idx'),
+        ),
+        migrations.RunPython(populate_category_paths, migrations.RunPython.noop),
+    ]
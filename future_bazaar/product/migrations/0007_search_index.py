@@ -0,0 +1,24 @@
+# Generated by Django 4.2.17 on 2026-10-17 01:10
+
+from django.db import migrations
+
+from product.utils.search_index import create_search_index, drop_search_index
+
+
+def create_index(apps, schema_editor):
+    create_search_index(schema_editor.connection)
+
+
+def drop_index(apps, schema_editor):
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0006_product_browse_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.17 on 2026-10-17 02:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0012_usermodel_password_length'),
+        ('product', '0007_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_name', models.CharField(max_length=255)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('file_format', models.CharField(max_length=10)),
+                ('offset', models.BigIntegerField(default=0)),
+                ('line', models.BigIntegerField(default=0)),
+                ('csv_header', models.TextField(blank=True)),
+                ('products_created', models.PositiveIntegerField(default=0)),
+                ('images_stored', models.PositiveIntegerField(default=0)),
+                ('rows_rejected', models.PositiveIntegerField(default=0)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='catalog_imports', to='user.seller')),
+            ],
+            options={
+                'db_table': 'catalog_import',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='catalogimport',
+            constraint=models.UniqueConstraint(fields=('seller', 'fingerprint'), name='catalog_import_seller_file_uniq'),
+        ),
+    ]
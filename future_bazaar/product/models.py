@@ -1,30 +1,129 @@
 # apps/products/models.py
 from django.db import models
-from user.models import Seller
+from django.db.models import F, Max, Q, Value
+from django.db.models.functions import Concat, Substr
+from user.models import Seller, UserModel
+from blobstore.managers import BlobDeferringManager
+from blobstore.storage import get_blob_storage
+from .utils.category_tree import MAX_PATH_LENGTH, check_nesting, path_ids, path_segment
 
 
 class Category(models.Model):
     class Meta:
         db_table = 'category'
+        base_manager_name = 'objects'  # Related lookups defer the image columns too
+        indexes = [
+            # A seller's tree, or any subtree, is one range scan in path order
+            models.Index(fields=['seller', 'path'], name='category_seller_path_idx'),
+        ]
     category_id = models.AutoField(primary_key=True)
     seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name='custom_categories')
     name = models.CharField(max_length=255)
     description = models.TextField(null=True, blank=True)
-    image = models.BinaryField(blank = False) 
+    image = models.BinaryField(null=True, blank=True)  # Legacy inline image, see image_file
+    image_file = models.FileField(storage=get_blob_storage, blank=True)
     parent_category = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='subcategories')
     is_active = models.BooleanField(default=True)  # Field to activate/deactivate the category
+    path = models.CharField(max_length=MAX_PATH_LENGTH, editable=False, default='', db_index=True)  # See category_tree
+    depth = models.PositiveSmallIntegerField(editable=False, default=0)  # 0 for root categories
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = BlobDeferringManager()
+
     def __str__(self):
         return self.name
     
     def is_subcategory(self):
         return self.parent_category is not None    # If it has a parent category, it's a subcategory
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored parent, so save() can tell when the category moved
+        instance._loaded_parent_id = instance.__dict__.get('parent_category_id')
+        return instance
+
+    def get_ancestors(self, include_self: bool = False):
+        """Categories from the root down to the parent (or self), in one query."""
+        ids = path_ids(self.path)
+        if not include_self:
+            ids = ids[:-1]
+        return Category.objects.filter(pk__in=ids).order_by('depth')
+
+    def get_descendants(self, include_self: bool = False):
+        """Every category below this one, in depth-first order."""
+        descendants = Category.objects.filter(path__startswith=self.path).order_by('path')
+        return descendants if include_self else descendants.exclude(pk=self.pk)
+
+    def subtree_levels(self) -> int:
+        """Levels of the tree this category and its subcategories span, 1 for a leaf."""
+        if self.pk is None or not self.path:
+            return 1
+        deepest = Category.objects.filter(path__startswith=self.path).aggregate(deepest=Max('depth'))['deepest']
+        return 1 + max(deepest or 0, self.depth) - self.depth
+
+    def _parent_path(self) -> str:
+        if self.parent_category_id is None:
+            return ''
+        parent_path = Category.objects.filter(pk=self.parent_category_id).values_list('path', flat=True).first()
+        if parent_path is None:
+            raise ValueError(f"Parent category {self.parent_category_id} does not exist.")
+        if self.pk is not None and self.pk in path_ids(parent_path):
+            raise ValueError("A category cannot be moved under itself or one of its subcategories.")
+        check_nesting(parent_path, self.subtree_levels())
+        return parent_path
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        creating = self._state.adding
+        moved = not creating and self.parent_category_id != getattr(self, '_loaded_parent_id', self.parent_category_id)
+        if update_fields is not None and 'parent_category' not in update_fields:
+            moved = False
+
+        old_path, old_depth = self.path, self.depth
+        if moved:
+            self.path = self._parent_path() + path_segment(self.pk)
+            self.depth = self.path.count('/') - 1
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'path', 'depth'}
+        elif creating:
+            parent_path = self._parent_path()
+
+        super().save(*args, **kwargs)
+        self._loaded_parent_id = self.parent_category_id
+
+        if creating and not self.path:
+            # The path ends with our own id, which only exists after the insert
+            self.path = parent_path + path_segment(self.pk)
+            self.depth = self.path.count('/') - 1
+            Category.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+        elif moved and old_path:
+            # Re-root the whole subtree in one statement
+            Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                path=Concat(Value(self.path), Substr('path', len(old_path) + 1)),
+                depth=F('depth') + (self.depth - old_depth),
+            )
+
 
 class Product(models.Model):
     class Meta:
         db_table = 'product'
+        base_manager_name = 'objects'  # Related lookups defer the image columns too
+        indexes = [
+            # Storefront browsing only sees active products: partial indexes with the
+            # equality filter first, then the keyset columns, so each page is one range scan
+            models.Index(fields=['-created_at', '-product_id'], condition=Q(is_active=True),
+                         name='product_active_newest_idx'),
+            models.Index(fields=['price', 'product_id'], condition=Q(is_active=True),
+                         name='product_active_price_idx'),
+            models.Index(fields=['seller_id', '-created_at', '-product_id'], condition=Q(is_active=True),
+                         name='product_seller_newest_idx'),
+            models.Index(fields=['category_id', '-created_at', '-product_id'], condition=Q(is_active=True),
+                         name='product_category_newest_idx'),
+            models.Index(fields=['default_category', '-created_at', '-product_id'], condition=Q(is_active=True),
+                         name='product_default_cat_newest_idx'),
+        ]
     product_id = models.AutoField(primary_key=True)
     # Linking product to seller
     seller_id = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name='products')
@@ -35,9 +134,11 @@ class Product(models.Model):
     description = models.TextField(max_length=255, blank=False)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     discounted_price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Units free to reserve, outside any StockShard; only changed with F() updates, see stock_reservation
     stock_quantity = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True) 
-    banner_image = models.BinaryField(blank=False)
+    banner_image = models.BinaryField(null=True, blank=True)  # Legacy inline image, see banner_image_file
+    banner_image_file = models.FileField(storage=get_blob_storage, blank=True)
     exclusives = models.CharField(max_length=255, blank=False)
     # Category for the product
     category_id = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='products')
@@ -48,28 +149,120 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BlobDeferringManager()
+
     def __str__(self):
         return f"{self.name} ({self.seller_category or self.default_category})"
     
 class ProductImage(models.Model):
     class Meta:
         db_table = 'product_image'
+        base_manager_name = 'objects'  # Related lookups defer the image columns too
     product = models.ForeignKey(Product, related_name='images', on_delete=models.CASCADE)
-    image = models.BinaryField()  # Storing the image as binary data
+    image = models.BinaryField(null=True, blank=True)  # Legacy inline image, see image_file
+    image_file = models.FileField(storage=get_blob_storage, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = BlobDeferringManager()
+
     def __str__(self):
         return f"Image for {self.product.name}"   
 
 class HeroSection(models.Model):
     class Meta:
         db_table = 'hero_section'
+        base_manager_name = 'objects'  # Related lookups defer the image columns too
     hero_id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100,blank=True)
     section_name = models.CharField(max_length=100, blank=True)
     seller_id =  models.ForeignKey(Seller, on_delete=models.CASCADE, related_name='seller_section')
     product_id = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='product_section')
     priority = models.IntegerField()
-    banner_image = models.BinaryField(blank=False)
+    banner_image = models.BinaryField(null=True, blank=True)  # Legacy inline image, see banner_image_file
+    banner_image_file = models.FileField(storage=get_blob_storage, blank=True)
+
+    objects = BlobDeferringManager()
+
+
+class CatalogImport(models.Model):
+    """
+    Progress of importing one catalog file for a seller (import_catalog).
+    Updated in the same transaction as each chunk of products, so an
+    interrupted import resumes right after the last committed chunk.
+    """
+    class Meta:
+        db_table = 'catalog_import'
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'fingerprint'], name='catalog_import_seller_file_uniq'),
+        ]
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name='catalog_imports')
+    source_name = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)  # Identifies the file content, see catalog_import.file_fingerprint
+    file_format = models.CharField(max_length=10)
+    offset = models.BigIntegerField(default=0)  # Bytes of the file processed and committed
+    line = models.BigIntegerField(default=0)  # Last line processed and committed
+    csv_header = models.TextField(blank=True)  # JSON list, needed to resume a CSV file mid-way
+    products_created = models.PositiveIntegerField(default=0)
+    images_stored = models.PositiveIntegerField(default=0)
+    rows_rejected = models.PositiveIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source_name} ({self.seller_id})"
+
+
+class StockShard(models.Model):
+    """
+    A slice of a hot product's free stock. Reservations draw from a slice
+    picked at random, so concurrent buyers of one product update different
+    rows instead of queueing on the product row. See stock_reservation.
+    """
+    class Meta:
+        db_table = 'stock_shard'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'index'], name='stock_shard_product_index_uniq'),
+        ]
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_shards')
+    index = models.PositiveSmallIntegerField()
+    quantity = models.PositiveIntegerField(default=0)
 
+    def __str__(self):
+        return f"{self.product_id}#{self.index}: {self.quantity}"
+
+
+class StockReservation(models.Model):
+    """
+    Units of a product held for a buyer until committed (sold), released or
+    expired. Pending units are already taken out of the product's stock
+    (or of `shard`) and go back there unless committed.
+    """
+    PENDING = 'pending'
+    COMMITTED = 'committed'
+    RELEASED = 'released'
+    EXPIRED = 'expired'
+    STATUS = [
+        (PENDING, 'pending'),
+        (COMMITTED, 'committed'),
+        (RELEASED, 'released'),
+        (EXPIRED, 'expired'),
+    ]
+
+    class Meta:
+        db_table = 'stock_reservation'
+        indexes = [
+            # The expiry sweep only ever looks at pending reservations
+            models.Index(fields=['expires_at'], condition=Q(status='pending'), name='stock_reservation_pending_idx'),
+        ]
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_reservations')
+    user = models.ForeignKey(UserModel, on_delete=models.CASCADE, related_name='stock_reservations')
+    quantity = models.PositiveIntegerField()
+    shard = models.PositiveSmallIntegerField(null=True, blank=True)  # StockShard.index drawn from, None for the product
+    status = models.CharField(max_length=10, choices=STATUS, default=PENDING)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} ({self.status})"
@@ -1,29 +1,53 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from typing import List, Optional, Tuple
+from datetime import datetime
+from decimal import Decimal
 import base64
+import binascii
 from .models import Category, Seller
-from .models import Category, Seller, Product
+from .models import Category, Seller, Product, HeroSection, StockReservation
+from blobstore.utils import blob_url
+from blobstore.variants import variant_urls
+from .utils.category_tree import check_nesting, path_ids
+from .utils.stock_reservation import set_stock
+from user.utils.seller_context import get_request_seller
 
 class CategorySerializer(serializers.ModelSerializer):
     image = serializers.ImageField(write_only=True)
-    image_base64 = serializers.SerializerMethodField() 
+    image_url = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     class Meta:
         model = Category
-        fields = ['category_id', 'name', 'description', 'image', 'image_base64', 'parent_category', 'is_active']
-
-    def get_image_base64(self, obj):
-        if obj.image:
-            # Convert binary data to base64
-            encoded_image = base64.b64encode(obj.image).decode('utf-8')
-            return f"data:image/jpeg;base64,{encoded_image}"  # You can modify the mime type (jpeg/png) accordingly
-        return None
+        fields = ['category_id', 'name', 'description', 'image', 'image_url', 'image_variants', 'parent_category', 'depth', 'is_active']
+        read_only_fields = ['depth']
+
+    def get_image_url(self, obj):
+        return blob_url(obj, 'category-image')
+
+    def get_image_variants(self, obj):
+        return variant_urls(obj, 'category-image')
+
+    def validate_parent_category(self, value):
+        # Moving a category under its own subtree would create a cycle
+        if value is not None and self.instance is not None and self.instance.pk in path_ids(value.path):
+            raise serializers.ValidationError("A category cannot be moved under itself or one of its subcategories.")
+        if value is not None:
+            try:
+                check_nesting(value.path, self.instance.subtree_levels() if self.instance is not None else 1)
+            except ValueError as e:
+                raise serializers.ValidationError(str(e))
+        return value
     
 
     def create(self, validated_data):
-        user = self.context['request'].user
-        # Get the seller profile from the user
-        try:
-            seller = Seller.objects.get(user_id=user.user_id)
-        except Seller.DoesNotExist:
+        # Get the seller profile of the requesting user
+        seller = get_request_seller(self.context['request'])
+        if seller is None:
             raise serializers.ValidationError("Seller profile does not exist for the user.")
 
         # Check if a category with the same name already exists for this seller
@@ -31,8 +55,9 @@ class CategorySerializer(serializers.ModelSerializer):
         if Category.objects.filter(seller=seller, name=category_name).exists():
             raise serializers.ValidationError(f"A category with the name '{category_name}' already exists.")
 
-        # Create the category
-        category = Category.objects.create(seller=seller, **validated_data)
+        # Create the category, streaming the uploaded image into the blob store
+        image = validated_data.pop('image', None)
+        category = Category.objects.create(seller=seller, image_file=image, **validated_data)
         return category
 
     def update(self, instance, validated_data):
@@ -42,11 +67,13 @@ class CategorySerializer(serializers.ModelSerializer):
 
         # Prevent duplicate category names for the same seller
         category_name = validated_data.get('name', instance.name)
-        seller = instance.seller
-        if Category.objects.filter(seller=seller, name=category_name).exclude(pk=instance.pk).exists():
+        if Category.objects.filter(seller_id=instance.seller_id, name=category_name).exclude(pk=instance.pk).exists():
             raise serializers.ValidationError(f"A category with the name '{category_name}' already exists.")
 
         # Update and save the instance
+        image = validated_data.pop('image', None)
+        if image:
+            instance.image_file = image
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
@@ -54,28 +81,37 @@ class CategorySerializer(serializers.ModelSerializer):
     
 
 class ProductSerializer(serializers.ModelSerializer):
-    banner_image = serializers.FileField(required=False) 
+    banner_image = serializers.FileField(required=False, write_only=True)
+    banner_image_url = serializers.SerializerMethodField()
+    banner_image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
         fields = [
             'name', 'title', 'description', 
-            'price', 'discounted_price', 'stock_quantity', 'banner_image', 
-            'exclusives'
+            'price', 'discounted_price', 'stock_quantity', 'banner_image', 'banner_image_url',
+            'banner_image_variants', 'exclusives'
         ]
         read_only_fields = ['product_id', 'created_at', 'updated_at', 'category_id']  # These fields are read-only
 
+    def get_banner_image_url(self, obj: Product):
+        return blob_url(obj, 'product-banner')
+
+    def get_banner_image_variants(self, obj: Product):
+        return variant_urls(obj, 'product-banner')
+
     def validate(self, attrs) :
         """
         Custom validation for the product.
         """
         user = self.context['request'].user
-        if user.user_type != 'seller':
+        seller = get_request_seller(self.context['request'])
+        if user.user_type != 'seller' or seller is None:
             raise serializers.ValidationError("Only sellers can create products.")
         
         # Automatically link the seller from the authenticated user
         if 'seller_id' in attrs:
-            if attrs['seller_id'] != user.seller.id:
+            if attrs['seller_id'] != seller:
                 raise serializers.ValidationError("Seller ID does not match the authenticated user's seller.")
 
         # Validate that the discounted price is not greater than the price
@@ -88,7 +124,266 @@ class ProductSerializer(serializers.ModelSerializer):
         """
         Create and return a new product instance.
         """
-        user = self.context['request'].user
-        validated_data['seller_id'] = user.seller  # Automatically link the seller from the authenticated user
+        seller = get_request_seller(self.context['request'])
+        validated_data['seller_id'] = seller  # Automatically link the seller from the authenticated user
+        validated_data.setdefault('default_category', seller.seller_category)
         validated_data['is_active'] = True  # Set is_active to True by default
-        return super().create(validated_data)
\ No newline at end of file
+        banner_image = validated_data.pop('banner_image', None)
+        if banner_image:
+            validated_data['banner_image_file'] = banner_image  # Streamed into the blob store on save
+        return super().create(validated_data)
+
+
+class ProductBulkListSerializer(serializers.ListSerializer):
+    """
+    Validates every item of a bulk request and keeps the valid ones:
+    validated_data holds those, in order, with their positions in
+    valid_indexes, and item_errors the errors of the rest by position.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            message = self.error_messages['not_a_list'].format(input_type=type(data).__name__)
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='not_a_list')
+        if not data:
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [self.error_messages['empty']]},
+                                              code='empty')
+        if self.max_length is not None and len(data) > self.max_length:
+            message = self.error_messages['max_length'].format(max_length=self.max_length)
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='max_length')
+
+        self.valid_indexes, self.item_errors = [], {}
+        validated, seen = [], set()
+        for index, item in enumerate(data):
+            try:
+                attrs = self.run_child_validation(item)
+                product_id = attrs.get('product_id')
+                if product_id is not None and product_id in seen:
+                    raise serializers.ValidationError({'product_id': ["Listed more than once in this batch."]})
+                seen.add(product_id)
+            except serializers.ValidationError as e:
+                self.item_errors[index] = e.detail
+                continue
+            validated.append(attrs)
+            self.valid_indexes.append(index)
+        return validated
+
+    def create(self, validated_data) -> List[Product]:
+        """
+        Insert the new products with one bulk_create and write the changed
+        fields of the existing ones with one bulk_update per set of changed
+        fields, so no product writes back a field it did not change. Stock
+        counts of existing products go through set_stock, as reservations
+        may have taken units since. Returns the products in validated_data
+        order.
+        """
+        seller = get_request_seller(self.context['request'])
+        existing = self.context['existing']
+        # updated: changed fields -> products, stock: product_id -> new stock count
+        products, created, updated, stock = [], [], {}, {}
+        now = timezone.now()
+        for attrs in validated_data:
+            attrs = dict(attrs)
+            product_id = attrs.pop('product_id', None)
+            if product_id is None:
+                product = Product(seller_id=seller, default_category=seller.seller_category, is_active=True, **attrs)
+                created.append(product)
+            else:
+                if 'stock_quantity' in attrs:
+                    stock[product_id] = attrs.pop('stock_quantity')
+                product = existing[product_id]
+                for field, value in attrs.items():
+                    setattr(product, field, value)
+                product.updated_at = now  # auto_now is not applied by bulk_update
+                updated.setdefault(tuple(sorted(attrs)), []).append(product)
+            products.append(product)
+
+        Product.objects.bulk_create(created)
+        for fields, group in updated.items():
+            Product.objects.bulk_update(group, [*fields, 'updated_at'])
+        for product_id, quantity in stock.items():
+            set_stock(product_id, quantity)
+        return products
+
+
+class ProductBulkSerializer(ProductSerializer):
+    """
+    One item of a bulk product request: with product_id it updates that
+    product of the seller (any subset of fields), without it creates one.
+    Images are not accepted in bulk. context['existing'] maps the product
+    ids of the batch to the seller's products.
+    """
+    banner_image = None
+    banner_image_url = None
+    banner_image_variants = None
+    product_id = serializers.IntegerField(required=False, min_value=1)
+
+    CREATE_REQUIRED = ['name', 'title', 'description', 'price', 'discounted_price', 'exclusives']
+
+    class Meta(ProductSerializer.Meta):
+        fields = ['product_id', 'name', 'title', 'description', 'price', 'discounted_price',
+                  'stock_quantity', 'exclusives']
+        list_serializer_class = ProductBulkListSerializer
+
+    def validate(self, attrs):
+        product_id = attrs.get('product_id')
+        if product_id is None:
+            missing = [field for field in self.CREATE_REQUIRED if field not in attrs]
+            if missing:
+                raise serializers.ValidationError({field: ["This field is required."] for field in missing})
+            return super().validate(attrs)
+
+        product = self.context['existing'].get(product_id)
+        if product is None:
+            raise serializers.ValidationError({'product_id': [f"Product with ID {product_id} does not exist."]})
+        # Check prices as they will be saved, the unchanged one included
+        super().validate({'price': product.price, 'discounted_price': product.discounted_price, **attrs})
+        return attrs
+
+
+class HeroSectionSerializer(serializers.ModelSerializer):
+    banner_image_url = serializers.SerializerMethodField()
+    banner_image_variants = serializers.SerializerMethodField()
+
+    class Meta:
+        model = HeroSection
+        fields = ['hero_id', 'name', 'section_name', 'seller_id', 'product_id', 'priority',
+                  'banner_image_url', 'banner_image_variants']
+
+    def get_banner_image_url(self, obj: HeroSection):
+        return blob_url(obj, 'hero-banner')
+
+    def get_banner_image_variants(self, obj: HeroSection):
+        return variant_urls(obj, 'hero-banner')
+
+
+class ProductListSerializer(serializers.ModelSerializer):
+    """Read-only product card for browse listings; never touches the image columns."""
+    banner_image_url = serializers.SerializerMethodField()
+    banner_image_variants = serializers.SerializerMethodField()
+
+    # Free units, shards included, annotated by stock_reservation.with_available_stock
+    stock_quantity = serializers.IntegerField(source='available_stock', read_only=True)
+
+    # Columns the listing loads, see list_products_helper
+    LIST_FIELDS = [
+        'product_id', 'seller_id', 'name', 'title', 'price', 'discounted_price',
+        'is_active', 'category_id', 'default_category', 'created_at', 'banner_image_file',
+    ]
+
+    class Meta:
+        model = Product
+        fields = [
+            'product_id', 'seller_id', 'name', 'title', 'price', 'discounted_price', 'stock_quantity',
+            'is_active', 'category_id', 'default_category', 'created_at', 'banner_image_url',
+            'banner_image_variants',
+        ]
+        read_only_fields = fields
+
+    def get_banner_image_url(self, obj: Product):
+        return blob_url(obj, 'product-banner')
+
+    def get_banner_image_variants(self, obj: Product):
+        return variant_urls(obj, 'product-banner')
+
+
+class ProductCursorPagination:
+    """
+    Forward-only keyset pagination for product listings, keyed on the sort
+    value and product_id of the last product on the page.
+    """
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    ordering_query_param = "ordering"
+    # ordering -> sort column; product_id breaks ties in the same direction
+    orderings = {"newest": "-created_at", "price": "price", "-price": "-price"}
+    default_ordering = "newest"
+
+    def get_page_size(self, request) -> int:
+        page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        if page_size < 1:
+            raise ValueError("page_size must be a positive integer.")
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, request) -> str:
+        ordering = request.query_params.get(self.ordering_query_param, self.default_ordering)
+        if ordering not in self.orderings:
+            raise ValueError(f"ordering must be one of {', '.join(self.orderings)}.")
+        return ordering
+
+    def decode_cursor(self, request, ordering: str) -> Optional[Tuple[object, int]]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor_ordering, value, product_id = (
+                base64.urlsafe_b64decode(encoded.encode("ascii")).decode("ascii").split("|")
+            )
+            if cursor_ordering != ordering:
+                raise ValueError
+            return self.parse_value(ordering, value), int(product_id)
+        except (binascii.Error, UnicodeError, ArithmeticError, ValueError):
+            raise ValueError("Invalid cursor.")
+
+    def parse_value(self, ordering: str, value: str):
+        return datetime.fromisoformat(value) if ordering == "newest" else Decimal(value)
+
+    def encode_cursor(self, ordering: str, position: Tuple[object, int]) -> str:
+        value, product_id = position
+        value = value.isoformat() if isinstance(value, datetime) else str(value)
+        return base64.urlsafe_b64encode(f"{ordering}|{value}|{product_id}".encode("ascii")).decode("ascii")
+
+    def get_paginated_response(self, request, data, ordering: str, next_position: Optional[Tuple[object, int]]) -> Response:
+        next_url = None
+        if next_position is not None:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), self.cursor_query_param, self.encode_cursor(ordering, next_position)
+            )
+        return Response({"next": next_url, "results": data})
+
+
+class ProductSearchPagination(ProductCursorPagination):
+    """Keyset pagination over search results, keyed on the search score and product_id."""
+    orderings = {"relevance": "score"}
+    default_ordering = "relevance"
+
+    def parse_value(self, ordering: str, value: str):
+        return float(value)
+
+
+class ProductSearchResultSerializer(ProductListSerializer):
+    search_score = serializers.FloatField(read_only=True)
+
+    class Meta(ProductListSerializer.Meta):
+        fields = ProductListSerializer.Meta.fields + ['search_score']
+        read_only_fields = fields
+
+
+class CategorySearchResultSerializer(serializers.ModelSerializer):
+    image_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Category
+        fields = ['category_id', 'name', 'description', 'parent_category', 'depth', 'image_url']
+        read_only_fields = fields
+
+    def get_image_url(self, obj: Category):
+        return blob_url(obj, 'category-image')
+
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    """A buyer's hold on units of a product; requests only give the quantity, see stock_reservation."""
+    reservation_id = serializers.IntegerField(source='pk', read_only=True)
+
+    class Meta:
+        model = StockReservation
+        fields = ['reservation_id', 'product', 'quantity', 'status', 'expires_at', 'created_at']
+        read_only_fields = ['product', 'status', 'expires_at', 'created_at']
+
+    def validate_quantity(self, value: int) -> int:
+        limit = getattr(settings, 'STOCK_RESERVATION_MAX_QUANTITY', 100)
+        if not 1 <= value <= limit:
+            raise serializers.ValidationError(f"Reserve between 1 and {limit} units at a time.")
+        return value
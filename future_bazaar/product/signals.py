@@ -0,0 +1,56 @@
+from typing import Optional
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user.models import Seller
+
+from .models import Category, Product
+from .utils.category_cache import bump_category_tree_version
+from .utils.typeahead import catalog_typeahead
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_tree(sender, instance: Category, **kwargs) -> None:
+    """
+    Bump the seller's category tree version once the change is committed, so
+    a reader can never cache the old tree under the new version.
+    """
+    seller_id = instance.seller_id
+    transaction.on_commit(lambda: bump_category_tree_version(seller_id))
+
+
+def _sync_typeahead(kind: str, row_id: int, name: Optional[str], seller_id: int) -> None:
+    # Applied once committed, so suggestions never show a rolled-back name
+    if name is None:
+        transaction.on_commit(lambda: catalog_typeahead.discard(kind, row_id))
+    else:
+        transaction.on_commit(lambda: catalog_typeahead.upsert(kind, row_id, name, seller_id))
+
+
+@receiver(post_save, sender=Product)
+def update_product_typeahead(sender, instance: Product, **kwargs) -> None:
+    name = instance.name if instance.is_active else None
+    _sync_typeahead('products', instance.product_id, name, instance.seller_id_id)
+
+
+@receiver(post_save, sender=Category)
+def update_category_typeahead(sender, instance: Category, **kwargs) -> None:
+    name = instance.name if instance.is_active else None
+    _sync_typeahead('categories', instance.category_id, name, instance.seller_id)
+
+
+@receiver(post_save, sender=Seller)
+def update_seller_typeahead(sender, instance: Seller, **kwargs) -> None:
+    name = instance.business_name if instance.is_active and instance.is_approved else None
+    _sync_typeahead('sellers', instance.seller_id, name, instance.seller_id)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Seller)
+def remove_from_typeahead(sender, instance, **kwargs) -> None:
+    kind = {Product: 'products', Category: 'categories', Seller: 'sellers'}[sender]
+    _sync_typeahead(kind, instance.pk, None, None)
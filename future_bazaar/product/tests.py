@@ -1,3 +1,590 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.core.cache import cache
+from django.db import OperationalError, connection, connections
+from django.db.models import Sum
+from django.forms.models import model_to_dict
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user.models import UserModel
+from user.tests import BlobQueryAssertionsMixin, create_seller
+from .models import CatalogImport, Category, Product, ProductImage, StockReservation, StockShard
+from .utils.catalog_export import PRODUCT_COLUMNS, product_records
+from .utils.catalog_import import CatalogImporter, CatalogReader
+from .utils.category_tree import MAX_LEVELS
+from .utils.product_search import search_backend, search_products
+from .utils.stock_reservation import (InsufficientStock, available_stock, commit_reservation, release_expired_reservations,
+                                      release_reservation, reserve_stock, set_stock_shards)
+from .utils.typeahead import catalog_typeahead
+
+
+def create_product(seller, index: int = 0, **fields) -> Product:
+    fields = {
+        'name': f"Teak chair {index}", 'title': 'Teak chair', 'description': 'Solid teak', 'price': Decimal('100.00'),
+        'discounted_price': Decimal('90.00'), 'exclusives': 'none', 'default_category': 'furniture', **fields,
+    }
+    return Product.objects.create(seller_id=seller, **fields)
+
+
+class CategoryImageUrlTests(TestCase):
+    def setUp(self):
+        self.seller = create_seller()
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller.user_id)
+
+    def get_image_url(self, category: Category):
+        response = self.client.get(f'/product/category/{category.pk}/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['data']['image_url']
+
+    def test_category_without_image_has_no_url(self):
+        category = Category.objects.create(seller=self.seller, name='Chairs')
+        self.assertIsNone(self.get_image_url(category))
+
+    def test_legacy_image_is_served_without_loading_it(self):
+        category = Category.objects.create(seller=self.seller, name='Tables', image=b'legacy image bytes')
+        self.assertEqual(self.get_image_url(category), f'/blobs/category-image/{category.pk}/')
+
+
+class ProductBlobDeferringTests(BlobQueryAssertionsMixin, TestCase):
+    def setUp(self):
+        self.seller = create_seller(shop_photo=b'legacy photo bytes')
+        parent = Category.objects.create(seller=self.seller, name='Furniture', image=b'legacy image bytes')
+        category = Category.objects.create(seller=self.seller, name='Chairs', parent_category=parent,
+                                           image=b'legacy image bytes')
+        for index in range(3):
+            product = create_product(self.seller, index, category_id=category, banner_image=b'legacy banner bytes')
+            ProductImage.objects.create(product=product, image=b'legacy image bytes')
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller.user_id)
+
+    def get_listed(self, url: str, params: dict = None):
+        response = self.assertLoadsNoBlobs(self.client.get, url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_browse_and_search_load_no_blobs(self):
+        self.assertEqual(len(self.get_listed('/product/products/')['results']), 3)
+        self.assertEqual(len(self.get_listed('/product/products/', {'seller': self.seller.seller_id})['results']), 3)
+        self.assertEqual(len(self.get_listed('/product/products/search/', {'q': 'teak'})['results']), 3)
+
+    def test_category_lists_load_no_blobs(self):
+        tree = self.get_listed('/product/categories/hierarchical/')
+        self.assertEqual([category['name'] for category in tree], ['Furniture'])
+        self.assertTrue(self.get_listed('/product/categories/search/', {'q': 'chairs'})['results'])
+
+
+class CategoryNestingTests(TestCase):
+    def setUp(self):
+        self.seller = create_seller()
+
+    def create_chain(self, levels: int, parent=None) -> list:
+        chain = []
+        for level in range(levels):
+            parent = Category.objects.create(seller=self.seller, name=f"Level {level}", parent_category=parent)
+            chain.append(parent)
+        return chain
+
+    def test_categories_nest_up_to_the_path_length(self):
+        deepest = self.create_chain(MAX_LEVELS)[-1]
+        deepest.refresh_from_db()
+        self.assertEqual(deepest.depth, MAX_LEVELS - 1)
+        self.assertEqual(len(deepest.get_ancestors()), MAX_LEVELS - 1)
+
+        with self.assertRaises(ValueError):
+            Category.objects.create(seller=self.seller, name='Too deep', parent_category=deepest)
+        self.assertFalse(Category.objects.filter(name='Too deep').exists())
+
+    def test_moving_a_subtree_too_deep_is_rejected(self):
+        chain = self.create_chain(MAX_LEVELS - 1)
+        subtree = self.create_chain(2)
+        client = APIClient()
+        client.force_authenticate(self.seller.user_id)
+
+        response = client.put(f'/product/category/update/{subtree[0].pk}/', {'parent_category': chain[-1].pk})
+        self.assertEqual(response.status_code, 400, response.data)
+        subtree[0].refresh_from_db()
+        self.assertIsNone(subtree[0].parent_category_id)
+
+        subtree[0].parent_category = chain[-2]
+        subtree[0].save()
+        subtree[1].refresh_from_db()
+        self.assertEqual(subtree[1].depth, MAX_LEVELS - 1)
+
+
+class SellerContextQueryTests(TestCase):
+    """Seller views resolve the seller once per request, shared by the decorator, helpers and serializers."""
+
+    def setUp(self):
+        cache.clear()
+        self.seller = create_seller()
+        self.category = Category.objects.create(seller=self.seller, name='Chairs')
+
+    def update_category(self, client: APIClient, name: str) -> list:
+        with CaptureQueriesContext(connection) as queries:
+            response = client.put(f'/product/category/update/{self.category.pk}/', {'name': name})
+        self.assertEqual(response.status_code, 200, response.data)
+        return [query['sql'] for query in queries if '"seller"' in query['sql']]
+
+    def test_seller_is_loaded_once_with_the_user(self):
+        client = APIClient()
+        client.force_authenticate(UserModel.objects.get(pk=self.seller.user_id_id))
+        self.assertEqual(len(self.update_category(client, 'Seats')), 1)
+
+    def test_token_auth_preloads_the_seller(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.seller.user_id).access_token}')
+        # The user snapshot is loaded with its seller profile in one query, then cached
+        seller_queries = self.update_category(client, 'Seats')
+        self.assertEqual(len(seller_queries), 1)
+        self.assertIn('JOIN "seller"', seller_queries[0])
+
+        # Category lookup, name check and update; nothing for the user or seller
+        with self.assertNumQueries(3):
+            self.update_category(client, 'Stools')
+        with self.assertNumQueries(1):
+            response = client.get('/product/categories/hierarchical/')
+        self.assertEqual([category['name'] for category in response.data], ['Stools'])
+
+
+class ProductPaginationTests(TestCase):
+    def setUp(self):
+        seller = create_seller()
+        prices = ['50.00', '20.00', '20.00', '75.50', '20.00', '10.00', '99.99']
+        descriptions = ['Solid teak', 'Teak and cane', 'Teak', 'Oak', 'Teak, teak and more teak', 'Teak', 'Pine']
+        self.products = [create_product(seller, index, name=f"Chair {index}", title='Chair', price=Decimal(price),
+                                        description=description)
+                         for index, (price, description) in enumerate(zip(prices, descriptions))]
+        # Ties on every sort key, which the cursor has to break by product_id
+        Product.objects.filter(pk__in=[product.pk for product in self.products[:4]]) \
+            .update(created_at=self.products[0].created_at)
+        self.client = APIClient()
+
+    def walk(self, url: str, params: dict, page_size: int = 2) -> list:
+        """Product ids of every page, following the next links."""
+        ids = []
+        response = self.client.get(url, {**params, 'page_size': page_size})
+        while True:
+            self.assertEqual(response.status_code, 200, response.data)
+            self.assertLessEqual(len(response.data['results']), page_size)
+            ids.extend(item['product_id'] for item in response.data['results'])
+            if response.data['next'] is None:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def test_browse_cursors_visit_every_product_once_in_order(self):
+        products = Product.objects.order_by('pk')
+        expected = {
+            'newest': [product.pk for product in sorted(products, key=lambda p: (p.created_at, p.pk), reverse=True)],
+            'price': [product.pk for product in sorted(products, key=lambda p: (p.price, p.pk))],
+            '-price': [product.pk for product in sorted(products, key=lambda p: (p.price, p.pk), reverse=True)],
+        }
+        for ordering, ids in expected.items():
+            with self.subTest(ordering=ordering):
+                self.assertEqual(self.walk('/product/products/', {'ordering': ordering}), ids)
+
+    def test_search_cursors_match_a_single_page(self):
+        ranked = self.walk('/product/products/search/', {'q': 'teak'}, page_size=100)
+        self.assertEqual(len(ranked), 5)
+        self.assertEqual(self.walk('/product/products/search/', {'q': 'teak'}), ranked)
+        # Equal scores are broken by product_id too
+        self.assertLess(ranked.index(self.products[2].pk), ranked.index(self.products[5].pk))
+
+    def test_foreign_or_broken_cursors_are_rejected(self):
+        first_page = self.client.get('/product/products/', {'ordering': 'price', 'page_size': 2})
+        cursor = first_page.data['next'].split('cursor=')[1].split('&')[0]
+        for params in ({'ordering': 'newest', 'cursor': cursor}, {'cursor': 'not-a-cursor'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/product/products/', params).status_code, 400)
+        response = self.client.get('/product/products/search/', {'q': 'teak', 'cursor': cursor})
+        self.assertEqual(response.status_code, 400)
+
+
+class ProductSearchCandidateTests(TestCase):
+    def setUp(self):
+        seller = create_seller()
+        # The best match is the oldest: 'walnut' in the name outweighs it in the description
+        self.oldest = create_product(seller, name='Walnut stool', title='Stool', description='Stool')
+        self.newer = [create_product(seller, index, name=f"Chair {index}", title='Chair', description='Walnut legs')
+                      for index in range(3)]
+
+    def search(self) -> list:
+        products, _ = search_products('walnut')
+        return [product.pk for product in products]
+
+    def test_matches_within_the_cap_are_all_ranked(self):
+        self.assertEqual(search_backend(), 'fts5')
+        for max_candidates in (4, None):
+            with self.subTest(max_candidates=max_candidates), \
+                    override_settings(PRODUCT_SEARCH_MAX_CANDIDATES=max_candidates):
+                self.assertEqual(self.search()[0], self.oldest.pk)
+
+    @override_settings(PRODUCT_SEARCH_MAX_CANDIDATES=3)
+    def test_only_the_newest_matches_are_ranked_over_the_cap(self):
+        self.assertEqual(sorted(self.search()), [product.pk for product in self.newer])
+
+
+class TypeaheadTests(TransactionTestCase):
+    """Committed rows, as the indexes are built in a background thread and patched on commit."""
+
+    def setUp(self):
+        catalog_typeahead.clear()
+        self.addCleanup(catalog_typeahead.clear)
+        self.seller = create_seller(business_name='Teak House')
+        self.client = APIClient()
+
+    def suggest(self, prefix: str, **params) -> dict:
+        response = self.client.get('/product/typeahead/', {'q': prefix, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return {kind: [match['name'] for match in matches] for kind, matches in response.data.items()}
+
+    def test_lookups_wait_for_the_build_warm_started(self):
+        create_product(self.seller, name='Teak chair')
+        with mock.patch.object(catalog_typeahead, 'rebuild', wraps=catalog_typeahead.rebuild) as rebuild:
+            catalog_typeahead.warm()
+            self.assertEqual(self.suggest('tea'), {
+                'products': ['Teak chair'], 'categories': [], 'sellers': ['Teak House'],
+            })
+        self.assertEqual(rebuild.call_count, 1)
+
+    def test_saves_and_deletes_are_visible_without_a_rebuild(self):
+        create_product(self.seller, name='Teak chair')
+        catalog_typeahead.rebuild()
+        self.assertEqual(self.suggest('tea')['products'], ['Teak chair'])
+        built_at = catalog_typeahead._built_at
+
+        table = create_product(self.seller, 1, name='Teak table')
+        Category.objects.create(seller=self.seller, name='Teakwood')
+        other_seller = create_seller(1)
+        create_product(other_seller, 2, name='Teak stool')
+        self.assertEqual(self.suggest('tea'), {
+            'products': ['Teak chair', 'Teak stool', 'Teak table'], 'categories': ['Teakwood'],
+            'sellers': ['Teak House'],
+        })
+        self.assertEqual(self.suggest('tea', seller=self.seller.seller_id), {
+            'products': ['Teak chair', 'Teak table'], 'categories': ['Teakwood'],
+        })
+
+        table.name = 'Oak table'
+        table.save()
+        self.assertEqual(self.suggest('tea')['products'], ['Teak chair', 'Teak stool'])
+        self.assertEqual(self.suggest('oak')['products'], ['Oak table'])
+
+        table.delete()
+        Product.objects.get(name='Teak stool').delete()
+        self.seller.is_active = False
+        self.seller.save()
+        self.assertEqual(self.suggest('oak')['products'], [])
+        self.assertEqual(self.suggest('tea'), {'products': ['Teak chair'], 'categories': ['Teakwood'], 'sellers': []})
+        self.assertEqual(catalog_typeahead._built_at, built_at)
+
+
+class BulkSaveProductsTests(TestCase):
+    def setUp(self):
+        self.seller = create_seller()
+        self.chair = create_product(self.seller, name='Chair', price=Decimal('100.00'))
+        self.table = create_product(self.seller, name='Table', price=Decimal('300.00'),
+                                    discounted_price=Decimal('250.00'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller.user_id)
+
+    def save(self, items: list, **params):
+        url = '/product/products/bulk/' + (f"?atomic={params['atomic']}" if 'atomic' in params else '')
+        return self.client.post(url, {'products': items}, format='json')
+
+    new_product = {'name': 'Stool', 'title': 'Stool', 'description': 'Pine', 'price': '40.00',
+                   'discounted_price': '35.00', 'exclusives': 'none'}
+
+    def test_partial_failure_writes_the_valid_items(self):
+        response = self.save([
+            self.new_product,
+            {'name': 'Bench'},  # Missing fields
+            {'product_id': self.chair.pk, 'name': 'Armchair'},
+            {'product_id': self.table.pk, 'discounted_price': '400.00'},  # Above the price
+        ])
+        self.assertEqual(response.status_code, 207, response.data)
+        self.assertEqual([result['status'] for result in response.data['results']],
+                         ['created', 'failed', 'updated', 'failed'])
+        self.assertIn('title', response.data['results'][1]['errors'])
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['failed']), (1, 1, 2))
+
+        self.assertTrue(Product.objects.filter(pk=response.data['results'][0]['product_id'], name='Stool').exists())
+        self.assertEqual(Product.objects.get(pk=self.chair.pk).name, 'Armchair')
+        self.assertEqual(Product.objects.get(pk=self.table.pk).discounted_price, Decimal('250.00'))
+        self.assertFalse(Product.objects.filter(name='Bench').exists())
+
+    def test_atomic_batch_with_a_failure_writes_nothing(self):
+        response = self.save([self.new_product, {'product_id': self.chair.pk, 'name': 'Armchair'},
+                              {'product_id': 999999, 'name': 'Ghost'}], atomic='true')
+        self.assertEqual(response.status_code, 400, response.data)
+        self.assertEqual([result['status'] for result in response.data['results']], ['skipped', 'skipped', 'failed'])
+        self.assertFalse(Product.objects.filter(name__in=['Stool', 'Armchair']).exists())
+
+        response = self.save([self.new_product, {'product_id': self.chair.pk, 'name': 'Armchair'}], atomic='true')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(Product.objects.filter(name__in=['Stool', 'Armchair']).count(), 2)
+
+    def test_updates_only_write_the_fields_each_item_sets(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.save([
+                {'product_id': self.chair.pk, 'name': 'Armchair'},
+                {'product_id': self.table.pk, 'price': '320.00'},
+            ])
+        self.assertEqual(response.status_code, 200, response.data)
+
+        statements = [query['sql'] for query in queries]
+        self.assertEqual(len([sql for sql in statements if sql.startswith('SELECT') and 'FROM "product"' in sql]), 1)
+        updates = [sql for sql in statements if sql.startswith('UPDATE "product"')]
+        self.assertEqual(sorted('"name"' in sql for sql in updates), [False, True])
+        for sql in updates:  # One UPDATE per field set, writing name or price, never both
+            self.assertNotEqual('"name"' in sql, '"price"' in sql)
+            self.assertNotIn('"title"', sql)
+
+        self.assertEqual(Product.objects.get(pk=self.chair.pk).price, Decimal('100.00'))
+        self.assertEqual(Product.objects.get(pk=self.table.pk).name, 'Table')
+
+
+class CatalogImportResumeTests(TestCase):
+    # Row 3 spans two lines, row 4 is rejected
+    CSV = (
+        'name,title,description,price,discounted_price,exclusives\n'
+        'Chair,Chair,Oak,100,90,none\n'
+        'Table,Table,Oak,300,250,none\n'
+        'Stool,Stool,"Pine,\nthree legs",40,35,none\n'
+        'Bench,Bench,Pine,50,80,none\n'
+        'Shelf,Shelf,Birch,70,60,none\n'
+    )
+
+    def setUp(self):
+        self.seller = create_seller()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'catalog.csv')
+        with open(self.path, 'w', newline='') as catalog:
+            catalog.write(self.CSV)
+
+    def run_import(self) -> tuple:
+        importer = CatalogImporter(self.seller, self.path, chunk_size=2, variants=False)
+        return importer, list(importer.run())
+
+    def test_interrupted_chunk_is_imported_again_on_resume(self):
+        # The second chunk fails inside its transaction, after its products were inserted
+        with mock.patch.object(ProductImage.objects, 'bulk_create', side_effect=[[], RuntimeError('interrupted')]):
+            with self.assertRaises(RuntimeError):
+                self.run_import()
+        self.assertEqual(sorted(Product.objects.values_list('name', flat=True)), ['Chair', 'Table'])
+        checkpoint = CatalogImport.objects.get(seller=self.seller)
+        self.assertEqual((checkpoint.line, checkpoint.products_created, checkpoint.completed_at), (3, 2, None))
+
+        importer, rejected = self.run_import()
+        self.assertEqual(importer.resumed_at, checkpoint.offset)
+        self.assertEqual([(entry['line'], entry['name']) for entry in rejected], [(6, 'Bench')])
+        self.assertEqual(sorted(Product.objects.values_list('name', flat=True)), ['Chair', 'Shelf', 'Stool', 'Table'])
+        self.assertEqual(Product.objects.get(name='Stool').description, 'Pine,\nthree legs')
+        checkpoint.refresh_from_db()
+        self.assertEqual((checkpoint.products_created, checkpoint.rows_rejected), (4, 1))
+        self.assertIsNotNone(checkpoint.completed_at)
+
+        importer, rejected = self.run_import()
+        self.assertTrue(importer.already_imported)
+        self.assertEqual(Product.objects.count(), 4)
+
+
+@override_settings(CATALOG_EXPORT_CHUNK_SIZE=1)
+class CatalogExportTests(TestCase):
+    def setUp(self):
+        self.seller = create_seller()
+        parent = Category.objects.create(seller=self.seller, name='Living, dining')
+        child = Category.objects.create(seller=self.seller, name='Chairs', parent_category=parent)
+        chair = create_product(self.seller, name='Chair, "Café" ☕', description='Solid teak,\nhand finished',
+                               category_id=child)
+        for digest in ('a' * 64, 'b' * 64):
+            ProductImage.objects.create(product=chair, image_file=digest)
+        create_product(self.seller, 1, is_active=False)
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller.user_id)
+
+    def export(self, file_format: str, compress: bool = False) -> bytes:
+        # Flushing after every row splits the output into many pieces
+        with mock.patch('product.utils.catalog_export.FLUSH_BYTES', 1):
+            response = self.client.get('/product/catalog/export/', {'file_format': file_format,
+                                                                    'gzip': 'true' if compress else ''})
+            self.assertEqual(response.status_code, 200)
+            content = b''.join(response.streaming_content)
+        return gzip.decompress(content) if compress else content
+
+    def expected(self) -> list:
+        return list(product_records(self.seller, chunk_size=100, base_url='http://testserver'))
+
+    def test_json_lines_parse_back_to_the_records(self):
+        content = self.export('jsonl')
+        self.assertEqual([json.loads(line) for line in content.decode().splitlines()], self.expected())
+        self.assertEqual(self.export('jsonl', compress=True), content)
+
+    def test_csv_parses_back_to_the_records(self):
+        content = self.export('csv')
+        rows = list(csv.DictReader(io.StringIO(content.decode(), newline='')))
+        self.assertEqual(rows, [
+            {column: '|'.join(value) if isinstance(value, list) else str(value) for column, value in record.items()}
+            for record in self.expected()
+        ])
+        self.assertEqual(list(rows[0]), PRODUCT_COLUMNS)
+        self.assertEqual(self.export('csv', compress=True), content)
+
+        # What import_catalog reads back, line breaks in quoted cells included
+        [(_, first, error), (line, second, _)] = CatalogReader(io.BytesIO(content), 'csv')
+        self.assertIsNone(error)
+        self.assertEqual((first['name'], first['description'], first['category']),
+                         ('Chair, "Café" ☕', 'Solid teak,\nhand finished', 'Living, dining/Chairs'))
+        self.assertEqual(len(first['images']), 2)
+        self.assertEqual(first['images'], self.expected()[0]['images'])
+        self.assertEqual((line, second['name']), (4, 'Teak chair 1'))
+
+
+class ShardedStockTests(TestCase):
+    def setUp(self):
+        self.seller = create_seller()
+        self.product = create_product(self.seller, stock_quantity=10)
+        set_stock_shards(self.product.pk, 4)
+        self.reservation = reserve_stock(self.product.pk, self.seller.user_id, 3)
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller.user_id)
+
+    def test_reads_include_the_shards(self):
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock_quantity, 0)
+        response = self.client.get('/product/products/')
+        self.assertEqual(response.data['results'][0]['stock_quantity'], 7)
+        response = self.client.get('/product/catalog/export/', {'file_format': 'jsonl'})
+        self.assertEqual(json.loads(b''.join(response.streaming_content))['stock_quantity'], 7)
+
+    def test_bulk_stock_count_keeps_reservations_and_shards(self):
+        response = self.client.post('/product/products/bulk/', {'products': [
+            {'product_id': self.product.pk, 'stock_quantity': 20},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(available_stock(self.product.pk), 20)
+        self.assertEqual(StockShard.objects.filter(product=self.product).count(), 4)
+
+        release_reservation(self.reservation.pk, self.seller.user_id)
+        self.assertEqual(available_stock(self.product.pk), 23)
+
+    def save_in_admin(self, **changes):
+        """Load the product's change form, apply `changes` and save it, like the admin does on submit."""
+        product_admin = admin.site._registry[Product]
+        request = RequestFactory().post('/')
+        request.user = UserModel.objects.get_or_create(email='admin@example.com', defaults={
+            'contact_number': '7000000000', 'first_name': 'Site', 'last_name': 'Admin', 'user_type': 'admin',
+            'is_staff': True, 'is_superuser': True,
+        })[0]
+        product = product_admin.get_object(request, str(self.product.pk))
+        loaded = {field: value for field, value in model_to_dict(product).items() if value is not None}
+        form = product_admin.get_form(request, product, change=True)(data={**loaded, **changes}, instance=product)
+        self.assertTrue(form.is_valid(), form.errors)
+        return loaded, lambda: product_admin.save_model(request, form.save(commit=False), form, change=True)
+
+    def test_admin_save_does_not_write_back_the_stock(self):
+        loaded, save = self.save_in_admin(name='Oak chair')
+        self.assertEqual(loaded['stock_quantity'], 7)
+        reserve_stock(self.product.pk, self.seller.user_id, 2)  # A buyer, while the form is open
+        save()
+        self.assertEqual(Product.objects.get(pk=self.product.pk).name, 'Oak chair')
+        self.assertEqual(available_stock(self.product.pk), 5)
+
+        _, save = self.save_in_admin(stock_quantity=12)
+        save()
+        self.assertEqual(available_stock(self.product.pk), 12)
+        self.assertEqual(StockShard.objects.filter(product=self.product).count(), 4)
+
+
+class StockReservationStressTests(TransactionTestCase):
+    """Committed rows, as every buyer reserves from its own thread and connection."""
+    THREADS = 8
+    STOCK = 60
+
+    def setUp(self):
+        seller = create_seller()
+        self.product = create_product(seller, stock_quantity=self.STOCK)
+        self.buyers = [
+            UserModel.objects.create(email=f"buyer{index}@example.com", contact_number=f"80000{index:05d}",
+                                     first_name='Buyer', last_name=str(index), user_type='end_user')
+            for index in range(self.THREADS)
+        ]
+
+    def reserve_until_sold_out(self) -> int:
+        """Every thread reserves, then commits, releases or holds, until nothing is free. Returns units sold."""
+        product_id, start, sold, lock = self.product.pk, threading.Barrier(self.THREADS), [], threading.Lock()
+
+        def step(buyer, rng) -> int:
+            quantity = rng.choice((1, 1, 2, 3))
+            try:
+                reservation = reserve_stock(product_id, buyer, quantity)
+            except InsufficientStock:
+                return 0 if available_stock(product_id) else -1
+            outcome = rng.random()
+            if outcome < 0.6:
+                commit_reservation(reservation.pk, buyer)
+                return quantity
+            if outcome < 0.8:
+                release_reservation(reservation.pk, buyer)
+            return 0
+
+        def buy(buyer):
+            rng, units = random.Random(buyer.pk), 0
+            start.wait()
+            try:
+                while True:
+                    try:
+                        bought = step(buyer, rng)
+                    except OperationalError:
+                        continue  # The in-memory test database locks whole tables, retry
+                    if bought < 0:
+                        break
+                    units += bought
+                with lock:
+                    sold.append(units)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=buy, args=(buyer,)) for buyer in self.buyers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(sold), self.THREADS, "A buyer thread failed")
+        return sum(sold)
+
+    def assertStockConserved(self, sold: int):
+        reservations = StockReservation.objects.filter(product=self.product)
+        committed = reservations.filter(status=StockReservation.COMMITTED).aggregate(units=Sum('quantity'))['units']
+        pending = reservations.filter(status=StockReservation.PENDING).aggregate(units=Sum('quantity'))['units'] or 0
+        self.assertEqual(committed, sold)
+        self.assertEqual(available_stock(self.product.pk), 0)
+        self.assertEqual(committed + pending, self.STOCK)
+        self.assertFalse(StockShard.objects.filter(quantity__lt=0).exists())
+
+        reservations.filter(status=StockReservation.PENDING).update(expires_at=timezone.now() - timedelta(seconds=1))
+        release_expired_reservations(product_id=self.product.pk)
+        self.assertEqual(available_stock(self.product.pk), self.STOCK - committed)
+
+    def test_concurrent_buyers_never_oversell_one_row(self):
+        self.assertStockConserved(self.reserve_until_sold_out())
+
+    def test_concurrent_buyers_never_oversell_across_shards(self):
+        set_stock_shards(self.product.pk, 4)
+        self.assertStockConserved(self.reserve_until_sold_out())
@@ -1,6 +1,9 @@
 from django.urls import path
 from .views import create_category,get_category,update_category,delete_category,get_categories_with_children
 from .views import create_category,get_category,update_category,delete_category, create_product
+from .views import get_category_breadcrumbs, list_products, product_search, category_search, typeahead, bulk_save_products
+from .views import export_catalog_view
+from .views import reserve_product_stock, commit_stock_reservation, release_stock_reservation, shard_product_stock
 
 urlpatterns = [
     path('category/', create_category, name='create_category'),
@@ -8,5 +11,17 @@ urlpatterns = [
     path('category/update/<int:category_id>/', update_category, name='update_category'),
     path('category/<int:category_id>/delete/', delete_category, name='delete_category'),
     path('categories/hierarchical/', get_categories_with_children, name='categories-hierarchical'),
+    path('category/<int:category_id>/breadcrumbs/', get_category_breadcrumbs, name='category-breadcrumbs'),
     path('product/create/', create_product, name='create_product'),
+    path('products/bulk/', bulk_save_products, name='bulk_save_products'),
+    path('products/', list_products, name='list_products'),
+    path('products/search/', product_search, name='product_search'),
+    path('categories/search/', category_search, name='category_search'),
+    path('typeahead/', typeahead, name='typeahead'),
+    path('catalog/export/', export_catalog_view, name='export_catalog'),
+    path('products/<int:product_id>/stock/reservations/', reserve_product_stock, name='reserve_product_stock'),
+    path('products/<int:product_id>/stock/shards/', shard_product_stock, name='shard_product_stock'),
+    path('stock/reservations/<int:reservation_id>/commit/', commit_stock_reservation, name='commit_stock_reservation'),
+    path('stock/reservations/<int:reservation_id>/release/', release_stock_reservation,
+         name='release_stock_reservation'),
 ]
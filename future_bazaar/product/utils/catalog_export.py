@@ -0,0 +1,178 @@
+import csv
+import io
+import json
+import zlib
+from collections import defaultdict
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+
+from blobstore.utils import source_image_url, stored_blob_url
+from ..models import Category, Product, ProductImage
+from .catalog_import import CSV_LIST_SEPARATOR
+from .stock_reservation import with_available_stock
+
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+EXPORT_KINDS = ('products', 'categories')
+
+# Columns in the order written; the product ones are what import_catalog reads back
+PRODUCT_COLUMNS = [
+    'product_id', 'name', 'title', 'description', 'price', 'discounted_price', 'stock_quantity', 'exclusives',
+    'is_active', 'category', 'default_category', 'banner_image', 'images', 'created_at', 'updated_at',
+]
+CATEGORY_COLUMNS = ['category_id', 'name', 'path', 'description', 'parent_category_id', 'depth', 'is_active',
+                    'image', 'created_at']
+
+# Bytes gathered before handing a piece of the export to the response
+FLUSH_BYTES = 64 * 1024
+
+
+def category_paths(seller) -> Dict[int, str]:
+    """Map each category id of `seller` to its 'Parent/Child' path of names, in one query."""
+    rows = {category_id: (name, parent_id) for category_id, name, parent_id in
+            Category.objects.filter(seller=seller).values_list('category_id', 'name', 'parent_category_id')}
+    paths = {}
+
+    def path(category_id):
+        if category_id not in paths:
+            name, parent_id = rows[category_id]
+            paths[category_id] = f"{path(parent_id)}/{name}" if parent_id in rows else name
+        return paths[category_id]
+
+    for category_id in rows:
+        path(category_id)
+    return paths
+
+
+def _image_url(source_name: str, pk: int, name: str, has_legacy: bool, base_url: str = '') -> str:
+    if name:
+        return base_url + stored_blob_url(name)
+    return base_url + source_image_url(source_name, pk) if has_legacy else ''
+
+
+def product_records(seller, chunk_size: int, base_url: str = '') -> Iterator[dict]:
+    paths = category_paths(seller)
+    # Plain rows rather than instances: model and file field set-up would dominate the export
+    rows = (
+        with_available_stock(Product.objects.filter(seller_id=seller))
+        .order_by('product_id')
+        .values_list('product_id', 'name', 'title', 'description', 'price', 'discounted_price', 'available_stock',
+                     'exclusives', 'is_active', 'category_id', 'default_category', 'banner_image_file', 'has_banner_image',
+                     'created_at', 'updated_at')
+        .iterator(chunk_size=chunk_size)
+    )
+    while batch := list(islice(rows, chunk_size)):
+        # Gallery images of the whole batch in one query
+        images = defaultdict(list)
+        for image_id, product_id, name, has_legacy in (
+            ProductImage.objects.filter(product_id__in=[row[0] for row in batch])
+            .order_by('id')
+            .values_list('id', 'product', 'image_file', 'has_image')
+        ):
+            url = _image_url('product-image', image_id, name, has_legacy, base_url)
+            if url:
+                images[product_id].append(url)
+
+        for (product_id, name, title, description, price, discounted_price, available_stock, exclusives, is_active,
+             category_id, default_category, banner_name, banner_legacy, created_at, updated_at) in batch:
+            yield {
+                'product_id': product_id,
+                'name': name,
+                'title': title,
+                'description': description,
+                'price': str(price),
+                'discounted_price': str(discounted_price),
+                'stock_quantity': available_stock,  # Shards included
+                'exclusives': exclusives,
+                'is_active': is_active,
+                'category': paths.get(category_id, ''),
+                'default_category': default_category,
+                'banner_image': _image_url('product-banner', product_id, banner_name, banner_legacy, base_url),
+                'images': images.get(product_id, []),
+                'created_at': created_at.isoformat(),
+                'updated_at': updated_at.isoformat(),
+            }
+
+
+def category_records(seller, chunk_size: int, base_url: str = '') -> Iterator[dict]:
+    paths = category_paths(seller)
+    categories = (
+        Category.objects.filter(seller=seller)
+        .order_by('path')  # Parents before their children
+    )
+    for category in categories.iterator(chunk_size=chunk_size):
+        yield {
+            'category_id': category.category_id,
+            'name': category.name,
+            'path': paths.get(category.category_id, category.name),
+            'description': category.description or '',
+            'parent_category_id': category.parent_category_id,
+            'depth': category.depth,
+            'is_active': category.is_active,
+            'image': _image_url('category-image', category.category_id, category.image_file.name, category.has_image,
+                                base_url),
+            'created_at': category.created_at.isoformat(),
+        }
+
+
+def _csv_lines(records: Iterable[dict], columns: List[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for record in records:
+        writer.writerow([
+            CSV_LIST_SEPARATOR.join(value) if isinstance(value, list) else '' if value is None else value
+            for value in (record[column] for column in columns)
+        ])
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _jsonl_lines(records: Iterable[dict]) -> Iterator[str]:
+    pieces, size = [], 0
+    for record in records:
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        pieces.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield ''.join(pieces)
+            pieces, size = [], 0
+    yield ''.join(pieces)
+
+
+def _gzip(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 16 + 15: gzip framing
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_catalog(seller, kind: str = 'products', fmt: str = 'csv', compress: bool = False,
+                   chunk_size: Optional[int] = None, base_url: str = '') -> Iterator[bytes]:
+    """
+    Stream a seller's products or categories as CSV (with a header row) or
+    JSON Lines bytes, optionally gzipped. Rows are read with
+    QuerySet.iterator() in chunks of `chunk_size` with the image columns
+    left out, so memory stays flat however large the catalog is. Image URLs
+    are prefixed with `base_url` ('https://host'), which makes them
+    fetchable by import_catalog.
+    """
+    chunk_size = chunk_size or getattr(settings, 'CATALOG_EXPORT_CHUNK_SIZE', 2000)
+    if kind == 'products':
+        records, columns = product_records(seller, chunk_size, base_url), PRODUCT_COLUMNS
+    else:
+        records, columns = category_records(seller, chunk_size, base_url), CATEGORY_COLUMNS
+    lines = _csv_lines(records, columns) if fmt == 'csv' else _jsonl_lines(records)
+    chunks = (text.encode('utf-8') for text in lines if text)
+    return _gzip(chunks) if compress else chunks
+
+
+def export_file_name(seller, kind: str, fmt: str, compress: bool) -> str:
+    return f"seller-{seller.seller_id}-{kind}.{fmt}{'.gz' if compress else ''}"
@@ -0,0 +1,324 @@
+import csv
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.files import File
+from django.db import reset_queries, transaction
+from django.utils import timezone
+from PIL import Image
+from rest_framework import serializers
+
+from blobstore.storage import get_blob_storage
+from blobstore.variants import has_variants, schedule_variants
+from user.utils.user_import import detect_import_format
+from ..models import CatalogImport, Category, Product, ProductImage
+
+
+logger = logging.getLogger(__name__)
+
+# Separates image references in a CSV cell; JSON Lines rows use a list
+CSV_LIST_SEPARATOR = '|'
+FINGERPRINT_BYTES = 1024 * 1024
+
+
+def file_fingerprint(path: str) -> str:
+    """Identify a file by its size and first megabyte, without reading all of it."""
+    digest = hashlib.sha256(str(os.path.getsize(path)).encode())
+    with open(path, 'rb') as source:
+        digest.update(source.read(FINGERPRINT_BYTES))
+    return digest.hexdigest()
+
+
+class CatalogReader:
+    """
+    Stream (line number, row, parse error) from a binary CSV (with a header
+    row) or JSON Lines file, starting at byte `offset`. After each row,
+    `offset` and `line` point just past it, so a checkpoint taken there can
+    resume without re-reading what came before.
+    """
+
+    def __init__(self, stream, fmt: str, offset: int = 0, line: int = 0, header: Optional[List[str]] = None):
+        self.stream = stream
+        self.fmt = fmt
+        self.offset = offset
+        self.line = line
+        self.header = header
+
+    def _lines(self) -> Iterator[str]:
+        self.stream.seek(self.offset)
+        for raw in self.stream:
+            encoding = 'utf-8-sig' if self.offset == 0 else 'utf-8'
+            self.offset += len(raw)
+            self.line += 1
+            yield raw.decode(encoding)
+
+    def __iter__(self) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+        if self.fmt == 'csv':
+            yield from self._csv_rows()
+            return
+        for text in self._lines():
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as e:
+                yield self.line, None, f"Invalid JSON: {e}"
+                continue
+            if isinstance(row, dict):
+                yield self.line, row, None
+            else:
+                yield self.line, None, "Each line must be a JSON object."
+
+    def _csv_rows(self):
+        # csv.reader pulls one line at a time, so after each row the offset is
+        # exactly past it, quoted line breaks included
+        reader = csv.reader(self._lines())
+        if self.header is None:
+            self.header = next(reader, None) or []
+        for values in reader:
+            if not any(values):
+                continue
+            row = {key: value for key, value in zip(self.header, values) if key and value != ''}
+            if 'images' in row:
+                row['images'] = [ref.strip() for ref in row['images'].split(CSV_LIST_SEPARATOR) if ref.strip()]
+            yield self.line, row, None
+
+
+class CatalogRowSerializer(serializers.ModelSerializer):
+    """
+    Validates one catalog row like product creation does. `category` is a
+    category name or a path of names separated by '/', `banner_image` and
+    `images` are local paths (relative to the image root) or http(s) URLs.
+    """
+    category = serializers.CharField(required=False, max_length=1000)
+    banner_image = serializers.CharField(required=False, max_length=2000)
+    images = serializers.ListField(child=serializers.CharField(max_length=2000), required=False, max_length=20)
+
+    class Meta:
+        model = Product
+        fields = ['name', 'title', 'description', 'price', 'discounted_price', 'stock_quantity', 'exclusives',
+                  'category', 'banner_image', 'images']
+
+    def validate(self, attrs):
+        if attrs.get('discounted_price') and attrs['discounted_price'] > attrs['price']:
+            raise serializers.ValidationError("Discounted price cannot be higher than the price.")
+        return attrs
+
+
+def category_lookup(seller) -> Dict[str, Optional[int]]:
+    """
+    Map every active category of `seller`, by casefolded name and by
+    '/'-joined path of names from its root, to its id, in one query. Names
+    used by several categories map to None: rows must give their path.
+    """
+    rows = list(Category.objects.filter(seller=seller, is_active=True)
+                .values_list('category_id', 'name', 'parent_category_id'))
+    by_id = {category_id: (name, parent_id) for category_id, name, parent_id in rows}
+
+    def path(category_id):
+        names = []
+        while category_id is not None and category_id in by_id:
+            name, category_id = by_id[category_id]
+            names.append(name.strip().casefold())
+        return '/'.join(reversed(names))
+
+    lookup: Dict[str, Optional[int]] = {}
+    for category_id, name, _ in rows:
+        key = name.strip().casefold()
+        lookup[key] = None if key in lookup and lookup[key] != category_id else category_id
+    for category_id, _, _ in rows:
+        lookup[path(category_id)] = category_id
+    return lookup
+
+
+class ImageFetcher:
+    """Store referenced images in the blob store, several at a time."""
+
+    def __init__(self, image_root: str, workers: int = 8, max_bytes: int = 10 * 1024 * 1024, timeout: float = 20.0):
+        self.image_root = os.path.realpath(image_root)
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.storage = get_blob_storage()
+
+    def _open(self, ref: str):
+        if ref.startswith(('http://', 'https://')):
+            response = urllib.request.urlopen(ref, timeout=self.timeout)
+            spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+            with response:
+                while chunk := response.read(64 * 1024):
+                    spooled.write(chunk)
+                    if spooled.tell() > self.max_bytes:
+                        raise ValueError(f"larger than {self.max_bytes} bytes")
+            spooled.seek(0)
+            return spooled
+        path = os.path.realpath(os.path.join(self.image_root, ref))
+        if os.path.commonpath([path, self.image_root]) != self.image_root:
+            raise ValueError("outside the image root")
+        if os.path.getsize(path) > self.max_bytes:
+            raise ValueError(f"larger than {self.max_bytes} bytes")
+        return open(path, 'rb')
+
+    def store(self, ref: str) -> str:
+        with self._open(ref) as content:
+            Image.open(content).verify()  # Reads the headers only
+            return self.storage.save(None, File(content, os.path.basename(ref)))
+
+    def store_all(self, refs) -> Dict[str, object]:
+        """Return {ref: blob name, or the exception storing it raised}."""
+        def attempt(ref):
+            try:
+                return ref, self.store(ref)
+            except Exception as e:
+                return ref, e
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return dict(executor.map(attempt, refs))
+
+
+class CatalogImporter:
+    """
+    Import a seller's catalog file in chunks: validation, one category
+    lookup, parallel image storing, then one transaction per chunk writing
+    the products, their images and the CatalogImport checkpoint together.
+
+    run() yields a report entry for every rejected row and resumes after
+    the last committed chunk of an earlier run on the same file.
+    """
+
+    def __init__(self, seller, path: str, fmt: Optional[str] = None, chunk_size: int = 500,
+                 image_root: Optional[str] = None, image_workers: Optional[int] = None,
+                 restart: bool = False, variants: bool = True,
+                 progress: Optional[Callable[[CatalogImport, float], None]] = None):
+        self.seller = seller
+        self.path = path
+        self.fmt = fmt or detect_import_format(path)
+        self.chunk_size = chunk_size
+        self.fetcher = ImageFetcher(
+            image_root or os.path.dirname(os.path.abspath(path)),
+            workers=image_workers or getattr(settings, 'CATALOG_IMPORT_IMAGE_WORKERS', 8),
+            max_bytes=getattr(settings, 'CATALOG_IMPORT_MAX_IMAGE_BYTES', 10 * 1024 * 1024),
+        )
+        self.restart = restart
+        self.variants = variants
+        self.progress = progress
+        self.checkpoint: Optional[CatalogImport] = None
+        self.categories: Dict[str, Optional[int]] = {}
+        self.resumed_at = 0
+        self.already_imported = False
+
+    def _load_checkpoint(self) -> CatalogImport:
+        checkpoint, _ = CatalogImport.objects.get_or_create(
+            seller=self.seller, fingerprint=file_fingerprint(self.path),
+            defaults={'source_name': os.path.basename(self.path)[:255], 'file_format': self.fmt},
+        )
+        if self.restart:
+            checkpoint.offset = checkpoint.line = 0
+            checkpoint.products_created = checkpoint.images_stored = checkpoint.rows_rejected = 0
+            checkpoint.csv_header, checkpoint.completed_at = '', None
+            checkpoint.save()
+        return checkpoint
+
+    def run(self) -> Iterator[dict]:
+        self.checkpoint = checkpoint = self._load_checkpoint()
+        if checkpoint.completed_at is not None:
+            self.already_imported = True
+            return
+        self.resumed_at = checkpoint.offset
+        self.categories = category_lookup(self.seller)
+        size = os.path.getsize(self.path)
+
+        with open(self.path, 'rb') as source:
+            header = json.loads(checkpoint.csv_header) if checkpoint.csv_header else None
+            reader = CatalogReader(source, checkpoint.file_format, checkpoint.offset, checkpoint.line, header)
+            chunk = []
+            for row in reader:
+                chunk.append(row)
+                if len(chunk) >= self.chunk_size:
+                    yield from self._import_chunk(chunk, reader)
+                    chunk = []
+                    if self.progress:
+                        self.progress(checkpoint, reader.offset / size if size else 1.0)
+            yield from self._import_chunk(chunk, reader, last=True)
+        if self.progress:
+            self.progress(checkpoint, 1.0)
+
+    def _reject(self, line: int, errors, row: Optional[dict] = None) -> dict:
+        entry = {'line': line, 'errors': errors}
+        if row and row.get('name'):
+            entry['name'] = row['name']
+        return entry
+
+    def _import_chunk(self, chunk: List[tuple], reader: CatalogReader, last: bool = False) -> Iterator[dict]:
+        validator = CatalogRowSerializer()
+        rejected, valid = [], []
+        for line, row, parse_error in chunk:
+            if parse_error:
+                rejected.append(self._reject(line, {'non_field_errors': [parse_error]}))
+                continue
+            try:
+                data = validator.run_validation(row)
+            except serializers.ValidationError as e:
+                rejected.append(self._reject(line, e.detail, row))
+                continue
+            category = data.pop('category', None)
+            if category is not None:
+                key = '/'.join(part.strip() for part in category.casefold().split('/'))
+                data['category_id_id'] = self.categories.get(key)
+                if data['category_id_id'] is None:
+                    problem = "is used by several categories, give its path" if key in self.categories else "does not exist"
+                    rejected.append(self._reject(line, {'category': [f"Category '{category}' {problem}."]}, row))
+                    continue
+            valid.append((line, data))
+
+        refs = {ref for _, data in valid for ref in [data.get('banner_image'), *data.get('images', [])] if ref}
+        stored = self.fetcher.store_all(refs) if refs else {}
+
+        products, images = [], []
+        for line, data in valid:
+            failed = {ref: str(stored[ref]) for ref in [data.get('banner_image'), *data.get('images', [])]
+                      if ref and isinstance(stored[ref], Exception)}
+            if failed:
+                rejected.append(self._reject(line, {'images': [f"{ref}: {error}" for ref, error in failed.items()]},
+                                             data))
+                continue
+            banner = data.pop('banner_image', None)
+            refs_of_row = data.pop('images', [])
+            product = Product(seller_id=self.seller, default_category=self.seller.seller_category, is_active=True,
+                              banner_image_file=stored[banner] if banner else '', **data)
+            products.append(product)
+            images.append([stored[ref] for ref in refs_of_row])
+
+        checkpoint = self.checkpoint
+        checkpoint.offset, checkpoint.line = reader.offset, reader.line
+        if reader.header is not None:
+            checkpoint.csv_header = json.dumps(reader.header)
+        checkpoint.products_created += len(products)
+        checkpoint.images_stored += sum(len(names) for names in images) + sum(1 for p in products if p.banner_image_file)
+        checkpoint.rows_rejected += len(rejected)
+        if last:
+            checkpoint.completed_at = timezone.now()
+        with transaction.atomic():
+            Product.objects.bulk_create(products)
+            ProductImage.objects.bulk_create([
+                ProductImage(product=product, image_file=name)
+                for product, names in zip(products, images) for name in names
+            ])
+            checkpoint.save()
+            if self.variants:
+                transaction.on_commit(lambda: self._schedule_variants(stored))
+        reset_queries()  # With DEBUG on, the logged bulk inserts would pile up over the run
+        yield from rejected
+
+    @staticmethod
+    def _schedule_variants(stored: Dict[str, object]) -> None:
+        # bulk_create sends no post_save, see blobstore.signals
+        for name in {name for name in stored.values() if isinstance(name, str)}:
+            if not has_variants(name):
+                schedule_variants(name)
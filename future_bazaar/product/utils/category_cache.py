@@ -0,0 +1,53 @@
+import logging
+import time
+from typing import Callable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+
+def _cache_ttl() -> int:
+    return getattr(settings, 'CATEGORY_TREE_CACHE_TTL', 3600)
+
+
+def _version_key(seller_id: int) -> str:
+    return f'category-tree:version:{seller_id}'
+
+
+def get_category_tree_version(seller_id: int) -> int:
+    key = _version_key(seller_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so an evicted version never reuses old entries
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_category_tree_version(seller_id: int) -> None:
+    """Make every cached category tree of a seller stale."""
+    key = _version_key(seller_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def get_cached_category_tree(seller_id: int, root_id: Optional[int], build: Callable[[], List[dict]]) -> List[dict]:
+    """
+    Return the serialized category tree of a seller (or the subtree under
+    `root_id`) for the current version, calling build() on a miss.
+    """
+    ttl = _cache_ttl()
+    if not ttl:
+        return build()
+
+    key = f'category-tree:{seller_id}:{get_category_tree_version(seller_id)}:{root_id}'
+    tree = cache.get(key)
+    if tree is None:
+        tree = build()
+        cache.set(key, tree, ttl)
+    return tree
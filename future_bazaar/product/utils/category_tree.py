@@ -0,0 +1,39 @@
+from typing import Dict, List, Optional, Sequence
+
+# Categories store a materialized path: the zero-padded ids of the root, every
+# ancestor and the category itself, e.g. "0000000001/0000000007/0000000042/".
+# Fixed-width segments make the string order of paths a depth-first order.
+PATH_SEGMENT_WIDTH = 10
+MAX_PATH_LENGTH = 255  # Category.path
+MAX_LEVELS = MAX_PATH_LENGTH // (PATH_SEGMENT_WIDTH + 1)  # 23 levels of 11-character segments
+
+
+def path_segment(category_id: int) -> str:
+    return f"{category_id:0{PATH_SEGMENT_WIDTH}d}/"
+
+
+def path_ids(path: str) -> List[int]:
+    """Ids of every category on a path, root first."""
+    return [int(segment) for segment in path.split('/') if segment]
+
+
+def check_nesting(parent_path: str, levels: int = 1) -> None:
+    """Raise ValueError unless `levels` more levels of categories fit under `parent_path`."""
+    if len(parent_path) + levels * (PATH_SEGMENT_WIDTH + 1) > MAX_PATH_LENGTH:
+        raise ValueError(f"Categories cannot be nested more than {MAX_LEVELS} levels deep.")
+
+
+def build_category_tree(categories: Sequence, nodes: Sequence[dict]) -> List[dict]:
+    """
+    Nest categories ordered by path, and their serialized `nodes`, into
+    [{..., "subcategories": [...]}] in a single pass. A category whose parent
+    is not among `categories` becomes a root.
+    """
+    by_id: Dict[int, dict] = {}
+    roots = []
+    for category, node in zip(categories, nodes):
+        node['subcategories'] = []
+        by_id[category.category_id] = node
+        parent: Optional[dict] = by_id.get(category.parent_category_id)
+        (parent['subcategories'] if parent is not None else roots).append(node)
+    return roots
@@ -0,0 +1,205 @@
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from rest_framework.exceptions import NotFound
+
+from ..models import Category, Product
+from ..serializers import ProductListSerializer
+from .search_index import CATEGORY_SEARCH_TABLE, PRODUCT_SEARCH_TABLE
+from .stock_reservation import with_available_stock
+
+
+logger = logging.getLogger(__name__)
+
+MAX_QUERY_TERMS = 8
+# BM25 weight of each product_search column: name, title, description, category_name
+PRODUCT_COLUMN_WEIGHTS = (10.0, 5.0, 1.0, 3.0)
+
+_backends: Dict[str, str] = {}
+
+
+def search_backend(using: str = 'default') -> str:
+    """
+    How a database searches: 'fts5' (SQLite with the product_search index),
+    'postgres' (built-in full-text search) or 'basic' (icontains scans).
+    """
+    if using not in _backends:
+        connection = connections[using]
+        backend = 'basic'
+        if connection.vendor == 'postgresql':
+            backend = 'postgres'
+        elif connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [PRODUCT_SEARCH_TABLE])
+                if cursor.fetchone():
+                    backend = 'fts5'
+        _backends[using] = backend
+    return _backends[using]
+
+
+def search_terms(query: str) -> List[str]:
+    terms = re.findall(r'\w+', query.lower())[:MAX_QUERY_TERMS]
+    if not terms:
+        raise ValueError("The search query must contain at least one word.")
+    return terms
+
+
+def fts_match_expression(terms: List[str]) -> str:
+    """
+    FTS5 query matching every term, the last one as a prefix so results
+    follow the user while typing. Terms are quoted, so user input can never
+    be read as FTS5 syntax.
+    """
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _category_subtree_ids(category_id: int) -> List[int]:
+    category = Category.objects.filter(pk=category_id).only('path', 'seller').first()
+    if category is None:
+        raise NotFound(f"Category with ID {category_id} does not exist.")
+    return list(
+        Category.objects.filter(seller_id=category.seller_id, path__startswith=category.path)
+        .values_list('pk', flat=True)
+    )
+
+
+def _search_fts(terms, seller_id, category_ids, after, limit) -> List[Tuple[int, float]]:
+    weights = ', '.join(str(weight) for weight in PRODUCT_COLUMN_WEIGHTS)
+    conditions, params = [f"{PRODUCT_SEARCH_TABLE} MATCH %s", "p.is_active"], [fts_match_expression(terms)]
+    if seller_id is not None:
+        conditions.append("p.seller_id_id = %s")
+        params.append(seller_id)
+    if category_ids is not None:
+        conditions.append(f"p.category_id_id IN ({', '.join(['%s'] * len(category_ids)) or 'NULL'})")
+        params.extend(category_ids)
+    candidates = ""
+    max_candidates = getattr(settings, 'PRODUCT_SEARCH_MAX_CANDIDATES', 20000)
+    if max_candidates:
+        # bm25() scores every match it is asked for; on near-universal words that is most
+        # of the catalogue. FTS5 walks matches by rowid without scoring, so rank only the
+        # newest max_candidates of them. Queries with fewer matches rank them all; above
+        # the cap older matches are never returned, however well they score.
+        candidates = "ORDER BY s.rowid DESC LIMIT %s"
+        params.append(max_candidates)
+    position = ""
+    if after is not None:
+        # bm25() is lower for better matches; continue after the last (score, id) served
+        position = "WHERE score > %s OR (score = %s AND product_id > %s)"
+    sql = f"""
+        SELECT product_id, score FROM (
+            SELECT s.rowid AS product_id, bm25({PRODUCT_SEARCH_TABLE}, {weights}) AS score
+            FROM {PRODUCT_SEARCH_TABLE} s JOIN product p ON p.product_id = s.rowid
+            WHERE {' AND '.join(conditions)}
+            {candidates}
+        ) {position}
+        ORDER BY score, product_id
+        LIMIT %s
+    """
+    if after is not None:
+        params.extend([after[0], after[0], after[1]])
+    params.append(limit + 1)
+    with connections['default'].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _filtered_products(seller_id, category_ids):
+    products = Product.objects.filter(is_active=True)
+    if seller_id is not None:
+        products = products.filter(seller_id=seller_id)
+    if category_ids is not None:
+        products = products.filter(category_id__in=category_ids)
+    return products
+
+
+def _search_postgres(terms, seller_id, category_ids, after, limit) -> List[Tuple[int, float]]:
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+    vector = (SearchVector('name', weight='A') + SearchVector('title', weight='B')
+              + SearchVector('category_id__name', weight='B') + SearchVector('description', weight='C'))
+    query = SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw')
+    # Negated so that, as with bm25(), lower scores are better matches
+    products = _filtered_products(seller_id, category_ids).annotate(
+        document=vector, score=-SearchRank(vector, query),
+    ).filter(document=query)
+    if after is not None:
+        products = products.filter(Q(score__gt=after[0]) | Q(score=after[0], product_id__gt=after[1]))
+    return list(products.order_by('score', 'product_id').values_list('product_id', 'score')[:limit + 1])
+
+
+def _search_basic(terms, seller_id, category_ids, after, limit) -> List[Tuple[int, float]]:
+    products = _filtered_products(seller_id, category_ids)
+    for term in terms:
+        products = products.filter(
+            Q(name__icontains=term) | Q(title__icontains=term)
+            | Q(description__icontains=term) | Q(category_id__name__icontains=term)
+        )
+    if after is not None:
+        products = products.filter(product_id__gt=after[1])
+    # No relevance without an index: every match scores the same, oldest first
+    products = products.annotate(score=Value(0.0, output_field=FloatField()))
+    return list(products.order_by('product_id').values_list('product_id', 'score')[:limit + 1])
+
+
+SEARCH_FUNCTIONS = {'fts5': _search_fts, 'postgres': _search_postgres, 'basic': _search_basic}
+
+
+def search_products(query: str, seller_id: Optional[int] = None, category_id: Optional[int] = None,
+                    after: Optional[Tuple[float, int]] = None, limit: int = 20):
+    """
+    Return one page of active products matching every word of `query`, best
+    matches first, optionally limited to a seller and to a category with its
+    subcategories. Pages continue after the (score, product_id) position
+    `after`. Returns (products, next_position); each product carries its
+    search_score. With FTS5, a query matching more than
+    PRODUCT_SEARCH_MAX_CANDIDATES products only ranks the newest that many.
+    """
+    terms = search_terms(query)
+    category_ids = _category_subtree_ids(category_id) if category_id is not None else None
+    matches = SEARCH_FUNCTIONS[search_backend()](terms, seller_id, category_ids, after, limit)
+
+    next_position = None
+    if len(matches) > limit:
+        matches = matches[:limit]
+        next_position = (matches[-1][1], matches[-1][0])
+
+    loaded = with_available_stock(Product.objects.only(*ProductListSerializer.LIST_FIELDS)).in_bulk([pk for pk, _ in matches])
+    products = []
+    for product_id, score in matches:
+        product = loaded.get(product_id)
+        if product is not None:
+            product.search_score = score
+            products.append(product)
+    return products, next_position
+
+
+def search_categories(query: str, seller_id: Optional[int] = None, limit: int = 20) -> List[Category]:
+    """Return active categories whose name or description match `query`, best matches first."""
+    terms = search_terms(query)
+    categories = Category.objects.filter(is_active=True)
+    if seller_id is not None:
+        categories = categories.filter(seller_id=seller_id)
+
+    if search_backend() == 'fts5':
+        sql = f"""
+            SELECT s.rowid FROM {CATEGORY_SEARCH_TABLE} s JOIN category c ON c.category_id = s.rowid
+            WHERE {CATEGORY_SEARCH_TABLE} MATCH %s AND c.is_active {'AND c.seller_id = %s' if seller_id is not None else ''}
+            ORDER BY bm25({CATEGORY_SEARCH_TABLE}, 5.0, 1.0), s.rowid
+            LIMIT %s
+        """
+        params = [fts_match_expression(terms)] + ([seller_id] if seller_id is not None else []) + [limit]
+        with connections['default'].cursor() as cursor:
+            cursor.execute(sql, params)
+            ids = [row[0] for row in cursor.fetchall()]
+        loaded = categories.in_bulk(ids)
+        return [loaded[pk] for pk in ids if pk in loaded]
+
+    for term in terms:
+        categories = categories.filter(Q(name__icontains=term) | Q(description__icontains=term))
+    return list(categories.order_by('name', 'category_id')[:limit])
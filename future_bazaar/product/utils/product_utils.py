@@ -3,11 +3,19 @@ from rest_framework.views import exception_handler
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
-from ..models import Category, Seller
-from ..serializers import CategorySerializer
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from ..models import Category, Seller, Product
+from ..serializers import CategorySerializer, ProductBulkSerializer, ProductListSerializer
 from rest_framework.permissions import IsAuthenticated
 from user.models import UserModel   
+from user.utils.seller_context import get_request_seller, get_user_seller
 from ..decorators import restrict_user_type
+from .category_cache import get_cached_category_tree
+from .category_tree import build_category_tree
+from .stock_reservation import with_available_stock
+from .typeahead import catalog_typeahead
 import logging
 
 
@@ -20,19 +28,14 @@ def create_category_helper(request):
     # Serialize and validate the data
     serializer = CategorySerializer(data=request.data, context={'request': request})
     serializer.is_valid(raise_exception=True)
-    file = request.FILES.get('image')  # 'image' is the field name in the frontend form
-
-    if file:
-        # Read the file content into binary format
-        file_binary = file.read()
 
     # Check if a category with the same name already exists
     category_name = serializer.validated_data.get('name')
     existing_category = Category.objects.filter(name=category_name).first()
     if existing_category:
         raise ValidationError(f"A category with the name '{category_name}' already exists for this seller.")
-    # Save the validated category and associate it with the seller
-    serializer.validated_data['image'] = file_binary
+    # Save the validated category and associate it with the seller;
+    # the uploaded image is streamed into the blob store
     category = serializer.save()
     
     return category
@@ -43,15 +46,16 @@ def get_category_helper(user, category_id):
     Helper function to fetch a category by ID for a seller.
     """
     # Check if the user has a seller profile
-    if not hasattr(user, 'seller_profile'):
-        logger.warning(f"Unauthorized access attempt by user ID {user.id}")
+    seller = get_user_seller(user)
+    if seller is None:
+        logger.warning(f"Unauthorized access attempt by user ID {user.user_id}")
         raise PermissionDenied("Only users with Seller profiles can access categories.")
 
     # Fetch the category associated with the logged-in seller
     try:
-        category = Category.objects.get(category_id=category_id, seller=user.seller_profile)
+        category = Category.objects.get(category_id=category_id, seller=seller)
     except Category.DoesNotExist:
-        logger.error(f"Category with ID {category_id} not found for Seller ID {user.seller_profile.seller_id}")
+        logger.error(f"Category with ID {category_id} not found for Seller ID {seller.seller_id}")
         raise NotFound(f"Category with ID {category_id} does not exist.")
 
     return category
@@ -61,10 +65,8 @@ def update_category_helper(request, category_id):
     """
     Helper function to update a category for a seller.
     """
-    print(request.user)
-    # Check if the user has a seller profile
-    seller = Seller.objects.get(user_id=request.user.user_id)
-    print(request.user.user_id)
+    # Resolved once per request (and checked) by restrict_user_type
+    seller = get_request_seller(request)
     # Fetch the category
     try:
         category = Category.objects.get(pk=category_id, seller=seller.seller_id)
@@ -87,11 +89,142 @@ def delete_category_helper(user, category_id):
     """
     # Fetch the category
     try:
-        category = Category.objects.get(pk=category_id, seller=user.seller_profile)
+        category = Category.objects.get(pk=category_id, seller=get_user_seller(user))
     except Category.DoesNotExist:
-        logger.error(f"Category ID {category_id} not found or not owned by user ID {user.id}")
+        logger.error(f"Category ID {category_id} not found or not owned by user ID {user.user_id}")
         raise NotFound("Category not found or not owned by the current seller.")
 
     # Delete the category
     category.delete()
-    return True
\ No newline at end of file
+    return True
+
+
+def get_category_tree_helper(seller, root_id=None):
+    """
+    Helper function to fetch a seller's whole category tree, or the subtree
+    under `root_id`. Trees are cached per seller until a category changes;
+    a miss costs a single query.
+    """
+    def build():
+        categories = Category.objects.filter(seller=seller)
+        if root_id is not None:
+            root = categories.filter(pk=root_id).only('path').first()
+            if root is None:
+                raise NotFound(f"Category with ID {root_id} does not exist.")
+            categories = categories.filter(path__startswith=root.path)
+
+        categories = list(categories.order_by('path'))
+        return build_category_tree(categories, CategorySerializer(categories, many=True).data)
+
+    return get_cached_category_tree(seller.seller_id, root_id, build)
+
+
+def get_category_breadcrumbs_helper(user, category_id):
+    """
+    Helper function to fetch the chain of categories from the root down to
+    `category_id`.
+    """
+    category = get_category_helper(user, category_id)
+    return [
+        {"category_id": ancestor.category_id, "name": ancestor.name}
+        for ancestor in category.get_ancestors(include_self=True).only('category_id', 'name', 'depth')
+    ]
+
+
+
+def list_products_helper(filters: dict, category_id=None, ordering: str = 'newest', after=None, limit: int = 20):
+    """
+    Helper function to fetch one page of products matching `filters`,
+    optionally limited to a category and its subcategories.
+
+    Pages continue after the (sort value, product_id) position `after`
+    instead of an offset, so deep pages cost the same as the first one.
+    Returns (products, next_position).
+    """
+    products = Product.objects.filter(**filters)
+    if category_id is not None:
+        category = Category.objects.filter(pk=category_id).only('path', 'seller').first()
+        if category is None:
+            raise NotFound(f"Category with ID {category_id} does not exist.")
+        subtree = Category.objects.filter(seller_id=category.seller_id, path__startswith=category.path)
+        products = products.filter(category_id__in=subtree.values('pk'))
+
+    sort_field = 'created_at' if ordering == 'newest' else 'price'
+    descending = ordering != 'price'
+    if after is not None:
+        value, product_id = after
+        if descending:
+            # The leading range condition keeps the index seek; the OR breaks ties
+            products = products.filter(Q(**{f'{sort_field}__lte': value}),
+                                       Q(**{f'{sort_field}__lt': value}) | Q(product_id__lt=product_id))
+        else:
+            products = products.filter(Q(**{f'{sort_field}__gte': value}),
+                                       Q(**{f'{sort_field}__gt': value}) | Q(product_id__gt=product_id))
+
+    prefix = '-' if descending else ''
+    page = list(
+        with_available_stock(products.only(*ProductListSerializer.LIST_FIELDS))
+        .order_by(f'{prefix}{sort_field}', f'{prefix}product_id')[:limit + 1]
+    )
+    next_position = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_position = (getattr(page[-1], sort_field), page[-1].product_id)
+    return page, next_position
+
+
+def bulk_save_products_helper(request, items, atomic: bool = False) -> dict:
+    """
+    Helper function to create and update a seller's products in bulk.
+
+    Items with a product_id update that product, the others create one.
+    Valid items are written in one transaction and invalid ones reported
+    next to them; with `atomic`, a single invalid item writes nothing.
+    Returns per-item results (in request order) and their counts.
+    """
+    seller = get_request_seller(request)
+    if seller is None:
+        raise PermissionDenied("Only sellers can create products.")
+
+    # The seller's products the batch updates, loaded in one query with the
+    # fields validation reads; updates only write the fields an item sets
+    product_ids = set()
+    for item in items if isinstance(items, list) else []:
+        try:
+            product_ids.add(int(item.get('product_id')))
+        except (AttributeError, TypeError, ValueError):
+            continue
+    existing = Product.objects.filter(seller_id=seller, product_id__in=product_ids) \
+        .only('product_id', 'name', 'price', 'discounted_price').in_bulk()
+
+    serializer = ProductBulkSerializer(
+        data=items, many=True, partial=True, max_length=getattr(settings, 'PRODUCT_BULK_MAX_ITEMS', 1000),
+        context={'request': request, 'existing': existing},
+    )
+    serializer.is_valid(raise_exception=True)
+    results = [None] * (len(serializer.valid_indexes) + len(serializer.item_errors))
+    for index, errors in serializer.item_errors.items():
+        results[index] = {"index": index, "status": "failed", "errors": errors}
+
+    if serializer.valid_indexes and not (atomic and serializer.item_errors):
+        with transaction.atomic():
+            products = serializer.save()
+        renamed = []
+        for index, attrs, product in zip(serializer.valid_indexes, serializer.validated_data, products):
+            results[index] = {"index": index, "status": "updated" if 'product_id' in attrs else "created",
+                              "product_id": product.product_id}
+            if 'name' in attrs:
+                renamed.append((product.product_id, product.name))
+
+        def update_typeahead():
+            # bulk_create and bulk_update send no post_save, see signals.update_product_typeahead
+            for product_id, name in renamed:
+                catalog_typeahead.upsert('products', product_id, name, seller.seller_id)
+        transaction.on_commit(update_typeahead)
+    else:
+        for index in serializer.valid_indexes:
+            results[index] = {"index": index, "status": "skipped"}
+
+    counts = {status_name: sum(1 for result in results if result['status'] == status_name)
+              for status_name in ('created', 'updated', 'failed', 'skipped')}
+    return {"results": results, **counts}
@@ -0,0 +1,115 @@
+import logging
+
+from django.db import OperationalError
+
+
+logger = logging.getLogger(__name__)
+
+# SQLite FTS5 indexes behind product and category search. product_search holds
+# one document per product (rowid = product_id) including its category name,
+# category_search one per category. Triggers keep both in step with every write
+# to the product and category tables, bulk and raw ones included.
+
+PRODUCT_SEARCH_TABLE = 'product_search'
+CATEGORY_SEARCH_TABLE = 'category_search'
+
+# unicode61 folds case and accents; prefix indexes make "sof*" a lookup, not a scan
+_FTS_OPTIONS = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+
+_CATEGORY_NAME = "COALESCE((SELECT name FROM category WHERE category_id = new.category_id_id), '')"
+
+CREATE_STATEMENTS = [
+    f"CREATE VIRTUAL TABLE {PRODUCT_SEARCH_TABLE} USING fts5(name, title, description, category_name, {_FTS_OPTIONS})",
+    f"CREATE VIRTUAL TABLE {CATEGORY_SEARCH_TABLE} USING fts5(name, description, {_FTS_OPTIONS})",
+
+    f"""CREATE TRIGGER product_search_insert AFTER INSERT ON product BEGIN
+        INSERT INTO {PRODUCT_SEARCH_TABLE}(rowid, name, title, description, category_name)
+        VALUES (new.product_id, new.name, new.title, new.description, {_CATEGORY_NAME});
+    END""",
+    # Django saves write every column, so only reindex when a searched one changed
+    f"""CREATE TRIGGER product_search_update AFTER UPDATE ON product
+    WHEN old.name IS NOT new.name OR old.title IS NOT new.title OR old.description IS NOT new.description
+        OR old.category_id_id IS NOT new.category_id_id OR old.product_id IS NOT new.product_id BEGIN
+        DELETE FROM {PRODUCT_SEARCH_TABLE} WHERE rowid = old.product_id;
+        INSERT INTO {PRODUCT_SEARCH_TABLE}(rowid, name, title, description, category_name)
+        VALUES (new.product_id, new.name, new.title, new.description, {_CATEGORY_NAME});
+    END""",
+    f"""CREATE TRIGGER product_search_delete AFTER DELETE ON product BEGIN
+        DELETE FROM {PRODUCT_SEARCH_TABLE} WHERE rowid = old.product_id;
+    END""",
+
+    f"""CREATE TRIGGER category_search_insert AFTER INSERT ON category BEGIN
+        INSERT INTO {CATEGORY_SEARCH_TABLE}(rowid, name, description)
+        VALUES (new.category_id, new.name, COALESCE(new.description, ''));
+    END""",
+    f"""CREATE TRIGGER category_search_update AFTER UPDATE ON category
+    WHEN old.name IS NOT new.name OR old.description IS NOT new.description
+        OR old.category_id IS NOT new.category_id BEGIN
+        DELETE FROM {CATEGORY_SEARCH_TABLE} WHERE rowid = old.category_id;
+        INSERT INTO {CATEGORY_SEARCH_TABLE}(rowid, name, description)
+        VALUES (new.category_id, new.name, COALESCE(new.description, ''));
+    END""",
+    # Renaming a category changes the documents of its products
+    f"""CREATE TRIGGER category_search_rename AFTER UPDATE ON category
+    WHEN old.name IS NOT new.name BEGIN
+        UPDATE {PRODUCT_SEARCH_TABLE} SET category_name = new.name
+        WHERE rowid IN (SELECT product_id FROM product WHERE category_id_id = new.category_id);
+    END""",
+    f"""CREATE TRIGGER category_search_delete AFTER DELETE ON category BEGIN
+        DELETE FROM {CATEGORY_SEARCH_TABLE} WHERE rowid = old.category_id;
+    END""",
+]
+
+POPULATE_STATEMENTS = [
+    f"""INSERT INTO {PRODUCT_SEARCH_TABLE}(rowid, name, title, description, category_name)
+        SELECT p.product_id, p.name, p.title, p.description, COALESCE(c.name, '')
+        FROM product p LEFT JOIN category c ON c.category_id = p.category_id_id""",
+    f"""INSERT INTO {CATEGORY_SEARCH_TABLE}(rowid, name, description)
+        SELECT category_id, name, COALESCE(description, '') FROM category""",
+]
+
+DROP_STATEMENTS = [
+    "DROP TRIGGER IF EXISTS product_search_insert",
+    "DROP TRIGGER IF EXISTS product_search_update",
+    "DROP TRIGGER IF EXISTS product_search_delete",
+    "DROP TRIGGER IF EXISTS category_search_insert",
+    "DROP TRIGGER IF EXISTS category_search_update",
+    "DROP TRIGGER IF EXISTS category_search_rename",
+    "DROP TRIGGER IF EXISTS category_search_delete",
+    f"DROP TABLE IF EXISTS {PRODUCT_SEARCH_TABLE}",
+    f"DROP TABLE IF EXISTS {CATEGORY_SEARCH_TABLE}",
+]
+
+
+def create_search_index(connection) -> bool:
+    """
+    Create and fill the FTS5 tables and their triggers. Returns False, and
+    leaves search on its fallback, when the database is not SQLite or was
+    built without FTS5.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+            cursor.execute("DROP TABLE temp.fts5_probe")
+        except OperationalError as e:
+            logger.warning(f"SQLite has no FTS5 ({e}); product search falls back to icontains")
+            return False
+        for statement in CREATE_STATEMENTS + POPULATE_STATEMENTS:
+            cursor.execute(statement)
+    return True
+
+
+def drop_search_index(connection) -> None:
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in DROP_STATEMENTS:
+            cursor.execute(statement)
+
+
+def rebuild_search_index(connection) -> None:
+    """Refill the FTS5 tables from scratch, e.g. after restoring a dump without them."""
+    drop_search_index(connection)
+    create_search_index(connection)
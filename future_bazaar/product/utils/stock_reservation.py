@@ -0,0 +1,233 @@
+import logging
+import random
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, QuerySet, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+
+from ..models import Product, StockReservation, StockShard
+
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStock(Exception):
+    """Not enough free units of the product to reserve."""
+
+
+class ReservationClosed(Exception):
+    """The reservation was already committed, released or has expired."""
+
+    def __init__(self, reservation: StockReservation):
+        self.status = reservation.status
+        super().__init__(f"Reservation {reservation.pk} is {reservation.status}.")
+
+
+# A stock source is a StockShard index, or None for Product.stock_quantity
+def _take(product_id: int, quantity: int, source: Optional[int]) -> bool:
+    """Take `quantity` units out of `source` if it holds that many, in one conditional UPDATE."""
+    if source is None:
+        return bool(Product.objects.filter(pk=product_id, stock_quantity__gte=quantity)
+                    .update(stock_quantity=F('stock_quantity') - quantity))
+    return bool(StockShard.objects.filter(product_id=product_id, index=source, quantity__gte=quantity)
+                .update(quantity=F('quantity') - quantity))
+
+
+def _put(product_id: int, quantity: int, source: Optional[int]) -> None:
+    # Units of a shard removed since (see set_stock_shards) go back to the product
+    if source is not None and StockShard.objects.filter(product_id=product_id, index=source) \
+            .update(quantity=F('quantity') + quantity):
+        return
+    Product.objects.filter(pk=product_id).update(stock_quantity=F('stock_quantity') + quantity)
+
+
+def _levels(product_id: int) -> Dict[Optional[int], int]:
+    levels = dict(StockShard.objects.filter(product_id=product_id).values_list('index', 'quantity'))
+    levels[None] = Product.objects.filter(pk=product_id).values_list('stock_quantity', flat=True).first() or 0
+    return levels
+
+
+def available_stock(product_id: int) -> int:
+    """Free units of a product, its shards included."""
+    return sum(_levels(product_id).values())
+
+
+def with_available_stock(products: QuerySet) -> QuerySet:
+    """Annotate `available_stock` on `products`: free units, their shards included, in the same query."""
+    shard_units = StockShard.objects.filter(product=OuterRef('pk')).order_by().values('product') \
+        .annotate(units=Sum('quantity')).values('units')
+    return products.annotate(
+        available_stock=F('stock_quantity') + Coalesce(Subquery(shard_units), 0, output_field=IntegerField()),
+    )
+
+
+def _gather(product_id: int, quantity: int, sources: List[Optional[int]]) -> Optional[int]:
+    # Near sell-out no single source may hold `quantity`: move units from the
+    # others into the first, with the same conditional updates, then take them
+    target = sources[0]
+    levels = _levels(product_id)
+    needed = quantity - levels.get(target, 0)
+    for source in sources[1:]:
+        if needed <= 0:
+            break
+        units = min(levels.get(source, 0), needed)
+        if units > 0 and _take(product_id, units, source):
+            _put(product_id, units, target)
+            needed -= units
+    if needed > 0 or not _take(product_id, quantity, target):
+        raise InsufficientStock(f"Only {available_stock(product_id)} units of product {product_id} are available.")
+    return target
+
+
+def _reserve(product_id: int, user, quantity: int, sources: List[Optional[int]], ttl: int) -> StockReservation:
+    with transaction.atomic():
+        # Writes come first: on SQLite, reading before writing in a transaction
+        # fails at once under contention instead of waiting for the lock
+        for source in sources:
+            if _take(product_id, quantity, source):
+                break
+        else:
+            source = _gather(product_id, quantity, sources)  # Raising rolls the moves back
+        return StockReservation.objects.create(
+            product_id=product_id, user=user, quantity=quantity, shard=source,
+            expires_at=timezone.now() + timedelta(seconds=ttl),
+        )
+
+
+def reserve_stock(product_id: int, user, quantity: int, ttl: Optional[int] = None) -> StockReservation:
+    """
+    Hold `quantity` units of an active product for `user` for `ttl` seconds
+    (STOCK_RESERVATION_TTL by default).
+
+    Units are taken with a conditional F() update, so concurrent buyers can
+    never oversell and no row is read and locked first. A product with
+    stock shards is drawn from a shard picked at random, spreading its
+    buyers over several rows. Raises InsufficientStock, after reclaiming
+    the product's expired reservations once.
+    """
+    if quantity < 1:
+        raise ValueError("quantity must be a positive integer.")
+    if not Product.objects.filter(pk=product_id, is_active=True).exists():
+        raise NotFound(f"Product with ID {product_id} does not exist.")
+    ttl = ttl or getattr(settings, 'STOCK_RESERVATION_TTL', 15 * 60)
+
+    shards = list(StockShard.objects.filter(product_id=product_id).values_list('index', flat=True))
+    random.shuffle(shards)
+    sources = [*shards, None]
+    try:
+        return _reserve(product_id, user, quantity, sources, ttl)
+    except InsufficientStock:
+        if not release_expired_reservations(product_id=product_id):
+            raise
+    return _reserve(product_id, user, quantity, sources, ttl)
+
+
+def _get_reservation(reservation_id: int, user) -> StockReservation:
+    reservation = StockReservation.objects.filter(pk=reservation_id, user=user).first()
+    if reservation is None:
+        raise NotFound(f"Reservation with ID {reservation_id} does not exist.")
+    return reservation
+
+
+def _close(reservation: StockReservation, status: str) -> bool:
+    """Move a pending reservation to `status`, returning its units unless committed. False if it was not pending."""
+    with transaction.atomic():
+        # Only one caller can flip the status, so the units go back exactly once
+        closed = StockReservation.objects.filter(pk=reservation.pk, status=StockReservation.PENDING) \
+            .update(status=status, updated_at=timezone.now())
+        if closed and status != StockReservation.COMMITTED:
+            _put(reservation.product_id, reservation.quantity, reservation.shard)
+    if closed:
+        reservation.status = status
+    return bool(closed)
+
+
+def commit_reservation(reservation_id: int, user) -> StockReservation:
+    """Turn a pending reservation of `user` into a sale: its units leave the stock for good."""
+    reservation = _get_reservation(reservation_id, user)
+    if reservation.expires_at <= timezone.now():
+        _close(reservation, StockReservation.EXPIRED)  # Unless the sweep already did
+    elif _close(reservation, StockReservation.COMMITTED):
+        return reservation
+    reservation.refresh_from_db(fields=['status'])
+    raise ReservationClosed(reservation)
+
+
+def release_reservation(reservation_id: int, user) -> StockReservation:
+    """Cancel a pending reservation of `user`, returning its units to the stock."""
+    reservation = _get_reservation(reservation_id, user)
+    if not _close(reservation, StockReservation.RELEASED):
+        reservation.refresh_from_db(fields=['status'])
+        raise ReservationClosed(reservation)
+    return reservation
+
+
+def release_expired_reservations(product_id: Optional[int] = None, batch_size: int = 500) -> int:
+    """Expire pending reservations past their TTL (of one product, or all), returning their units."""
+    expired = StockReservation.objects.filter(status=StockReservation.PENDING, expires_at__lte=timezone.now())
+    if product_id is not None:
+        expired = expired.filter(product_id=product_id)
+    released = 0
+    while batch := list(expired.order_by('pk').only('product', 'quantity', 'shard')[:batch_size]):
+        released += sum(_close(reservation, StockReservation.EXPIRED) for reservation in batch)
+    if released:
+        logger.info(f"Released {released} expired stock reservations")
+    return released
+
+
+def set_stock_shards(product_id: int, shards: int) -> Dict[str, object]:
+    """
+    Spread a product's free stock evenly over `shards` StockShard rows, for
+    products many buyers reserve at once; 0 folds it back into the product
+    row. Units are moved with the same conditional updates reservations
+    use, so it is safe while the product sells.
+    """
+    if not 0 <= shards <= getattr(settings, 'STOCK_MAX_SHARDS', 64):
+        raise ValueError(f"shards must be between 0 and {getattr(settings, 'STOCK_MAX_SHARDS', 64)}.")
+    with transaction.atomic():
+        StockShard.objects.bulk_create(
+            [StockShard(product_id=product_id, index=index) for index in range(shards)], ignore_conflicts=True,
+        )
+        moved = 0
+        for source, units in _levels(product_id).items():
+            if units and _take(product_id, units, source):
+                moved += units
+        targets = list(range(shards)) or [None]
+        share, extra = divmod(moved, len(targets))
+        for position, target in enumerate(targets):
+            if share + (position < extra):
+                _put(product_id, share + (position < extra), target)
+        # A shard a release returned units to meanwhile stays, and is drawn from like the others
+        StockShard.objects.filter(product_id=product_id, index__gte=shards, quantity=0).delete()
+    return {"product_id": product_id, "shards": shards, "available": available_stock(product_id)}
+
+
+def set_stock(product_id: int, quantity: int) -> int:
+    """
+    Make `quantity` units of a product free, for absolute counts from a
+    bulk edit or the admin. The product's shards are folded into its row,
+    the difference is applied with the conditional updates reservations
+    use, and the stock is spread over as many shards again, so units
+    reserved meanwhile are never written back. Returns the free units.
+    """
+    if quantity < 0:
+        raise ValueError("quantity cannot be negative.")
+    shards = StockShard.objects.filter(product_id=product_id).count()
+    if shards:
+        set_stock_shards(product_id, 0)
+    while True:
+        difference = quantity - _levels(product_id)[None]
+        if difference >= 0:
+            if difference:
+                _put(product_id, difference, None)
+            break
+        if _take(product_id, -difference, None):
+            break  # Otherwise a reservation took units since: compute the difference again
+    if shards:
+        set_stock_shards(product_id, shards)
+    return available_stock(product_id)
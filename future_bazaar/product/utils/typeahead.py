@@ -0,0 +1,327 @@
+import bisect
+import heapq
+import logging
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Sorts after every character, so bisecting for prefix + MAX_CHAR ends the prefix range
+MAX_CHAR = '\U0010ffff'
+
+
+def fold(name: str) -> str:
+    return name.casefold()
+
+
+class PrefixIndex:
+    """
+    Names sorted by their case-folded form, searched by prefix with bisect.
+
+    The bulk of the names lives in a sorted list with parallel NumPy arrays,
+    built in one go: ids, name lengths (the rank), an alive flag per row,
+    each seller's rows in name order, and the best rows of every prefix that
+    covers more than TOP_THRESHOLD names, so short prefixes never rank a
+    large range. Changes since the build go to a small sorted delta, and
+    rows changed or deleted since are flagged dead, so updates never shift
+    the big arrays.
+    """
+    TOP_THRESHOLD = 1024
+    TOP_SIZE = 32  # Best rows kept per large prefix; more than any page of suggestions
+
+    def __init__(self, rows: Iterable[Tuple[int, str, int]] = ()):
+        rows = sorted(((fold(name), name, row_id, seller_id) for row_id, name, seller_id in rows if name),
+                      key=lambda row: row[0])
+        self._names = [name for _, name, _, _ in rows]
+        self._ids = np.fromiter((row[2] for row in rows), dtype=np.int64, count=len(rows))
+        self._lengths = np.fromiter((len(row[0]) for row in rows), dtype=np.int32, count=len(rows))
+        sellers = np.fromiter((row[3] for row in rows), dtype=np.int64, count=len(rows))
+        del rows
+        self._alive = np.ones(len(self._names), dtype=bool)
+        self._dead = 0
+
+        # Row of an id: ids in order, and where each sits
+        self._id_order = np.argsort(self._ids, kind='stable').astype(np.int32)
+        self._sorted_ids = self._ids[self._id_order]
+        # A seller's rows, in name order: _seller_rows[start:end]
+        self._seller_rows = np.argsort(sellers, kind='stable').astype(np.int32)
+        seller_ids, starts, counts = np.unique(sellers[self._seller_rows], return_index=True, return_counts=True)
+        self._seller_slices = {int(seller): (int(start), int(start + count))
+                               for seller, start, count in zip(seller_ids, starts, counts)}
+        self._top: Dict[str, np.ndarray] = {}
+        self._build_top('', 0, len(self._names))
+
+        self._delta_keys: List[str] = []
+        self._delta: List[Tuple[str, str, int, int]] = []  # (folded, name, id, seller), sorted
+        self._delta_slots: Dict[int, str] = {}  # id -> folded name in the delta
+
+    def _build_top(self, prefix: str, low: int, high: int) -> None:
+        """Rank every prefix covering more than TOP_THRESHOLD rows of [low, high) ahead of time."""
+        self._top[prefix] = self._best(np.arange(low, high, dtype=np.int32), self.TOP_SIZE)
+        depth = len(prefix)
+        position = low
+        while position < high:
+            folded = fold(self._names[position])
+            if len(folded) <= depth:  # The prefix itself
+                position += 1
+                continue
+            child = folded[:depth + 1]
+            end = bisect.bisect_left(self._names, child + MAX_CHAR, lo=position, hi=high, key=fold)
+            if end - position > self.TOP_THRESHOLD:
+                self._build_top(child, position, end)
+            position = end
+
+    def _best(self, rows: np.ndarray, limit: int) -> np.ndarray:
+        """The `limit` best of `rows` (ascending row numbers): shortest name first, then alphabetically."""
+        if len(rows) > limit:
+            # Rows are in alphabetical order, so (length, row) ranks by length then name
+            ranks = (self._lengths[rows].astype(np.int64) << 32) | rows
+            rows = rows[np.argpartition(ranks, limit - 1)[:limit]]
+        return rows
+
+    def __len__(self) -> int:
+        return len(self._names) - self._dead + len(self._delta)
+
+    @property
+    def delta_size(self) -> int:
+        return len(self._delta) + self._dead
+
+    def _hide(self, row_id: int) -> None:
+        slot = np.searchsorted(self._sorted_ids, row_id)
+        if slot < len(self._sorted_ids) and self._sorted_ids[slot] == row_id:
+            row = self._id_order[slot]
+            if self._alive[row]:
+                self._alive[row] = False
+                self._dead += 1
+        folded = self._delta_slots.pop(row_id, None)
+        if folded is not None:
+            position = bisect.bisect_left(self._delta_keys, folded)
+            while self._delta[position][2] != row_id:
+                position += 1
+            del self._delta_keys[position]
+            del self._delta[position]
+
+    def upsert(self, row_id: int, name: str, seller_id: int) -> None:
+        self._hide(row_id)
+        if not name:
+            return
+        folded = fold(name)
+        position = bisect.bisect_right(self._delta_keys, folded)
+        self._delta_keys.insert(position, folded)
+        self._delta.insert(position, (folded, name, row_id, seller_id))
+        self._delta_slots[row_id] = folded
+
+    def discard(self, row_id: int) -> None:
+        self._hide(row_id)
+
+    def _base_rows(self, key: str, seller_id: Optional[int], limit: int) -> np.ndarray:
+        low = bisect.bisect_left(self._names, key, key=fold)
+        high = bisect.bisect_left(self._names, key + MAX_CHAR, lo=low, key=fold)
+        if seller_id is None:
+            top = self._top.get(key)
+            if top is not None:
+                rows = top[self._alive[top]]
+                # Enough survivors are still the best of the range; else rank it afresh
+                if len(rows) >= min(limit, high - low):
+                    return rows
+            rows = np.arange(low, high, dtype=np.int32)
+        else:
+            start, end = self._seller_slices.get(seller_id, (0, 0))
+            rows = self._seller_rows[start:end]
+            rows = rows[np.searchsorted(rows, low):np.searchsorted(rows, high)]
+        return self._best(rows[self._alive[rows]], limit)
+
+    def search(self, prefix: str, seller_id: Optional[int] = None, limit: int = 10) -> List[Tuple[int, str]]:
+        """
+        Return up to `limit` (id, name) pairs whose name starts with `prefix`,
+        ignoring case, ranked shortest name first (the closest completion),
+        then alphabetically.
+        """
+        key = fold(prefix)
+        candidates = [(int(self._lengths[row]), fold(self._names[row]), int(self._ids[row]), self._names[row])
+                      for row in self._base_rows(key, seller_id, limit)]
+
+        start = bisect.bisect_left(self._delta_keys, key)
+        end = bisect.bisect_left(self._delta_keys, key + MAX_CHAR, lo=start)
+        candidates.extend(heapq.nsmallest(limit, (
+            (len(folded), folded, row_id, name)
+            for folded, name, row_id, row_seller in self._delta[start:end]
+            if seller_id is None or row_seller == seller_id
+        )))
+        candidates.sort()
+        return [(row_id, name) for _, _, row_id, name in candidates[:limit]]
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the index."""
+        arrays = (self._ids, self._lengths, self._alive, self._id_order, self._sorted_ids, self._seller_rows)
+        return (sys.getsizeof(self._names) + sum(sys.getsizeof(name) for name in self._names)
+                + sum(array.nbytes for array in arrays)
+                + sum(sys.getsizeof(prefix) + top.nbytes for prefix, top in self._top.items())
+                + sum(sys.getsizeof(entry[0]) + sys.getsizeof(entry[1]) for entry in self._delta))
+
+
+def _product_rows():
+    from ..models import Product
+    return Product.objects.filter(is_active=True).values_list('product_id', 'name', 'seller_id').iterator(chunk_size=10000)
+
+
+def _category_rows():
+    from ..models import Category
+    return Category.objects.filter(is_active=True).values_list('category_id', 'name', 'seller_id').iterator(chunk_size=10000)
+
+
+def _seller_rows():
+    from user.models import Seller
+    return Seller.objects.filter(is_active=True, is_approved=True).values_list(
+        'seller_id', 'business_name', 'seller_id').iterator(chunk_size=10000)
+
+
+class CatalogTypeahead:
+    """
+    Process-local prefix indexes of product, category and seller names for
+    search-box suggestions.
+
+    Built from the database on first use (or from the first request, see
+    warm() and TYPEAHEAD_WARM_ON_REQUEST), patched from model signals, and
+    rebuilt in the background every TYPEAHEAD_MAX_AGE seconds, or sooner
+    once many changes piled up, to pick up bulk updates and writes made by
+    other processes. Searches keep using
+    the current indexes while a rebuild runs; during the first build they
+    wait for it up to TYPEAHEAD_BUILD_WAIT seconds, then get no suggestions.
+    """
+    sources: Dict[str, Callable] = {
+        'products': _product_rows,
+        'categories': _category_rows,
+        'sellers': _seller_rows,
+    }
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._indexes: Optional[Dict[str, PrefixIndex]] = None
+        self._built_at = 0.0
+        self._rebuilding = False
+        self._build_finished = threading.Event()  # Set whenever a build attempt ends
+        self._changes: Optional[List[tuple]] = None  # Changes made while a rebuild reads the database
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._indexes is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes = None
+
+    def rebuild(self) -> None:
+        """Build fresh indexes from the database and swap them in."""
+        with self._lock:
+            self._changes = []
+        try:
+            started = time.monotonic()
+            indexes = {kind: PrefixIndex(rows()) for kind, rows in self.sources.items()}
+            with self._lock:
+                for change in self._changes:
+                    self._apply(indexes, *change)
+                self._indexes = indexes
+                self._built_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._changes = None
+        sizes = ', '.join(f"{len(index)} {kind}" for kind, index in indexes.items())
+        logger.info(f"Built the typeahead indexes ({sizes}) in {time.monotonic() - started:.1f}s")
+
+    def _start_build(self) -> None:
+        # Under the lock
+        self._rebuilding = True
+        self._build_finished.clear()
+
+    def _end_build(self) -> None:
+        with self._lock:
+            self._rebuilding = False
+            self._build_finished.set()
+
+    def _refresh(self) -> None:
+        with self._lock:
+            if self._indexes is not None:
+                stale = time.monotonic() - self._built_at > getattr(settings, 'TYPEAHEAD_MAX_AGE', 600)
+                backlog = sum(index.delta_size for index in self._indexes.values())
+                if self._rebuilding or not (stale or backlog > getattr(settings, 'TYPEAHEAD_MAX_CHANGES', 5000)):
+                    return
+                self._start_build()
+                wait, background = False, True
+            else:
+                # First build: one caller runs it, without the lock; concurrent callers (or warm()) wait for it
+                wait, background = self._rebuilding, False
+                if not wait:
+                    self._start_build()
+        if wait:
+            self._build_finished.wait(getattr(settings, 'TYPEAHEAD_BUILD_WAIT', 5))
+        elif background:
+            threading.Thread(target=self._rebuild_in_background, name='typeahead-rebuild', daemon=True).start()
+        else:
+            try:
+                self.rebuild()
+            finally:
+                self._end_build()
+
+    def _rebuild_in_background(self) -> None:
+        from django.db import connection
+        try:
+            self.rebuild()
+        except Exception as e:
+            logger.error(f"Typeahead rebuild failed: {e}")
+        finally:
+            self._end_build()
+            connection.close()
+
+    def warm(self, **kwargs) -> None:
+        """Build the indexes in a background thread unless already built or building."""
+        with self._lock:
+            if self._indexes is not None or self._rebuilding:
+                return
+            self._start_build()
+        threading.Thread(target=self._rebuild_in_background, name='typeahead-rebuild', daemon=True).start()
+
+    @staticmethod
+    def _apply(indexes: Dict[str, PrefixIndex], kind: str, row_id: int, name: Optional[str], seller_id: Optional[int]):
+        if name is None:
+            indexes[kind].discard(row_id)
+        else:
+            indexes[kind].upsert(row_id, name, seller_id)
+
+    def _change(self, kind: str, row_id: int, name: Optional[str] = None, seller_id: Optional[int] = None) -> None:
+        with self._lock:
+            if self._changes is not None:
+                self._changes.append((kind, row_id, name, seller_id))
+            if self._indexes is not None:
+                self._apply(self._indexes, kind, row_id, name, seller_id)
+
+    def upsert(self, kind: str, row_id: int, name: str, seller_id: int) -> None:
+        self._change(kind, row_id, name, seller_id)
+
+    def discard(self, kind: str, row_id: int) -> None:
+        self._change(kind, row_id)
+
+    def suggest(self, prefix: str, seller_id: Optional[int] = None, limit: int = 10) -> Dict[str, List[Tuple[int, str]]]:
+        """
+        Return ranked suggestions per kind for `prefix`. Scoped to a seller,
+        only that seller's products and categories are suggested.
+        """
+        self._refresh()
+        kinds = ('products', 'categories') if seller_id is not None else tuple(self.sources)
+        with self._lock:
+            if self._indexes is None:  # The first build is still running, or failed
+                return {kind: [] for kind in kinds}
+            return {kind: self._indexes[kind].search(prefix, seller_id, limit) for kind in kinds}
+
+    def memory_bytes(self) -> Dict[str, int]:
+        with self._lock:
+            return {kind: index.memory_bytes() for kind, index in (self._indexes or {}).items()}
+
+
+catalog_typeahead = CatalogTypeahead()
@@ -4,15 +4,27 @@ from rest_framework.decorators import api_view, permission_classes, parser_class
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Category, Seller
-from .serializers import CategorySerializer, ProductSerializer
-from rest_framework.permissions import IsAuthenticated
+from .models import Category, Seller, Product
+from .serializers import (CategorySerializer, ProductSerializer, ProductListSerializer, ProductCursorPagination,
+                          ProductSearchPagination, ProductSearchResultSerializer, CategorySearchResultSerializer,
+                          StockReservationSerializer)
+from rest_framework.permissions import IsAuthenticated, AllowAny
 from user.models import UserModel   
 from .decorators import restrict_user_type
-from .utils.product_utils import (create_category_helper,get_category_helper,update_category_helper,delete_category_helper)
+from user.utils.seller_context import get_request_seller
+from .utils.product_search import search_products, search_categories
+from .utils.typeahead import catalog_typeahead
+from .utils.catalog_export import EXPORT_FORMATS, EXPORT_KINDS, export_catalog, export_file_name
+from .utils.stock_reservation import (InsufficientStock, ReservationClosed, commit_reservation, release_reservation,
+                                      reserve_stock, set_stock_shards)
+from .utils.product_utils import (create_category_helper,get_category_helper,update_category_helper,delete_category_helper,
+                                  get_category_tree_helper, get_category_breadcrumbs_helper, list_products_helper,
+                                  bulk_save_products_helper)
 import logging
 from drf_yasg import openapi 
 from django.core.exceptions import ObjectDoesNotExist
+from django.http import StreamingHttpResponse
+from decimal import Decimal, InvalidOperation
 from rest_framework.parsers import MultiPartParser, FormParser
 # DRF Extensions
 from drf_yasg.utils import swagger_auto_schema
@@ -98,7 +110,6 @@ def get_category(request, category_id: int):
 @restrict_user_type('Seller') 
 def update_category(request, category_id):
     try:
-        print(request.user)
         category = update_category_helper(request, category_id)
         return Response({
             "message": "Category updated successfully",
@@ -160,8 +171,13 @@ def delete_category(request, category_id):
     method='get',
     operation_summary="Get seller's categories with subcategories",
     operation_description=(
-        "Retrieve all parent categories for the authenticated seller along with their child categories."
+        "Retrieve the authenticated seller's category tree, nested to any depth. "
+        "Pass `root` to only fetch the subtree under one category."
     ),
+    manual_parameters=[
+        openapi.Parameter('root', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, required=False,
+                          description="Only return this category and its subcategories."),
+    ],
     responses={
         200: openapi.Response(
             description="Categories retrieved successfully",
@@ -171,25 +187,30 @@ def delete_category(request, category_id):
                         "category_id": 1,
                         "name": "Bedroom",
                         "description": "Furniture for bedrooms.",
-                        "image": "binary_data",
+                        "image_url": "/blobs/category-image/1/",
                         "parent_category": None,
+                        "depth": 0,
                         "is_active": True,
                         "subcategories": [
                             {
                                 "category_id": 2,
                                 "name": "4x6 Bed",
                                 "description": "Small-sized bed.",
-                                "image": "binary_data",
+                                "image_url": "/blobs/category-image/1/",
                                 "parent_category": 1,
-                                "is_active": True
+                                "depth": 1,
+                                "is_active": True,
+                                "subcategories": []
                             },
                             {
                                 "category_id": 3,
                                 "name": "6x6 Bed",
                                 "description": "Large-sized bed.",
-                                "image": "binary_data",
+                                "image_url": "/blobs/category-image/1/",
                                 "parent_category": 1,
-                                "is_active": True
+                                "depth": 1,
+                                "is_active": True,
+                                "subcategories": []
                             }
                         ]
                     }
@@ -205,39 +226,25 @@ def delete_category(request, category_id):
 @permission_classes([IsAuthenticated])
 def get_categories_with_children(request):
     try:
-        # Get the authenticated user
-        user = request.user
-        print(user.user_id)
         # Retrieve the seller profile associated with the user
-        try:
-            seller = Seller.objects.get(user_id=request.user.user_id) 
-            print(seller)  
-        except ObjectDoesNotExist:
+        seller = get_request_seller(request)
+        if seller is None:
             return Response(
                 {"error": "Seller profile does not exist for the user."},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # Fetch parent categories with parent_category as None or 0
-        parent_categories = Category.objects.filter(
-            seller_id=seller.seller_id,
-            parent_category__isnull=True
-        ) | Category.objects.filter(
-            seller=seller,
-            parent_category=0
-        )
-
-        # Structure the response to include subcategories for each parent
-        categories_with_children = []
-        for parent in parent_categories:
-            # Fetch subcategories for the current parent
-            subcategories = Category.objects.filter(parent_category=parent)
-            parent_data = CategorySerializer(parent).data
-            parent_data['subcategories'] = CategorySerializer(subcategories, many=True).data
-            categories_with_children.append(parent_data)
+        # The whole tree (or the subtree under ?root=) in one query, nested in memory
+        root_id = request.query_params.get('root')
+        if root_id is not None and not root_id.isdigit():
+            return Response({"error": "root must be a category ID."}, status=status.HTTP_400_BAD_REQUEST)
+        categories_with_children = get_category_tree_helper(seller, int(root_id) if root_id else None)
 
         return Response(categories_with_children, status=status.HTTP_200_OK)
 
+    except NotFound as nf:
+        return Response({"error": str(nf)}, status=status.HTTP_404_NOT_FOUND)
+
     except Exception as e:
         return Response(
             {"error": "An unexpected error occurred.", "details": str(e)},
@@ -246,6 +253,46 @@ def get_categories_with_children(request):
     
 
 
+@swagger_auto_schema(
+    method='get',
+    operation_summary="Get the breadcrumbs of a category",
+    operation_description="Return the chain of categories from the root down to the given category.",
+    responses={
+        200: openapi.Response(
+            description="Breadcrumbs retrieved successfully",
+            examples={
+                "application/json": [
+                    {"category_id": 1, "name": "Bedroom"},
+                    {"category_id": 2, "name": "4x6 Bed"},
+                ]
+            },
+        ),
+        403: "Forbidden",
+        404: "Not Found",
+        500: "Internal Server Error",
+    },
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_category_breadcrumbs(request, category_id: int):
+    try:
+        breadcrumbs = get_category_breadcrumbs_helper(request.user, category_id)
+        return Response(breadcrumbs, status=status.HTTP_200_OK)
+
+    except PermissionDenied as pd:
+        logger.warning(f"Permission denied: {pd}")
+        return Response({"error": str(pd)}, status=status.HTTP_403_FORBIDDEN)
+
+    except NotFound as nf:
+        logger.error(f"Not found: {nf}")
+        return Response({"error": str(nf)}, status=status.HTTP_404_NOT_FOUND)
+
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return Response({"error": "An unexpected error occurred. Please try again later."},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 # Swagger auto schema for the request body and responses
 @swagger_auto_schema(
     request_body=ProductSerializer,
@@ -290,4 +337,434 @@ def create_product(request) -> Response:
 
     except Exception as e:
         # General exception handling for unforeseen errors
-        return Response({"detail": f"An unexpected error occurred: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response({"detail": f"An unexpected error occurred: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@swagger_auto_schema(
+    method='post',
+    operation_summary="Create and update products in bulk",
+    operation_description="Items with a `product_id` update that product of the seller (any subset of "
+                          "fields), the others create a product. Valid items are written in one "
+                          "transaction; results list every item, in request order, with its status "
+                          "(created, updated, failed or skipped) and errors. At most "
+                          "PRODUCT_BULK_MAX_ITEMS items per request.",
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={'products': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT))},
+        required=['products'],
+    ),
+    manual_parameters=[
+        openapi.Parameter('atomic', openapi.IN_QUERY,
+                          description="When true, one invalid item writes nothing (the others come back skipped).",
+                          type=openapi.TYPE_BOOLEAN, required=False),
+    ],
+    responses={
+        200: "Every item was written.",
+        207: "Some items failed; the others were written.",
+        400: "No item was written, or the batch itself is invalid.",
+        403: "Forbidden",
+    },
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_save_products(request) -> Response:
+    try:
+        if request.user.user_type != 'seller':
+            return Response({"detail": "Only sellers can create products."}, status=status.HTTP_403_FORBIDDEN)
+
+        items = request.data.get('products') if hasattr(request.data, 'get') else request.data
+        atomic = request.query_params.get('atomic', '').lower() in ('1', 'true', 'yes')
+        outcome = bulk_save_products_helper(request, items, atomic=atomic)
+
+        if not outcome['failed']:
+            response_status = status.HTTP_200_OK
+        elif outcome['created'] or outcome['updated']:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(outcome, status=response_status)
+
+    except ValidationError as e:
+        return Response({"error": "Invalid batch", "details": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+    except PermissionDenied as e:
+        return Response({"detail": str(e)}, status=status.HTTP_403_FORBIDDEN)
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return Response({"error": "An unexpected error occurred. Please try again later."},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_summary="Browse products",
+    manual_parameters=[
+        openapi.Parameter('seller', openapi.IN_QUERY, description="Only products of this seller ID.",
+                          type=openapi.TYPE_INTEGER, required=False),
+        openapi.Parameter('category', openapi.IN_QUERY,
+                          description="Only products in this category ID or its subcategories.",
+                          type=openapi.TYPE_INTEGER, required=False),
+        openapi.Parameter('default_category', openapi.IN_QUERY, description="Only products of this seller category.",
+                          type=openapi.TYPE_STRING, enum=[choice for choice, _ in Seller.CATEGORY], required=False),
+        openapi.Parameter('is_active', openapi.IN_QUERY,
+                          description="Defaults to true. Sellers may list their own inactive products.",
+                          type=openapi.TYPE_BOOLEAN, required=False),
+        openapi.Parameter('min_price', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, required=False),
+        openapi.Parameter('max_price', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, required=False),
+        openapi.Parameter('ordering', openapi.IN_QUERY, description="newest (default), price or -price.",
+                          type=openapi.TYPE_STRING, enum=list(ProductCursorPagination.orderings), required=False),
+        openapi.Parameter('cursor', openapi.IN_QUERY,
+                          description="Opaque cursor taken from the `next` link of the previous page.",
+                          type=openapi.TYPE_STRING, required=False),
+        openapi.Parameter('page_size', openapi.IN_QUERY, description="Items per page (default 20, max 100).",
+                          type=openapi.TYPE_INTEGER, required=False),
+    ],
+    responses={
+        200: "Products fetched successfully.",
+        400: "Invalid query parameters.",
+        403: "Inactive products of another seller requested.",
+        404: "Category not found.",
+    },
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def list_products(request) -> Response:
+    try:
+        params = request.query_params
+        filters = {}
+        if params.get('seller'):
+            filters['seller_id'] = int(params['seller'])
+        if params.get('default_category'):
+            if params['default_category'] not in dict(Seller.CATEGORY):
+                raise ValueError(f"Unknown seller category '{params['default_category']}'.")
+            filters['default_category'] = params['default_category']
+        if params.get('min_price'):
+            filters['price__gte'] = Decimal(params['min_price'])
+        if params.get('max_price'):
+            filters['price__lte'] = Decimal(params['max_price'])
+
+        is_active = params.get('is_active', 'true').lower()
+        if is_active not in ('true', 'false'):
+            raise ValueError("is_active must be true or false.")
+        filters['is_active'] = is_active == 'true'
+        if not filters['is_active']:
+            seller = get_request_seller(request)
+            if seller is None or filters.get('seller_id') != seller.seller_id:
+                raise PermissionDenied("Only the seller can list their inactive products.")
+
+        category_id = int(params['category']) if params.get('category') else None
+
+        paginator = ProductCursorPagination()
+        page_size = paginator.get_page_size(request)
+        ordering = paginator.get_ordering(request)
+        after = paginator.decode_cursor(request, ordering)
+
+        products, next_position = list_products_helper(
+            filters, category_id=category_id, ordering=ordering, after=after, limit=page_size,
+        )
+        return paginator.get_paginated_response(
+            request, ProductListSerializer(products, many=True).data, ordering, next_position,
+        )
+
+    except (ValueError, InvalidOperation) as e:
+        return Response({"error": "Invalid input in query parameters", "details": str(e)},
+                        status=status.HTTP_400_BAD_REQUEST)
+    except PermissionDenied as pd:
+        return Response({"error": str(pd)}, status=status.HTTP_403_FORBIDDEN)
+    except NotFound as nf:
+        return Response({"error": str(nf)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return Response({"error": "An unexpected error occurred. Please try again later."},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_summary="Search products",
+    operation_description="Full-text search over product names, titles, descriptions and category names, "
+                          "best matches first. The last word also matches as a prefix. When a query matches more "
+                          "than PRODUCT_SEARCH_MAX_CANDIDATES products (20000 by default), only the newest that many "
+                          "are ranked, so older matches of very common words are not returned.",
+    manual_parameters=[
+        openapi.Parameter('q', openapi.IN_QUERY, description="Search words.", type=openapi.TYPE_STRING, required=True),
+        openapi.Parameter('seller', openapi.IN_QUERY, description="Only products of this seller ID.",
+                          type=openapi.TYPE_INTEGER, required=False),
+        openapi.Parameter('category', openapi.IN_QUERY,
+                          description="Only products in this category ID or its subcategories.",
+                          type=openapi.TYPE_INTEGER, required=False),
+        openapi.Parameter('cursor', openapi.IN_QUERY,
+                          description="Opaque cursor taken from the `next` link of the previous page.",
+                          type=openapi.TYPE_STRING, required=False),
+        openapi.Parameter('page_size', openapi.IN_QUERY, description="Items per page (default 20, max 100).",
+                          type=openapi.TYPE_INTEGER, required=False),
+    ],
+    responses={200: "Matching products.", 400: "Invalid query parameters.", 404: "Category not found."},
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def product_search(request) -> Response:
+    try:
+        params = request.query_params
+        seller_id = int(params['seller']) if params.get('seller') else None
+        category_id = int(params['category']) if params.get('category') else None
+
+        paginator = ProductSearchPagination()
+        page_size = paginator.get_page_size(request)
+        ordering = paginator.get_ordering(request)
+        after = paginator.decode_cursor(request, ordering)
+
+        products, next_position = search_products(
+            params.get('q', ''), seller_id=seller_id, category_id=category_id, after=after, limit=page_size,
+        )
+        return paginator.get_paginated_response(
+            request, ProductSearchResultSerializer(products, many=True).data, ordering, next_position,
+        )
+
+    except ValueError as e:
+        return Response({"error": "Invalid input in query parameters", "details": str(e)},
+                        status=status.HTTP_400_BAD_REQUEST)
+    except NotFound as nf:
+        return Response({"error": str(nf)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return Response({"error": "An unexpected error occurred. Please try again later."},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_summary="Search categories",
+    manual_parameters=[
+        openapi.Parameter('q', openapi.IN_QUERY, description="Search words.", type=openapi.TYPE_STRING, required=True),
+        openapi.Parameter('seller', openapi.IN_QUERY, description="Only categories of this seller ID.",
+                          type=openapi.TYPE_INTEGER, required=False),
+        openapi.Parameter('limit', openapi.IN_QUERY, description="Maximum results (default 20, max 50).",
+                          type=openapi.TYPE_INTEGER, required=False),
+    ],
+    responses={200: "Matching categories.", 400: "Invalid query parameters."},
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def category_search(request) -> Response:
+    try:
+        params = request.query_params
+        seller_id = int(params['seller']) if params.get('seller') else None
+        limit = int(params.get('limit', 20))
+        if limit < 1:
+            raise ValueError("limit must be a positive integer.")
+
+        categories = search_categories(params.get('q', ''), seller_id=seller_id, limit=min(limit, 50))
+        return Response({"results": CategorySearchResultSerializer(categories, many=True).data},
+                        status=status.HTTP_200_OK)
+
+    except ValueError as e:
+        return Response({"error": "Invalid input in query parameters", "details": str(e)},
+                        status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return Response({"error": "An unexpected error occurred. Please try again later."},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_summary="Search box suggestions",
+    operation_description="Product, category and seller names starting with `q`, shortest first. "
+                          "Scoped to a seller, only that seller's products and categories are suggested.",
+    manual_parameters=[
+        openapi.Parameter('q', openapi.IN_QUERY, description="What the user typed so far.",
+                          type=openapi.TYPE_STRING, required=True),
+        openapi.Parameter('seller', openapi.IN_QUERY, description="Only suggestions of this seller ID.",
+                          type=openapi.TYPE_INTEGER, required=False),
+        openapi.Parameter('limit', openapi.IN_QUERY, description="Suggestions per kind (default 8, max 20).",
+                          type=openapi.TYPE_INTEGER, required=False),
+    ],
+    responses={200: "Suggestions per kind.", 400: "Invalid query parameters."},
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def typeahead(request) -> Response:
+    try:
+        params = request.query_params
+        prefix = params.get('q', '').strip()
+        if not prefix or len(prefix) > 100:
+            raise ValueError("q must be between 1 and 100 characters.")
+        seller_id = int(params['seller']) if params.get('seller') else None
+        limit = int(params.get('limit', 8))
+        if limit < 1:
+            raise ValueError("limit must be a positive integer.")
+
+        suggestions = catalog_typeahead.suggest(prefix, seller_id=seller_id, limit=min(limit, 20))
+        return Response({
+            kind: [{"id": row_id, "name": name} for row_id, name in matches]
+            for kind, matches in suggestions.items()
+        }, status=status.HTTP_200_OK)
+
+    except ValueError as e:
+        return Response({"error": "Invalid input in query parameters", "details": str(e)},
+                        status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return Response({"error": "An unexpected error occurred. Please try again later."},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_summary="Export the seller's catalog",
+    operation_description="Streams every product (or category) of the authenticated seller as CSV or JSON "
+                          "Lines, optionally gzipped. The product CSV can be imported again with import_catalog.",
+    manual_parameters=[
+        openapi.Parameter('kind', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(EXPORT_KINDS),
+                          description="products (default) or categories.", required=False),
+        openapi.Parameter('file_format', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(EXPORT_FORMATS),
+                          description="csv (default) or jsonl.", required=False),
+        openapi.Parameter('gzip', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN,
+                          description="Compress the file on the fly.", required=False),
+    ],
+    responses={200: "The export file, streamed.", 400: "Invalid query parameters.", 403: "Forbidden"},
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_catalog_view(request):
+    try:
+        seller = get_request_seller(request)
+        if request.user.user_type != 'seller' or seller is None:
+            return Response({"detail": "Only sellers can export their catalog."}, status=status.HTTP_403_FORBIDDEN)
+
+        params = request.query_params
+        kind = params.get('kind', 'products')
+        fmt = params.get('file_format', 'csv')
+        compress = params.get('gzip', '').lower() in ('1', 'true', 'yes')
+        if kind not in EXPORT_KINDS or fmt not in EXPORT_FORMATS:
+            raise ValueError(f"kind must be one of {', '.join(EXPORT_KINDS)} "
+                             f"and file_format one of {', '.join(EXPORT_FORMATS)}.")
+
+        content_type = 'application/gzip' if compress else \
+            'text/csv; charset=utf-8' if fmt == 'csv' else 'application/x-ndjson'
+        base_url = request.build_absolute_uri('/').rstrip('/')
+        response = StreamingHttpResponse(export_catalog(seller, kind, fmt, compress, base_url=base_url),
+                                         content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{export_file_name(seller, kind, fmt, compress)}"'
+        return response
+
+    except ValueError as e:
+        return Response({"error": "Invalid input in query parameters", "details": str(e)},
+                        status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return Response({"error": "An unexpected error occurred. Please try again later."},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@swagger_auto_schema(
+    method='post',
+    operation_summary="Reserve stock of a product",
+    operation_description="Holds units of the product for the authenticated user until the reservation is "
+                          "committed or released, or for STOCK_RESERVATION_TTL seconds, after which they "
+                          "return to the stock.",
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={'quantity': openapi.Schema(type=openapi.TYPE_INTEGER, minimum=1)},
+        required=['quantity'],
+    ),
+    responses={201: StockReservationSerializer, 400: "Invalid quantity.", 404: "Product not found.",
+               409: "Not enough stock."},
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def reserve_product_stock(request, product_id: int) -> Response:
+    try:
+        serializer = StockReservationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        reservation = reserve_stock(product_id, request.user, serializer.validated_data['quantity'])
+        return Response(StockReservationSerializer(reservation).data, status=status.HTTP_201_CREATED)
+
+    except ValidationError as e:
+        return Response({"error": "Invalid input", "details": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+    except NotFound as nf:
+        return Response({"error": str(nf)}, status=status.HTTP_404_NOT_FOUND)
+    except InsufficientStock as e:
+        return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return Response({"error": "An unexpected error occurred. Please try again later."},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _close_reservation(request, reservation_id: int, close) -> Response:
+    try:
+        reservation = close(reservation_id, request.user)
+        return Response(StockReservationSerializer(reservation).data, status=status.HTTP_200_OK)
+
+    except NotFound as nf:
+        return Response({"error": str(nf)}, status=status.HTTP_404_NOT_FOUND)
+    except ReservationClosed as e:
+        return Response({"error": str(e), "status": e.status}, status=status.HTTP_409_CONFLICT)
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return Response({"error": "An unexpected error occurred. Please try again later."},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@swagger_auto_schema(
+    method='post',
+    operation_summary="Commit a stock reservation",
+    operation_description="Turns a pending reservation of the authenticated user into a sale.",
+    responses={200: StockReservationSerializer, 404: "Reservation not found.",
+               409: "The reservation was already committed, released or has expired."},
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def commit_stock_reservation(request, reservation_id: int) -> Response:
+    return _close_reservation(request, reservation_id, commit_reservation)
+
+
+@swagger_auto_schema(
+    method='post',
+    operation_summary="Release a stock reservation",
+    operation_description="Cancels a pending reservation of the authenticated user, returning its units to the stock.",
+    responses={200: StockReservationSerializer, 404: "Reservation not found.",
+               409: "The reservation was already committed, released or has expired."},
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def release_stock_reservation(request, reservation_id: int) -> Response:
+    return _close_reservation(request, reservation_id, release_reservation)
+
+
+@swagger_auto_schema(
+    method='put',
+    operation_summary="Shard a product's stock",
+    operation_description="Spreads the free stock of a product many buyers reserve at once (a flash sale) over "
+                          "`shards` counters, so their reservations update different rows. 0 merges them back.",
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={'shards': openapi.Schema(type=openapi.TYPE_INTEGER, minimum=0)},
+        required=['shards'],
+    ),
+    responses={200: "The product's shards and free stock.", 400: "Invalid shard count.", 403: "Forbidden",
+               404: "Product not found."},
+)
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def shard_product_stock(request, product_id: int) -> Response:
+    try:
+        seller = get_request_seller(request)
+        if request.user.user_type != 'seller' or seller is None:
+            return Response({"detail": "Only sellers can manage stock."}, status=status.HTTP_403_FORBIDDEN)
+        if not Product.objects.filter(pk=product_id, seller_id=seller).exists():
+            raise NotFound(f"Product with ID {product_id} does not exist.")
+
+        shards = request.data.get('shards') if hasattr(request.data, 'get') else None
+        if isinstance(shards, bool) or not isinstance(shards, int):
+            raise ValueError("shards must be an integer.")
+        return Response(set_stock_shards(product_id, shards), status=status.HTTP_200_OK)
+
+    except ValueError as e:
+        return Response({"error": "Invalid input", "details": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except NotFound as nf:
+        return Response({"error": str(nf)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return Response({"error": "An unexpected error occurred. Please try again later."},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
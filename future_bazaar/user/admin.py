@@ -1,9 +1,11 @@
 # apps/users/admin.py
 from django.contrib import admin
 from .models import UserModel, Seller
-from ipware import get_client_ip
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
+from django.db.models import ExpressionWrapper, F, FloatField, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+import math
+from .utils.geo_utils import EARTH_RADIUS_KM
+from .utils.geoip_utils import get_request_location
 
 # Registering the UserModel (custom user model)
 class UserModelAdmin(admin.ModelAdmin):
@@ -32,51 +34,45 @@ class SellerAdmin(admin.ModelAdmin):
     
     def reject_seller(self, request, queryset):
         """Reject selected seller profiles."""
-        queryset.update(is_approved=False)
-        queryset.update(is_active=False)
+        # Save each seller so signal receivers see the change
+        for seller in queryset:
+            seller.is_approved = False
+            seller.is_active = False
+            seller.save()
         self.message_user(request, "Selected seller profiles have been rejected.")
 
-    def get_admin_location(self, request):
+    def get_queryset(self, request):
         """
-        Retrieve the admin's approximate location using their IP address.
+        Annotate every row with its distance from the admin in the same query,
+        using the admin's location resolved once for this request.
         """
-        # Get the client's IP address
-        ip, is_routable = get_client_ip(request)
-        if ip is None:
-            return None  # Unable to determine IP address
+        queryset = super().get_queryset(request)
+        admin_location = get_request_location(request)
+        if admin_location is None:
+            return queryset.annotate(admin_distance_km=Value(None, output_field=FloatField()))
 
-        try:
-            # Use Nominatim or another geolocation service to get coordinates
-            geolocator = Nominatim(user_agent="django-admin-location")
-            location = geolocator.geocode(ip)
-            if location:
-                return location.latitude, location.longitude
-        except Exception as e:
-            print(f"Error fetching admin location: {str(e)}")
-            return None
+        # Haversine distance, evaluated by the database for the whole page
+        admin_lat, admin_lng = map(math.radians, admin_location)
+        seller_lat = Radians(F('geo_location_lat'))
+        half_dlat = (seller_lat - admin_lat) / 2
+        half_dlng = (Radians(F('geo_location_lng')) - admin_lng) / 2
+        a = Power(Sin(half_dlat), 2) + math.cos(admin_lat) * Cos(seller_lat) * Power(Sin(half_dlng), 2)
+        return queryset.annotate(
+            admin_distance_km=ExpressionWrapper(2 * EARTH_RADIUS_KM * ASin(Sqrt(a)), output_field=FloatField())
+        )
 
     def distance_from_admin(self, obj):
         """
-        Calculate the distance of the seller from the admin's location.
+        Display the distance of the seller from the admin's location.
         """
-        # Use the admin's request object to fetch the IP-based location
-        admin_location = self.get_admin_location(self.request)
-
-        # Validate both admin and seller location exist
-        if admin_location and obj.geo_location_lat and obj.geo_location_lng:
-            seller_location = (obj.geo_location_lat, obj.geo_location_lng)
-            distance = geodesic(admin_location, seller_location).kilometers
-            return f"{distance:.2f} km"
-        return "N/A"
+        distance = getattr(obj, 'admin_distance_km', None)
+        if distance is None:
+            return "N/A"
+        return f"{distance:.2f} km"
 
     distance_from_admin.short_description = "Distance (km)"  # Column header in admin table
+    distance_from_admin.admin_order_field = "admin_distance_km"
 
-    def changelist_view(self, request, extra_context=None):
-        """
-        Override changelist_view to attach the request object for distance calculation.
-        """
-        self.request = request
-        return super().changelist_view(request, extra_context=extra_context)
     approve_seller.short_description = "Approve selected seller profiles"
     reject_seller.short_description = "Reject selected seller profiles"
 
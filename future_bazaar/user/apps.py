@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
 
 
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .utils.token_purge import start_purge_scheduler
+
+        # Started with the first request so management commands never spawn it
+        request_started.connect(start_purge_scheduler, dispatch_uid='user.start_purge_scheduler')
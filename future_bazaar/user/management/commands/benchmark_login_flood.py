@@ -0,0 +1,79 @@
+import asyncio
+import time
+from collections import Counter
+from typing import List, Optional
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, override_settings
+
+from user.models import UserModel
+
+
+LOGIN_PATHS = ('/user/api/v1/login/', '/user/api/v1/login/async/')
+
+
+class Command(BaseCommand):
+    help = (
+        "Time requests to another endpoint while logins flood the ASGI application, first idle, then during "
+        "a flood of the sync login view and of the async one. Rate limits are lifted for the run; a temporary "
+        "user is created and deleted again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=100, help="Logins sent per flood.")
+        parser.add_argument('--concurrency', type=int, default=32, help="Logins in flight at once.")
+        parser.add_argument('--probe-path', default='/product/products/', help="Endpoint whose latency is measured.")
+        parser.add_argument('--probe-interval', type=float, default=0.02, help="Seconds between probe requests.")
+        parser.add_argument('--idle-probes', type=int, default=200, help="Probe requests timed without a flood.")
+
+    def handle(self, *args, **options):
+        email, password = 'login-benchmark@example.invalid', 'benchmark-password'
+        UserModel.objects.filter(email=email).delete()
+        user = UserModel.objects.create(email=email, contact_number='login-benchmark', first_name='Login',
+                                        last_name='Benchmark', password=make_password(password))
+        try:
+            with override_settings(RATE_LIMITS={}):
+                asyncio.run(self._run(options, {'identifier': email, 'password': password}))
+        finally:
+            user.delete()
+
+    async def _run(self, options, credentials: dict) -> None:
+        client = AsyncClient()
+        self.stdout.write(f"{'flood':>26} {'probes':>7} {'median ms':>10} {'p99 ms':>8} {'max ms':>8}  logins")
+        self._report('none', await self._probe(client, options), Counter())
+        for path in LOGIN_PATHS:
+            statuses = Counter()
+            flood = asyncio.ensure_future(self._flood(client, path, credentials, options, statuses))
+            self._report(path, await self._probe(client, options, flood), statuses)
+            await flood
+
+    @staticmethod
+    async def _flood(client: AsyncClient, path: str, credentials: dict, options, statuses: Counter) -> None:
+        logins = iter(range(options['logins']))
+
+        async def send():
+            for _ in logins:
+                response = await client.post(path, credentials, content_type='application/json')
+                statuses[response.status_code] += 1
+
+        await asyncio.gather(*(send() for _ in range(options['concurrency'])))
+
+    @staticmethod
+    async def _probe(client: AsyncClient, options, flood: Optional[asyncio.Future] = None) -> List[float]:
+        timings = []
+        while not flood.done() if flood is not None else len(timings) < options['idle_probes']:
+            started = time.perf_counter()
+            await client.get(options['probe_path'])
+            timings.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(options['probe_interval'])
+        return sorted(timings)
+
+    def _report(self, flood: str, timings: List[float], statuses: Counter) -> None:
+        if not timings:
+            self.stdout.write(f"{flood:>26} {0:>7}")
+            return
+        median = timings[len(timings) // 2]
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        logins = ', '.join(f"{count}x{code}" for code, count in sorted(statuses.items()))
+        self.stdout.write(f"{flood:>26} {len(timings):>7} {median:>10.2f} {p99:>8.2f} {timings[-1]:>8.2f}  {logins}")
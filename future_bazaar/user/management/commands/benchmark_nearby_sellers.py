@@ -0,0 +1,103 @@
+import datetime
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from geopy.distance import geodesic
+
+from user.models import Seller, UserModel
+from user.utils.geo_utils import geo_cell_for
+from user.utils.seller_locator import SellerLocationSnapshot
+from user.utils.user_utils import NEARBY_SELLERS_RADIUS_KM, _nearby_sellers_from_database
+
+
+# Sellers and searches are spread over inhabited latitudes
+MIN_LAT, MAX_LAT = -60.0, 70.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Time nearby seller lookups as the seller table grows, with the full table scan this replaced, "
+        "the grid-indexed database search and the in-memory snapshot. Runs in a transaction that is "
+        "rolled back, so no rows are left behind."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000,1000000',
+                            help="Comma-separated seller counts to measure at.")
+        parser.add_argument('--queries', type=int, default=200, help="Searches timed per size and engine.")
+        parser.add_argument('--radius', type=float, default=NEARBY_SELLERS_RADIUS_KM)
+        parser.add_argument('--limit', type=int, default=20, help="Sellers per page.")
+        parser.add_argument('--scan-max', type=int, default=10000,
+                            help="Largest size the full table scan is timed at; it grows linearly.")
+        parser.add_argument('--scan-queries', type=int, default=20, help="Searches timed with the full table scan.")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        rng = random.Random(options['seed'])
+        points = [(rng.uniform(MIN_LAT, MAX_LAT), rng.uniform(-180, 180)) for _ in range(options['queries'])]
+        radius, limit = options['radius'], options['limit']
+
+        self.stdout.write(f"{'sellers':>9} {'engine':>7} {'median ms':>10} {'p95 ms':>8} {'found':>6}")
+        with transaction.atomic():
+            created = 0
+            for size in sizes:
+                self._add_sellers(created, size, rng)
+                created = size
+
+                engines = {
+                    'grid': lambda lat, lng: _nearby_sellers_from_database(lat, lng, radius, limit=limit),
+                }
+                if size <= options['scan_max']:
+                    engines['scan'] = lambda lat, lng: self._full_scan(lat, lng, radius, limit)
+                snapshot = SellerLocationSnapshot()
+                snapshot.load()
+                engines['memory'] = lambda lat, lng: snapshot.nearest(lat, lng, radius, limit=limit)
+
+                for name, search in engines.items():
+                    timings, found = [], 0
+                    for lat, lng in points[:options['scan_queries']] if name == 'scan' else points:
+                        started = time.perf_counter()
+                        found += len(search(lat, lng))
+                        timings.append((time.perf_counter() - started) * 1000)
+                    timings.sort()
+                    self.stdout.write(
+                        f"{size:>9} {name:>7} {statistics.median(timings):>10.2f} "
+                        f"{timings[int(len(timings) * 0.95)]:>8.2f} {found / len(timings):>6.1f}"
+                    )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _full_scan(lat, lng, radius, limit):
+        # What get_nearby_sellers did before the grid index: every row, one geodesic each
+        matches = []
+        for seller_id, seller_lat, seller_lng in Seller.objects.values_list('seller_id', 'geo_location_lat',
+                                                                           'geo_location_lng'):
+            distance_km = geodesic((lat, lng), (seller_lat, seller_lng)).km
+            if distance_km <= radius:
+                matches.append((distance_km, seller_id))
+        return sorted(matches)[:limit]
+
+    def _add_sellers(self, start: int, end: int, rng: random.Random, batch_size: int = 5000) -> None:
+        started = time.monotonic()
+        for low in range(start, end, batch_size):
+            high = min(low + batch_size, end)
+            users = UserModel.objects.bulk_create([
+                UserModel(email=f"bench-seller-{i}@example.invalid", contact_number=f"b{i}", first_name='Bench',
+                          last_name='Seller', password='!', user_type='seller')
+                for i in range(low, high)
+            ])
+            sellers = []
+            for user in users:
+                lat, lng = rng.uniform(MIN_LAT, MAX_LAT), rng.uniform(-180, 180)
+                sellers.append(Seller(
+                    user_id=user, business_name='Bench', business_address='-', business_contact_number='-',
+                    is_seller_exclusives=False, shop_timing_open=datetime.time(9), shop_timing_close=datetime.time(18),
+                    shop_location='-', geo_location_lat=lat, geo_location_lng=lng, geo_cell=geo_cell_for(lat, lng),
+                    is_approved=True, days_closed='',
+                ))
+            Seller.objects.bulk_create(sellers)
+        self.stderr.write(f"Added sellers {start}-{end} in {time.monotonic() - started:.1f}s")
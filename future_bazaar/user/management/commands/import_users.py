@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from user.utils.user_import import IMPORT_FORMATS, UserImport, detect_import_format, read_import_rows
+
+
+class Command(BaseCommand):
+    help = "Create end users from a CSV (with a header row) or JSON Lines file, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File with first_name, last_name, email, contact_number and password or password_hash.")
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows validated and inserted per batch.")
+        parser.add_argument('--workers', type=int, help="Password hashing processes. Defaults to the CPU count.")
+        parser.add_argument('--report', help="Write rejected rows as JSON Lines here instead of stdout.")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_import_format(options['path'])
+        importer = UserImport(batch_size=options['batch_size'], hash_workers=options['workers'])
+        report = open(options['report'], 'w') if options['report'] else self.stdout
+        try:
+            with open(options['path'], 'rb') as source:
+                for rejected in importer.run(read_import_rows(source, fmt)):
+                    report.write(json.dumps(rejected) + '\n')
+        finally:
+            if options['report']:
+                report.close()
+
+        summary = importer.summary()
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {summary['created']} users, rejected {summary['failed']} rows "
+            f"in {summary['elapsed_seconds']:.1f}s ({summary['rows_per_second']} rows/s)"
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from user.utils.token_purge import purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding, blacklisted and revoked access tokens, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows deleted per transaction.")
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help="Seconds to sleep between batches, leaving room for live writes.",
+        )
+
+    def handle(self, *args, **options):
+        result = purge_expired_tokens(batch_size=options['batch_size'], pause=options['pause'])
+        removed = result['removed']
+        for table, count in removed.items():
+            self.stdout.write(f"{table}: removed {count} rows")
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {sum(removed.values())} expired token rows in {result['elapsed_seconds']:.1f}s"
+        ))
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.17 on 2026-10-17 00:20
+
+from django.db import migrations, models
+
+from user.utils.geo_utils import geo_cell_for
+
+
+def populate_geo_cells(apps, schema_editor):
+    Seller = apps.get_model('user', 'Seller')
+    sellers = Seller.objects.filter(geo_location_lat__isnull=False, geo_location_lng__isnull=False)
+    batch = []
+    for seller in sellers.only('seller_id', 'geo_location_lat', 'geo_location_lng').iterator(chunk_size=2000):
+        seller.geo_cell = geo_cell_for(seller.geo_location_lat, seller.geo_location_lng)
+        batch.append(seller)
+        if len(batch) >= 2000:
+            Seller.objects.bulk_update(batch, ['geo_cell'])
+            batch = []
+    if batch:
+        Seller.objects.bulk_update(batch, ['geo_cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0006_remove_seller_geo_location_seller_geo_location_lat_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seller',
+            name='geo_cell',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='seller',
+            index=models.Index(fields=['geo_cell', 'geo_location_lat', 'geo_location_lng'], name='seller_geo_cell_idx'),
+        ),
+        migrations.RunPython(populate_geo_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.17 on 2026-10-17 00:27
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0007_seller_geo_cell'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IpGeolocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip_address', models.GenericIPAddressField(unique=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('source', models.CharField(blank=True, max_length=20)),
+                ('resolved_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'ip_geolocation',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.17 on 2026-10-17 00:29
+
+import blobstore.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0008_ipgeolocation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seller',
+            name='shop_photo_file',
+            field=models.FileField(blank=True, storage=blobstore.storage.get_blob_storage, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='usermodel',
+            name='profile_photo_file',
+            field=models.FileField(blank=True, storage=blobstore.storage.get_blob_storage, upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='seller',
+            name='shop_photo',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
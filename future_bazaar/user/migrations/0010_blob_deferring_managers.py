@@ -0,0 +1,21 @@
+# Generated by Django 4.2.17 on 2026-10-17 00:35
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0009_blob_store_files'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='seller',
+            options={'base_manager_name': 'objects'},
+        ),
+        migrations.AlterModelOptions(
+            name='usermodel',
+            options={'base_manager_name': 'objects'},
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.17 on 2026-10-17 00:45
+
+import base64
+import binascii
+import json
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+
+def _claims(raw_token: str) -> dict:
+    """Decode the payload of a stored JWT without verifying it."""
+    try:
+        payload = raw_token.split('.')[1]
+        return json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+    except (IndexError, ValueError, binascii.Error):
+        return {}
+
+
+def populate_jti(apps, schema_editor):
+    BlacklistedAccessToken = apps.get_model('user', 'BlacklistedAccessToken')
+    now = datetime.now(timezone.utc)
+    batch, expired = [], []
+    for row in BlacklistedAccessToken.objects.only('id', 'token').iterator(chunk_size=2000):
+        claims = _claims(row.token)
+        if 'jti' not in claims or 'exp' not in claims:
+            expired.append(row.id)
+            continue
+        row.jti = claims['jti']
+        row.expires_at = datetime.fromtimestamp(claims['exp'], tz=timezone.utc)
+        if row.expires_at <= now:
+            expired.append(row.id)
+        else:
+            batch.append(row)
+    # Tokens that already expired (or cannot be read) no longer need to be tracked
+    BlacklistedAccessToken.objects.filter(id__in=expired).delete()
+    BlacklistedAccessToken.objects.bulk_update(batch, ['jti', 'expires_at'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0010_blob_deferring_managers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blacklistedaccesstoken',
+            name='jti',
+            field=models.CharField(max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='blacklistedaccesstoken',
+            name='expires_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(populate_jti, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='blacklistedaccesstoken',
+            name='token',
+        ),
+        migrations.AlterField(
+            model_name='blacklistedaccesstoken',
+            name='jti',
+            field=models.CharField(max_length=64, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='blacklistedaccesstoken',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True),
+        ),
+    ]
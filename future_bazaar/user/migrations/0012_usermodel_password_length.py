@@ -0,0 +1,18 @@
+# Generated by Django 4.2.17 on 2026-10-17 00:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0011_blacklistedaccesstoken_jti'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usermodel',
+            name='password',
+            field=models.CharField(max_length=128),
+        ),
+    ]
@@ -3,18 +3,42 @@ from django.db import models
 from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth.models import BaseUserManager
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
 from django.utils.timezone import now
 from typing import Optional, Tuple
+from .utils.geo_utils import geo_cell_for
+from .utils.auth_cache import get_user_snapshot
+from .utils.token_revocation import is_token_revoked
+from blobstore.managers import BlobDeferringManager, BlobDeferringManagerMixin, BlobDeferringQuerySet
+from blobstore.storage import get_blob_storage
 
 
 class BlacklistedAccessToken(models.Model):
-    token = models.CharField(max_length=500, unique=True)
+    """Revoked access token, identified by its jti claim. See token_revocation."""
+    jti = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField(db_index=True)  # The token's exp; the row is useless afterwards
     blacklisted_at = models.DateTimeField(default=now)
 
     def __str__(self):
-        return self.token
+        return self.jti
     
 
+class IpGeolocation(models.Model):
+    """Persistent cache of IP address -> approximate coordinates lookups."""
+    class Meta:
+        db_table = 'ip_geolocation'
+    ip_address = models.GenericIPAddressField(unique=True)
+    latitude = models.FloatField(null=True, blank=True)  # Null when the IP could not be located
+    longitude = models.FloatField(null=True, blank=True)
+    source = models.CharField(max_length=20, blank=True)
+    resolved_at = models.DateTimeField(default=now)
+
+    def __str__(self):
+        return f"{self.ip_address} ({self.latitude}, {self.longitude})"
+
+
 class CustomJWTAuthentication(JWTAuthentication):
     def authenticate(self, request) -> Optional[Tuple[object, None]]:
         header = self.get_header(request)
@@ -30,9 +54,28 @@ class CustomJWTAuthentication(JWTAuthentication):
             raise AuthenticationFailed("Invalid or missing token.")
 
         validated_token = self.get_validated_token(raw_token)
+        if is_token_revoked(validated_token.get(api_settings.JTI_CLAIM)):
+            raise AuthenticationFailed("Token has been revoked.")
         return self.get_user(validated_token), None
 
-class CustomUserManager(BaseUserManager):
+    def get_user(self, validated_token):
+        """Same checks as JWTAuthentication.get_user, on a cached user snapshot."""
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        user = get_user_snapshot(user_id)
+        if user is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and \
+                validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
+        return user
+
+class CustomUserManager(BlobDeferringManagerMixin, BaseUserManager.from_queryset(BlobDeferringQuerySet)):
     def create_user(self, email, password=None, **extra_fields):
         """
         Creates and returns a user with an email and password.
@@ -63,6 +106,7 @@ class CustomUserManager(BaseUserManager):
 class UserModel(AbstractUser):
     class Meta:
         db_table = 'user'
+        base_manager_name = 'objects'  # Related lookups defer profile_photo too
     USER_TYPES = [
         ('admin', 'Admin'),
         ('seller', 'Seller'),
@@ -74,9 +118,10 @@ class UserModel(AbstractUser):
     last_name = models.CharField(max_length=50, blank=False)
     email = models.EmailField(unique=True, blank=False)
     contact_number = models.CharField(unique=True, max_length=15, blank=False)
-    password = models.CharField(max_length=50, blank=False)
+    password = models.CharField(max_length=128, blank=False)  # Encoded hash, upgraded on login
     is_active = models.BooleanField(default=True)
-    profile_photo = models.BinaryField(null=True, blank=True)
+    profile_photo = models.BinaryField(null=True, blank=True)  # Legacy inline image, see profile_photo_file
+    profile_photo_file = models.FileField(storage=get_blob_storage, blank=True)
     created_date = models.DateTimeField(auto_now_add=True)
     updated_date = models.DateTimeField(auto_now=True)
     user_type = models.CharField(max_length=20, choices=USER_TYPES, default='end_user')
@@ -109,6 +154,11 @@ class UserModel(AbstractUser):
 class Seller(models.Model):
     class Meta:
         db_table = 'seller'
+        base_manager_name = 'objects'  # Related lookups defer shop_photo too
+        indexes = [
+            # Grid cell first so nearby lookups can range-scan a handful of cells
+            models.Index(fields=['geo_cell', 'geo_location_lat', 'geo_location_lng'], name='seller_geo_cell_idx'),
+        ]
     CATEGORY = [
         ('electronic', 'electronic'),
         ('furniture', 'furniture'),
@@ -128,14 +178,44 @@ class Seller(models.Model):
     shop_location = models.TextField(blank=False)
     geo_location_lat = models.FloatField(blank=True, null=True)  # Latitude
     geo_location_lng = models.FloatField(blank=True, null=True)  # Longitude
-    shop_photo = models.BinaryField(blank=False)
+    geo_cell = models.IntegerField(blank=True, null=True, editable=False)  # Spatial grid cell, see geo_utils
+    shop_photo = models.BinaryField(null=True, blank=True)  # Legacy inline image, see shop_photo_file
+    shop_photo_file = models.FileField(storage=get_blob_storage, blank=True)
     is_approved = models.BooleanField(default=False)
     days_closed = models.CharField(max_length=255)
     gst_number = models.CharField(max_length=50, blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_date = models.DateTimeField(auto_now_add=True)    
-    
+
+    objects = BlobDeferringManager()
+
 
     def __str__(self):
-        return self.business_name
\ No newline at end of file
+        return self.business_name
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what nearby searches saw, so signal handlers can tell what changed
+        instance._loaded_geo_state = instance.get_geo_state()
+        return instance
+
+    def get_geo_state(self) -> Optional[Tuple]:
+        """Fields that decide whether and where the seller shows up in nearby searches."""
+        fields = ('geo_location_lat', 'geo_location_lng', 'is_active', 'is_approved', 'seller_category')
+        if any(field not in self.__dict__ for field in fields):
+            return None
+        return tuple(self.__dict__[field] for field in fields)
+
+    def is_visible_nearby(self) -> bool:
+        return (self.is_active and self.is_approved
+                and self.geo_location_lat is not None and self.geo_location_lng is not None)
+
+    def save(self, *args, **kwargs):
+        # Keep the spatial grid cell in sync with the coordinates
+        self.geo_cell = geo_cell_for(self.geo_location_lat, self.geo_location_lng)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'geo_location_lat', 'geo_location_lng'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geo_cell'}
+        super().save(*args, **kwargs)
\ No newline at end of file
@@ -1,15 +1,28 @@
 from rest_framework import serializers
 from .models import UserModel, Seller
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from typing import Optional, Tuple
+import base64
+import binascii
+from blobstore.utils import blob_url
+from blobstore.variants import variant_urls
 
 class UserSerializer(serializers.ModelSerializer):
+    profile_photo = serializers.ImageField(required=False, write_only=True)
+    profile_photo_url = serializers.SerializerMethodField()
+
     class Meta:
         model = UserModel
-        fields = ['first_name', 'last_name', 'email',  'profile_photo','contact_number', 'password']
+        fields = ['first_name', 'last_name', 'email', 'profile_photo', 'profile_photo_url', 'contact_number', 'password']
         extra_kwargs = {
             'password': {'write_only': True},  # Ensure password is write-only
         }
 
+    def get_profile_photo_url(self, obj: UserModel) -> Optional[str]:
+        return blob_url(obj, 'user-profile-photo')
+
     def validate_first_name(self, value: str) -> str:
         """Ensure the first name contains only valid characters."""
         if not value.isalpha():
@@ -41,6 +54,9 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data: dict) -> UserModel:
         """Handle user creation, including password hashing and setting default user_type."""
+        profile_photo = validated_data.pop('profile_photo', None)
+        if profile_photo:
+            validated_data['profile_photo_file'] = profile_photo  # Streamed into the blob store on save
         user = UserModel(**validated_data)
         user.save()
         return user
@@ -48,6 +64,9 @@ class UserSerializer(serializers.ModelSerializer):
     def update(self, instance: UserModel, validated_data: dict) -> UserModel:
         """Update user details, including password and email."""
         password = validated_data.pop('password', None)
+        profile_photo = validated_data.pop('profile_photo', None)
+        if profile_photo:
+            instance.profile_photo_file = profile_photo
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         if password:
@@ -66,6 +85,10 @@ class LogoutSerializer(serializers.Serializer):
 
 
 class SellerSerializer(serializers.ModelSerializer):
+    shop_photo = serializers.ImageField(required=False, write_only=True)
+    shop_photo_url = serializers.SerializerMethodField()
+    shop_photo_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = Seller
         fields = [
@@ -81,10 +104,18 @@ class SellerSerializer(serializers.ModelSerializer):
             "geo_location_lng",
             "geo_location_lat",
             "shop_photo",
+            "shop_photo_url",
+            "shop_photo_variants",
             "days_closed",
             "gst_number",
         ]
 
+    def get_shop_photo_url(self, obj: Seller) -> Optional[str]:
+        return blob_url(obj, 'seller-shop-photo')
+
+    def get_shop_photo_variants(self, obj: Seller) -> Optional[dict]:
+        return variant_urls(obj, 'seller-shop-photo')
+
     # def validate_business_contact_number(self, value: str) -> str:
     #     """
     #     Ensure the contact number is numeric and has a valid length.
@@ -146,6 +177,9 @@ class SellerSerializer(serializers.ModelSerializer):
     #     return data
     
     def create(self, validated_data: dict) -> Seller:
+        shop_photo = validated_data.pop('shop_photo', None)
+        if shop_photo:
+            validated_data['shop_photo_file'] = shop_photo  # Streamed into the blob store on save
         seller = Seller(**validated_data)
         
         seller.save()
@@ -153,6 +187,9 @@ class SellerSerializer(serializers.ModelSerializer):
     
     def update(self, instance: UserModel, validated_data: dict) -> UserModel:
         """Update user details, including password and email."""
+        shop_photo = validated_data.pop('shop_photo', None)
+        if shop_photo:
+            instance.shop_photo_file = shop_photo
         for attr, value in validated_data.items():
             setattr(instance, attr, value) # Already hashed
         instance.save()
@@ -163,6 +200,45 @@ class CustomPagination(PageNumberPagination):
     page_size_query_param = "page_size"  # Allow client to control page size
     max_page_size = 50  # Maximum allowed page size
 
+
+class NearbySellerCursorPagination:
+    """
+    Forward-only cursor pagination for nearby sellers, keyed on the
+    (distance_km, seller_id) of the last seller on the page.
+    """
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 50
+    cursor_query_param = "cursor"
+
+    def get_page_size(self, request) -> int:
+        page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        if page_size < 1:
+            raise ValueError("page_size must be a positive integer.")
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request) -> Optional[Tuple[float, int]]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            distance_km, seller_id = base64.urlsafe_b64decode(encoded.encode("ascii")).decode("ascii").split(":")
+            return float(distance_km), int(seller_id)
+        except (binascii.Error, UnicodeError, ValueError):
+            raise ValueError("Invalid cursor.")
+
+    def encode_cursor(self, position: Tuple[float, int]) -> str:
+        distance_km, seller_id = position
+        return base64.urlsafe_b64encode(f"{distance_km!r}:{seller_id}".encode("ascii")).decode("ascii")
+
+    def get_paginated_response(self, request, data, next_position: Optional[Tuple[float, int]]) -> Response:
+        next_url = None
+        if next_position is not None:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), self.cursor_query_param, self.encode_cursor(next_position)
+            )
+        return Response({"next": next_url, "results": data})
+
     
 UserType = {
      
@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Seller, UserModel
+from .utils.auth_cache import bump_user_version
+from .utils.nearby_cache import invalidate_nearby_results
+from .utils.seller_locator import seller_locations
+
+
+@receiver(post_save, sender=Seller)
+def update_seller_location_snapshot(sender, instance: Seller, **kwargs) -> None:
+    """Patch the in-memory location snapshot once the save is committed."""
+    seller_id = instance.seller_id
+    if instance.is_visible_nearby():
+        lat, lng, category = instance.geo_location_lat, instance.geo_location_lng, instance.seller_category
+        transaction.on_commit(lambda: seller_locations.upsert(seller_id, lat, lng, category))
+    else:
+        transaction.on_commit(lambda: seller_locations.discard(seller_id))
+
+
+@receiver(post_delete, sender=Seller)
+def remove_seller_from_location_snapshot(sender, instance: Seller, **kwargs) -> None:
+    seller_id = instance.seller_id
+    transaction.on_commit(lambda: seller_locations.discard(seller_id))
+
+
+@receiver(post_save, sender=Seller)
+def invalidate_nearby_results_on_save(sender, instance: Seller, created: bool, **kwargs) -> None:
+    """Expire cached nearby results around the old and new location when visibility changes."""
+    old_state = getattr(instance, '_loaded_geo_state', None)
+    new_state = instance.get_geo_state()
+    instance._loaded_geo_state = new_state
+    if not created and old_state == new_state:
+        return
+
+    locations = set()
+    if old_state is not None and old_state[2] and old_state[3]:
+        locations.add((old_state[0], old_state[1]))
+    if instance.is_visible_nearby():
+        locations.add((instance.geo_location_lat, instance.geo_location_lng))
+    # Deferred fields: fall back to the current location
+    if old_state is None and not created:
+        locations.add((instance.geo_location_lat, instance.geo_location_lng))
+
+    for lat, lng in locations:
+        transaction.on_commit(lambda lat=lat, lng=lng: invalidate_nearby_results(lat, lng))
+
+
+@receiver(post_delete, sender=Seller)
+def invalidate_nearby_results_on_delete(sender, instance: Seller, **kwargs) -> None:
+    lat, lng = instance.geo_location_lat, instance.geo_location_lng
+    transaction.on_commit(lambda: invalidate_nearby_results(lat, lng))
+
+
+@receiver(post_save, sender=UserModel)
+@receiver(post_delete, sender=UserModel)
+def invalidate_user_snapshot(sender, instance: UserModel, **kwargs) -> None:
+    user_id = instance.user_id
+    transaction.on_commit(lambda: bump_user_version(user_id))
+
+
+@receiver(post_save, sender=Seller)
+@receiver(post_delete, sender=Seller)
+def invalidate_user_snapshot_on_seller_change(sender, instance: Seller, **kwargs) -> None:
+    """The user snapshot carries the seller profile, e.g. is_approved."""
+    user_id = instance.user_id_id
+    transaction.on_commit(lambda: bump_user_version(user_id))
@@ -1,3 +1,303 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import re
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.core.cache import cache
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from blobstore.managers import blob_field_names
+from blobstore.storage import get_blob_storage
+from blobstore.utils import stored_blob_url
+from .models import BlacklistedAccessToken, Seller, UserModel
+from .utils.rate_limit import get_backend, get_request_ip
+from .utils.nearby_cache import get_nearby_cache_stats, quantize_location
+from .utils.seller_locator import SellerLocationSnapshot, haversine_km, seller_locations
+from .utils.token_revocation import BloomFilter, is_token_revoked, revoked_tokens
+from .utils.user_utils import get_nearby_sellers
+
+
+def create_seller(index: int = 0, **fields) -> Seller:
+    user = UserModel.objects.create_user(
+        email=f"seller{index}@example.com", password='Secret-123', contact_number=f"90000{index:05d}",
+        first_name='Test', last_name='Seller', user_type='seller',
+    )
+    fields = {
+        'business_name': f"Shop {index}", 'business_address': 'Main road', 'business_contact_number': '1234567890',
+        'is_seller_exclusives': False, 'shop_timing_open': datetime.time(9), 'shop_timing_close': datetime.time(18),
+        'shop_location': 'Bengaluru', 'geo_location_lat': 12.97, 'geo_location_lng': 77.59, 'days_closed': '',
+        'is_approved': True, **fields,
+    }
+    return Seller.objects.create(user_id=user, **fields)
+
+
+def image_upload(name: str = 'photo.png', color=(200, 30, 30)) -> SimpleUploadedFile:
+    content = io.BytesIO()
+    Image.new('RGB', (40, 30), color).save(content, 'PNG')
+    return SimpleUploadedFile(name, content.getvalue(), content_type='image/png')
+
+
+class BlobQueryAssertionsMixin:
+    def assertLoadsNoBlobs(self, func, *args, **kwargs):
+        """Run `func` and fail if any of its queries reads a binary image column (testing it for NULL aside)."""
+        columns = {name for model in apps.get_models() for name in blob_field_names(model)}
+        pattern = re.compile(r'"(%s)"(?! IS NOT NULL)' % '|'.join(sorted(columns)))
+        with CaptureQueriesContext(connection) as queries:
+            result = func(*args, **kwargs)
+        loaded = [query['sql'] for query in queries if pattern.search(query['sql'])]
+        self.assertEqual(loaded, [], "Queries loaded binary image columns")
+        return result
+
+
+class TemporaryBlobStorageMixin:
+    """Stores the blobs a test uploads in a temporary directory, without resized variants."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.enterClassContext(override_settings(BLOB_VARIANTS_ENABLED=False))
+        location = cls.enterClassContext(tempfile.TemporaryDirectory())
+        storage = get_blob_storage()
+        # The model fields hold the storage instance, so move it rather than swap it
+        cls.enterClassContext(mock.patch.object(storage, 'base_location', location))
+        cls.enterClassContext(mock.patch.object(storage, 'location', location))
+
+
+class SellerLocationSnapshotTests(TestCase):
+    def test_reload_does_not_block_searches_or_lose_changes(self):
+        seller = create_seller()
+        snapshot = SellerLocationSnapshot()
+        snapshot.load()
+        searched, reset = [], SellerLocationSnapshot._reset
+
+        def build(instance, capacity):
+            # Called on the new arrays while the reload is running: searches and
+            # signal updates meanwhile must neither wait for it nor get lost
+            if instance is not snapshot and not searched:
+                search = threading.Thread(target=lambda: searched.append(snapshot.nearest(12.97, 77.59, 5)))
+                search.start()
+                search.join(timeout=5)
+                snapshot.upsert(seller.seller_id + 1, 12.98, 77.6, 'furniture')
+            reset(instance, capacity)
+
+        with mock.patch.object(SellerLocationSnapshot, '_reset', autospec=True, side_effect=build):
+            snapshot.load()
+
+        self.assertEqual([[seller_id for seller_id, _ in found] for found in searched], [[seller.seller_id]])
+        self.assertEqual([seller_id for seller_id, _ in snapshot.nearest(12.97, 77.59, 5)],
+                         [seller.seller_id, seller.seller_id + 1])
+
+    def test_pages_of_equally_distant_sellers_skip_none(self):
+        snapshot = SellerLocationSnapshot()
+        snapshot.load()
+        for seller_id in range(10, 0, -1):  # Rows in descending id order
+            snapshot.upsert(seller_id, 12.97, 77.59, 'furniture')
+        snapshot.upsert(11, 12.98, 77.59, 'furniture')
+
+        pages, after = [], None
+        while page := snapshot.nearest(12.97, 77.59, 5, limit=3, after=after):
+            pages.append([seller_id for seller_id, _ in page])
+            after = (page[-1][1], page[-1][0])
+        self.assertEqual(pages, [[1, 2, 3], [4, 5, 6], [7, 8, 9], [10, 11]])
+
+
+class NearbySellersCacheTests(TestCase):
+    # About 100 m north and south of the centre of one cache cell
+    _, _, CENTRE_LAT, CENTRE_LNG = quantize_location(12.97, 77.59)
+    NORTH, SOUTH = (CENTRE_LAT + 0.0009, CENTRE_LNG), (CENTRE_LAT - 0.0009, CENTRE_LNG)
+
+    def setUp(self):
+        cache.clear()
+        seller_locations.clear()
+        self.addCleanup(seller_locations.clear)
+        # 0.99 km north of NORTH: in range of it, not of the cell centre
+        self.seller = create_seller(geo_location_lat=self.NORTH[0] + 0.99 / 111.195, geo_location_lng=self.CENTRE_LNG)
+
+    def nearby(self, location, **kwargs) -> list:
+        sellers, _ = get_nearby_sellers(*location, radius_km=1, limit=20, **kwargs)
+        return [(seller.seller_id, round(distance_km, 6)) for seller, distance_km in sellers]
+
+    def expected_distance(self, location) -> float:
+        return round(haversine_km(*location, self.seller.geo_location_lat, self.seller.geo_location_lng).item(), 6)
+
+    def test_hits_are_measured_from_the_user_location(self):
+        self.assertEqual(self.nearby(self.NORTH), [(self.seller.seller_id, self.expected_distance(self.NORTH))])
+        self.assertEqual(self.nearby(self.SOUTH), [])  # 1.19 km away
+        self.assertEqual((get_nearby_cache_stats()['misses'], get_nearby_cache_stats()['hits']), (1, 1))
+
+    def test_pages_continue_from_another_location_in_the_cell(self):
+        other = create_seller(1, geo_location_lat=self.NORTH[0] + 0.5 / 111.195, geo_location_lng=self.CENTRE_LNG)
+        sellers, after = get_nearby_sellers(*self.NORTH, radius_km=1, limit=1)
+        self.assertEqual([seller.seller_id for seller, _ in sellers], [other.seller_id])
+        sellers, after = get_nearby_sellers(*self.NORTH, radius_km=1, limit=1, after=after)
+        self.assertEqual([seller.seller_id for seller, _ in sellers], [self.seller.seller_id])
+        self.assertIsNone(after)
+
+    def test_seller_save_invalidates_the_cell(self):
+        self.assertEqual(len(self.nearby(self.SOUTH)), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seller.geo_location_lat = self.SOUTH[0] - 0.5 / 111.195
+            self.seller.save()
+        self.assertEqual(self.nearby(self.SOUTH), [(self.seller.seller_id, self.expected_distance(self.SOUTH))])
+        self.assertEqual((get_nearby_cache_stats()['misses'], get_nearby_cache_stats()['hits']), (2, 0))
+
+    @override_settings(NEARBY_SELLERS_ENGINE='database')
+    def test_database_engine_candidates(self):
+        [(seller_id, distance_km)] = self.nearby(self.NORTH)
+        self.assertEqual(seller_id, self.seller.seller_id)
+        self.assertAlmostEqual(distance_km, 0.99, delta=0.01)  # Geodesic
+        self.assertEqual(self.nearby(self.SOUTH), [])
+
+
+class SellerBlobDeferringTests(BlobQueryAssertionsMixin, TestCase):
+    def test_nearby_sellers_load_no_blobs(self):
+        for index in range(3):
+            create_seller(index, shop_photo=b'legacy photo bytes', geo_location_lat=12.97 + index / 100)
+        response = self.assertLoadsNoBlobs(
+            APIClient().get, '/user/api/v1/sellers/nearby/', {'latitude': 12.97, 'longitude': 77.59},
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(len(response.data['results']['data']), 3)
+
+
+class PhotoUploadTests(TemporaryBlobStorageMixin, TestCase):
+    def test_signup_stores_profile_photo(self):
+        response = APIClient().post('/user/api/v1/signup', {
+            'first_name': 'Asha', 'last_name': 'Rao', 'email': 'asha@example.com', 'contact_number': '9876543210',
+            'password': 'Secret-123', 'profile_photo': image_upload(),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.data)
+
+        user = UserModel.objects.get(email='asha@example.com')
+        self.assertTrue(user.profile_photo_file)
+        self.assertTrue(get_blob_storage().exists(user.profile_photo_file.name))
+
+    def test_update_seller_stores_shop_photo(self):
+        seller = create_seller()
+        client = APIClient()
+        client.force_authenticate(seller.user_id)
+        response = client.put('/user/api/v1/update-seller/', {'shop_photo': image_upload()}, format='multipart')
+        self.assertEqual(response.status_code, 200, response.data)
+
+        seller.refresh_from_db()
+        self.assertTrue(seller.shop_photo_file)
+        self.assertTrue(get_blob_storage().exists(seller.shop_photo_file.name))
+        self.assertEqual(response.data['data']['shop_photo_url'], stored_blob_url(seller.shop_photo_file.name))
+
+
+class ClientIpTests(TestCase):
+    def request_ip(self, forwarded_for: str, remote_addr: str = '10.0.0.2'):
+        return get_request_ip(RequestFactory().get('/', HTTP_X_FORWARDED_FOR=forwarded_for, REMOTE_ADDR=remote_addr))
+
+    def test_forwarded_for_is_ignored_without_a_trusted_proxy(self):
+        self.assertEqual(self.request_ip('203.0.113.7'), '10.0.0.2')
+
+    @override_settings(CLIENT_IP_PROXY_COUNT=1)
+    def test_forwarded_for_is_read_behind_the_configured_proxies(self):
+        self.assertEqual(self.request_ip('203.0.113.7, 10.0.0.1'), '203.0.113.7')
+        # A header that does not match the proxy setup falls back to the socket address
+        self.assertEqual(self.request_ip('198.51.100.1, 203.0.113.7, 10.0.0.1'), '10.0.0.2')
+        self.assertEqual(self.request_ip(''), '10.0.0.2')
+
+    @override_settings(RATE_LIMITS={'login_ip': {'rate': '3/min', 'backend': 'local'}})
+    def test_rotating_forwarded_for_does_not_escape_the_login_limit(self):
+        get_backend('local').clear()
+        client = APIClient()
+        statuses = [
+            client.post('/user/api/v1/login/', {'identifier': f'user{attempt}@example.com', 'password': 'wrong'},
+                        format='json', HTTP_X_FORWARDED_FOR=f'203.0.113.{attempt}').status_code
+            for attempt in range(5)
+        ]
+        self.assertEqual(statuses, [401, 401, 401, 429, 429])
+
+
+@override_settings(USER_IMPORT_BATCH_SIZE=2, USER_IMPORT_HASH_WORKERS=1)
+class UserImportTests(TestCase):
+    def import_users(self, rows: list) -> list:
+        admin = UserModel.objects.create_user(email='admin@example.com', password='Secret-123', is_staff=True,
+                                              contact_number='9999999999', first_name='Admin', last_name='User')
+        client = APIClient()
+        client.force_authenticate(admin)
+        lines = [row if isinstance(row, str) else json.dumps(row) for row in rows]
+        upload = SimpleUploadedFile('users.jsonl', '\n'.join(lines).encode())
+        response = client.post('/user/api/v1/admin/users/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_report_lists_duplicates_and_invalid_rows(self):
+        create_seller()  # seller0@example.com, 9000000000
+        password_hash = make_password('Imported-1')
+        user = {'first_name': 'Ravi', 'last_name': 'Kumar', 'password_hash': password_hash}
+        report = self.import_users([
+            {**user, 'email': 'ravi@example.com', 'contact_number': '8000000001'},
+            {**user, 'email': 'seller0@example.com', 'contact_number': '8000000002'},
+            {**user, 'email': 'other@example.com', 'contact_number': '9000000000'},
+            '{"email": ',
+            {**user, 'email': 'ravi@example.com', 'contact_number': '8000000005'},  # Taken in the previous batch
+            {**user, 'email': 'short@example.com', 'contact_number': '123'},
+            {'first_name': 'Meena', 'last_name': 'Iyer', 'email': 'meena@example.com', 'contact_number': '8000000007',
+             'password': 'Plain-123'},
+        ])
+
+        # Within a batch, rows failing validation are reported before duplicates
+        rejected, summary = sorted(report[:-1], key=lambda entry: entry['line']), report[-1]['summary']
+        self.assertEqual([(entry['line'], sorted(entry['errors'])) for entry in rejected], [
+            (2, ['email']), (3, ['contact_number']), (4, ['non_field_errors']), (5, ['email']),
+            (6, ['contact_number']),
+        ])
+        self.assertTrue(rejected[2]['errors']['non_field_errors'][0].startswith('Invalid JSON'))
+        self.assertEqual((summary['created'], summary['failed'], summary['passwords_hashed']), (2, 5, 1))
+
+        self.assertEqual(UserModel.objects.get(email='ravi@example.com').password, password_hash)
+        self.assertTrue(check_password('Plain-123', UserModel.objects.get(email='meena@example.com').password))
+
+
+@override_settings(TOKEN_REVOCATION_SYNC_INTERVAL=60)
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        revoked_tokens.clear()
+        self.addCleanup(revoked_tokens.clear)
+        self.user = create_seller().user_id
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client = APIClient()
+
+    def get_private(self, access) -> int:
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        return self.client.get('/user/api/v1/private').status_code
+
+    def test_logout_revokes_the_access_token(self):
+        access, other = self.refresh.access_token, RefreshToken.for_user(self.user).access_token
+        self.assertEqual(self.get_private(access), 200)
+        response = self.client.post('/user/api/v1/logout/', {'refresh_token': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+
+        self.assertEqual(self.get_private(access), 401)
+        self.assertEqual(self.get_private(other), 200)
+
+    def test_bloom_false_positive_is_settled_by_the_database(self):
+        is_token_revoked('warm-up')  # Builds the filter
+        with mock.patch.object(BloomFilter, '__contains__', return_value=True):
+            with self.assertNumQueries(1):
+                self.assertFalse(is_token_revoked('never-revoked'))
+            with self.assertNumQueries(0):  # Remembered
+                self.assertFalse(is_token_revoked('never-revoked'))
+            self.assertEqual(self.get_private(self.refresh.access_token), 200)
+
+    def test_rows_revoked_by_another_process_are_synced(self):
+        self.assertFalse(is_token_revoked('elsewhere'))
+        BlacklistedAccessToken.objects.create(jti='elsewhere', expires_at=timezone.now() + datetime.timedelta(minutes=5))
+        self.assertFalse(is_token_revoked('elsewhere'))  # Until the next sync
+        with override_settings(TOKEN_REVOCATION_SYNC_INTERVAL=0):
+            self.assertTrue(is_token_revoked('elsewhere'))
@@ -0,0 +1,69 @@
+import logging
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from blobstore.managers import blob_field_names
+
+
+logger = logging.getLogger(__name__)
+
+
+def _cache_ttl() -> int:
+    return getattr(settings, 'AUTH_USER_CACHE_TTL', 60)
+
+
+def _version_key(user_id: int) -> str:
+    return f'auth-user:version:{user_id}'
+
+
+def _user_version(user_id: int) -> int:
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so an evicted version never reuses old entries
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_user_version(user_id: int) -> None:
+    """Make the cached snapshot of a user stale."""
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def _load_user(user_id: int):
+    from ..models import Seller, UserModel
+
+    # Carry the seller profile along, so request.user.seller_profile costs no query
+    return (
+        UserModel.objects.select_related('seller_profile')
+        .defer(*(f'seller_profile__{name}' for name in blob_field_names(Seller)))
+        .filter(user_id=user_id)
+        .first()
+    )
+
+
+def get_user_snapshot(user_id: int) -> Optional[object]:
+    """
+    Return the user with this id, with its seller profile preloaded, from a
+    short-lived cache. Entries are keyed by a per-user version that every
+    save of the user or of its seller profile bumps.
+    """
+    ttl = _cache_ttl()
+    if not ttl:
+        return _load_user(user_id)
+
+    key = f'auth-user:{user_id}:{_user_version(user_id)}'
+    user = cache.get(key)
+    if user is None:
+        user = _load_user(user_id)
+        if user is not None:
+            cache.set(key, user, ttl)
+    return user
@@ -0,0 +1,121 @@
+import math
+from typing import List, Optional, Tuple
+
+
+EARTH_RADIUS_KM = 6371.0088
+# Conservative (smallest) lengths of one degree on the WGS-84 ellipsoid, so
+# bounding boxes never cut off sellers that are within the radius
+KM_PER_DEGREE_LAT = 110.5
+KM_PER_DEGREE_LNG_AT_EQUATOR = 111.32
+
+# Size (in degrees) of the grid cells stored in Seller.geo_cell.
+# Changing this value requires re-computing geo_cell for every seller.
+GEO_CELL_SIZE_DEG = 0.25
+GEO_CELL_ROWS = int(math.ceil(180 / GEO_CELL_SIZE_DEG))
+GEO_CELL_COLS = int(math.ceil(360 / GEO_CELL_SIZE_DEG))
+
+
+def _cell_row(lat: float) -> int:
+    return min(int((lat + 90.0) // GEO_CELL_SIZE_DEG), GEO_CELL_ROWS - 1)
+
+
+def _cell_col(lng: float) -> int:
+    return int((lng + 180.0) // GEO_CELL_SIZE_DEG) % GEO_CELL_COLS
+
+
+def geo_cell_for(lat: Optional[float], lng: Optional[float]) -> Optional[int]:
+    """
+    Return the grid cell id containing the given coordinates, or None when
+    the location is unknown.
+    """
+    if lat is None or lng is None:
+        return None
+    return _cell_row(lat) * GEO_CELL_COLS + _cell_col(lng)
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> Tuple[float, float, List[Tuple[float, float]]]:
+    """
+    Compute the lat/lng bounding box of a circle.
+
+    Returns (min_lat, max_lat, lng_ranges). lng_ranges holds one range, or two
+    when the box crosses the antimeridian.
+    """
+    delta_lat = radius_km / KM_PER_DEGREE_LAT
+    min_lat = max(lat - delta_lat, -90.0)
+    max_lat = min(lat + delta_lat, 90.0)
+
+    # Near the poles every longitude is within reach
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat <= 1e-9:
+        return min_lat, max_lat, [(-180.0, 180.0)]
+
+    delta_lng = radius_km / (KM_PER_DEGREE_LNG_AT_EQUATOR * cos_lat)
+    if delta_lng >= 180.0:
+        return min_lat, max_lat, [(-180.0, 180.0)]
+
+    min_lng = lng - delta_lng
+    max_lng = lng + delta_lng
+    if min_lng < -180.0:
+        return min_lat, max_lat, [(min_lng + 360.0, 180.0), (-180.0, max_lng)]
+    if max_lng > 180.0:
+        return min_lat, max_lat, [(min_lng, 180.0), (-180.0, max_lng - 360.0)]
+    return min_lat, max_lat, [(min_lng, max_lng)]
+
+
+def cells_for_bounding_box(min_lat: float, max_lat: float, lng_ranges: List[Tuple[float, float]]) -> List[int]:
+    """Return the ids of every grid cell overlapping the bounding box."""
+    cells = set()
+    rows = range(_cell_row(min_lat), _cell_row(max_lat) + 1)
+    for min_lng, max_lng in lng_ranges:
+        first_col = int((min_lng + 180.0) // GEO_CELL_SIZE_DEG)
+        last_col = min(int((max_lng + 180.0) // GEO_CELL_SIZE_DEG), GEO_CELL_COLS - 1)
+        for row in rows:
+            for col in range(first_col, last_col + 1):
+                cells.add(row * GEO_CELL_COLS + col)
+    return sorted(cells)
+
+
+def ring_cells(lat: float, lng: float, ring: int) -> List[int]:
+    """
+    Return the ids of the cells on the square ring `ring` cells away from the
+    cell containing (lat, lng). Ring 0 is the cell itself.
+    """
+    row0, col0 = _cell_row(lat), _cell_col(lng)
+    rows = [row for row in range(row0 - ring, row0 + ring + 1) if 0 <= row < GEO_CELL_ROWS]
+    cells = set()
+    for row in rows:
+        if abs(row - row0) == ring:
+            offsets = range(-ring, ring + 1)
+        else:
+            offsets = (-ring, ring)
+        for offset in offsets:
+            cells.add(row * GEO_CELL_COLS + (col0 + offset) % GEO_CELL_COLS)
+    return sorted(cells)
+
+
+def ring_coverage_km(lat: float, lng: float, ring: int) -> float:
+    """
+    Lower bound of the distance from (lat, lng) to any point outside the
+    square of cells covered by rings 0..`ring`.
+    """
+    row0, col0 = _cell_row(lat), _cell_col(lng)
+    bounds = []
+
+    south_edge = (row0 - ring) * GEO_CELL_SIZE_DEG - 90.0
+    north_edge = (row0 + ring + 1) * GEO_CELL_SIZE_DEG - 90.0
+    if south_edge > -90.0:
+        bounds.append(math.radians(lat - south_edge) * EARTH_RADIUS_KM)
+    if north_edge < 90.0:
+        bounds.append(math.radians(north_edge - lat) * EARTH_RADIUS_KM)
+
+    if 2 * ring + 1 < GEO_CELL_COLS:
+        west_edge = (col0 - ring) * GEO_CELL_SIZE_DEG - 180.0
+        east_edge = (col0 + ring + 1) * GEO_CELL_SIZE_DEG - 180.0
+        gap = math.radians(min(lng - west_edge, east_edge - lng, 90.0))
+        # Distance from the point to the meridian `gap` away
+        bounds.append(math.asin(min(1.0, math.cos(math.radians(lat)) * math.sin(gap))) * EARTH_RADIUS_KM)
+
+    if not bounds:
+        return math.inf
+    # Keep a margin for the ellipsoid vs sphere difference
+    return min(bounds) * 0.995
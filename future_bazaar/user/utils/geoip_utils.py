@@ -0,0 +1,96 @@
+import logging
+import threading
+from datetime import timedelta
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.utils.timezone import now
+from geopy.geocoders import Nominatim
+
+try:
+    import geoip2.database
+    import geoip2.errors
+except ImportError:  # Offline lookups are optional
+    geoip2 = None
+
+from ..models import IpGeolocation
+from .rate_limit import get_client_address
+
+
+logger = logging.getLogger(__name__)
+
+_reader = None
+_reader_lock = threading.Lock()
+
+
+def _get_geoip_reader():
+    """Open the offline GeoIP database configured in GEOIP_DATABASE_PATH, if any."""
+    global _reader
+    path = getattr(settings, 'GEOIP_DATABASE_PATH', None)
+    if not path or geoip2 is None:
+        return None
+    with _reader_lock:
+        if _reader is None:
+            try:
+                _reader = geoip2.database.Reader(str(path))
+            except (OSError, ValueError) as e:
+                logger.error(f"Unable to open GeoIP database {path}: {e}")
+                return None
+    return _reader
+
+
+def _lookup_ip(ip: str) -> Tuple[Optional[Tuple[float, float]], str]:
+    """Resolve an IP address with the offline database, falling back to Nominatim."""
+    reader = _get_geoip_reader()
+    if reader is not None:
+        try:
+            location = reader.city(ip).location
+            if location.latitude is not None and location.longitude is not None:
+                return (location.latitude, location.longitude), 'geoip'
+        except geoip2.errors.AddressNotFoundError:
+            pass
+        return None, 'geoip'
+
+    try:
+        geolocator = Nominatim(user_agent="django-admin-location")
+        location = geolocator.geocode(ip)
+        if location:
+            return (location.latitude, location.longitude), 'nominatim'
+    except Exception as e:
+        logger.error(f"Error fetching location for {ip}: {e}")
+    return None, 'nominatim'
+
+
+def resolve_ip_location(ip: str) -> Optional[Tuple[float, float]]:
+    """
+    Return the approximate (latitude, longitude) of an IP address.
+
+    Results, including failed lookups, are stored in IpGeolocation and reused
+    for GEOIP_CACHE_TTL_DAYS.
+    """
+    ttl = timedelta(days=getattr(settings, 'GEOIP_CACHE_TTL_DAYS', 30))
+    cached = IpGeolocation.objects.filter(ip_address=ip, resolved_at__gte=now() - ttl).first()
+    if cached is not None:
+        if cached.latitude is None or cached.longitude is None:
+            return None
+        return cached.latitude, cached.longitude
+
+    location, source = _lookup_ip(ip)
+    latitude, longitude = location if location else (None, None)
+    IpGeolocation.objects.update_or_create(
+        ip_address=ip,
+        defaults={'latitude': latitude, 'longitude': longitude, 'source': source, 'resolved_at': now()},
+    )
+    return location
+
+
+def get_request_location(request) -> Optional[Tuple[float, float]]:
+    """
+    Return the approximate location of the client making `request`, resolved
+    at most once per request.
+    """
+    if not hasattr(request, '_client_location'):
+        ip, is_routable = get_client_address(request)
+        # Private and loopback addresses cannot be located
+        request._client_location = resolve_ip_location(ip) if ip and is_routable else None
+    return request._client_location
@@ -0,0 +1,133 @@
+import logging
+import math
+import time
+from typing import Callable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .geo_utils import EARTH_RADIUS_KM, bounding_box, cells_for_bounding_box, geo_cell_for
+
+
+logger = logging.getLogger(__name__)
+
+STATS_HITS_KEY = 'nearby-sellers:stats:hits'
+STATS_MISSES_KEY = 'nearby-sellers:stats:misses'
+
+
+def _cache_ttl() -> int:
+    return getattr(settings, 'NEARBY_SELLERS_CACHE_TTL', 60)
+
+
+def _cell_size() -> float:
+    return getattr(settings, 'NEARBY_SELLERS_CACHE_CELL_DEG', 0.002)
+
+
+def quantize_location(lat: float, lng: float) -> Tuple[int, int, float, float]:
+    """
+    Snap a location to the result cache grid.
+
+    Returns the cell indices and the coordinates of the cell centre, which is
+    the point candidates are gathered around.
+    """
+    size = _cell_size()
+    row = int((lat + 90.0) // size)
+    col = int((lng + 180.0) // size)
+    centre_lat = min(row * size - 90.0 + size / 2, 90.0)
+    centre_lng = (col * size - 180.0 + size / 2 + 180.0) % 360.0 - 180.0
+    return row, col, centre_lat, centre_lng
+
+
+def cell_half_diagonal_km() -> float:
+    """How far a location can be from the centre of its cell, with 1% to spare for the ellipsoid."""
+    return math.radians(_cell_size() / 2) * EARTH_RADIUS_KM * math.sqrt(2) * 1.01
+
+
+def _region_version_key(region: int) -> str:
+    return f'nearby-sellers:region-version:{region}'
+
+
+def _region_version(region: int) -> int:
+    key = _region_version_key(region)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so an evicted version never reuses old entries
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_nearby_results(lat: Optional[float], lng: Optional[float]) -> None:
+    """
+    Expire cached results for every query that could include a seller at
+    (lat, lng): the grid regions within the maximum search radius, and the
+    margin candidates are gathered with, of it.
+    """
+    if lat is None or lng is None:
+        return
+    max_radius_km = getattr(settings, 'NEARBY_SELLERS_MAX_RADIUS_KM', 100) + cell_half_diagonal_km()
+    min_lat, max_lat, lng_ranges = bounding_box(lat, lng, max_radius_km)
+    for region in cells_for_bounding_box(min_lat, max_lat, lng_ranges):
+        key = _region_version_key(region)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def _count(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def get_cached_nearby_candidates(lat: float, lng: float, radius_km: float, category: Optional[str],
+                                 compute: Callable[[float, float, float], list]) -> Optional[List[tuple]]:
+    """
+    Return the (seller_id, lat, lng) candidates cached for the cell holding
+    (lat, lng), or None when the cache is off (NEARBY_SELLERS_CACHE_TTL = 0).
+
+    On a miss they are computed by compute(centre_lat, centre_lng, radius)
+    for the cell centre and `radius_km` plus the cell's half-diagonal, so
+    they hold every seller within `radius_km` of any location in the cell.
+    Callers measure, filter and page them from the actual location; seller
+    rows are always loaded fresh.
+    """
+    ttl = _cache_ttl()
+    if not ttl:
+        return None
+
+    row, col, centre_lat, centre_lng = quantize_location(lat, lng)
+    version = _region_version(geo_cell_for(centre_lat, centre_lng))
+    key = f'nearby-sellers:{version}:{row}:{col}:{radius_km!r}:{category}'
+
+    candidates = cache.get(key)
+    if candidates is not None:
+        _count(STATS_HITS_KEY)
+        return candidates
+
+    _count(STATS_MISSES_KEY)
+    candidates = compute(centre_lat, centre_lng, radius_km + cell_half_diagonal_km())
+    cache.set(key, candidates, ttl)
+    return candidates
+
+
+def get_nearby_cache_stats() -> dict:
+    """Return the shared hit/miss counters of the nearby sellers cache."""
+    counters = cache.get_many([STATS_HITS_KEY, STATS_MISSES_KEY])
+    hits = counters.get(STATS_HITS_KEY, 0)
+    misses = counters.get(STATS_MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / lookups, 4) if lookups else None,
+        "cell_size_deg": _cell_size(),
+        "ttl_seconds": _cache_ttl(),
+    }
+
+
+def reset_nearby_cache_stats() -> None:
+    cache.delete_many([STATS_HITS_KEY, STATS_MISSES_KEY])
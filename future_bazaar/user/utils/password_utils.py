@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+logger = logging.getLogger(__name__)
+
+
+class LoginBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many logins in progress. Please retry shortly."
+    default_code = 'login_busy'
+
+    def __init__(self, retry_after: int):
+        super().__init__()
+        self.retry_after = retry_after
+
+
+def _verify(password: str, encoded: str) -> Tuple[bool, Optional[str]]:
+    """Check a password; return (is_correct, new_encoded) where new_encoded is set when the hash must be upgraded."""
+    upgraded = []
+    is_correct = check_password(password, encoded, setter=lambda raw: upgraded.append(make_password(raw)))
+    return is_correct, upgraded[0] if upgraded else None
+
+
+def init_hashing_process() -> None:
+    """
+    Initializer for spawned password hashing processes. Lives here, away from
+    model imports, so the worker can unpickle it before Django is set up.
+    """
+    import django
+    django.setup()
+
+
+class PasswordVerifier:
+    """
+    Runs password hashing on a small dedicated thread pool, so a login spike
+    cannot occupy every request worker. The hashers release the GIL while
+    hashing, so the pool uses real CPU parallelism.
+
+    At most LOGIN_HASHER_WORKERS hashes run at once and LOGIN_HASHER_QUEUE_SIZE
+    more may wait; further logins are refused immediately with LoginBusy
+    instead of queueing without bound.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._executor is None:
+                workers = getattr(settings, 'LOGIN_HASHER_WORKERS', 2)
+                queue_size = getattr(settings, 'LOGIN_HASHER_QUEUE_SIZE', 16)
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hasher')
+                self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def submit(self, password: str, encoded: str) -> Future:
+        """Queue a password check, or raise LoginBusy when the queue is full."""
+        self._ensure_started()
+        if not self._slots.acquire(blocking=False):
+            raise LoginBusy(retry_after=getattr(settings, 'LOGIN_HASHER_RETRY_AFTER', 1))
+        try:
+            future = self._executor.submit(_verify, password, encoded)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def verify(self, password: str, encoded: str) -> Tuple[bool, Optional[str]]:
+        return self.submit(password, encoded).result()
+
+    async def averify(self, password: str, encoded: str) -> Tuple[bool, Optional[str]]:
+        """Await a password check without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(password, encoded))
+
+
+password_verifier = PasswordVerifier()
@@ -0,0 +1,209 @@
+import hashlib
+import ipaddress
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from ipware import get_client_ip
+from rest_framework.throttling import BaseThrottle
+
+
+logger = logging.getLogger(__name__)
+
+RATE_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """Parse '<count>/<period>' (period s, sec, m, min, h, hour, d, day) into (count, seconds)."""
+    count, period = rate.split('/')
+    return int(count), RATE_PERIODS[period.strip()[0]]
+
+
+class LocalRateLimitBackend:
+    """
+    Token buckets kept in this process: a burst of `capacity` requests, then
+    `limit` per `period`. Limits are per worker process. The least recently
+    used buckets are dropped beyond `max_keys`, which resets them to full.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: 'OrderedDict[str, list]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, period: int, capacity: int) -> Optional[float]:
+        refill_rate = limit / period
+        current = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(capacity), current]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(capacity, bucket[0] + (current - bucket[1]) * refill_rate)
+                bucket[1] = current
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return None
+            return (1 - bucket[0]) / refill_rate
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheRateLimitBackend:
+    """
+    Sliding window counters in a Django cache shared by every process: the
+    previous fixed window is weighted by how much of it still overlaps the
+    sliding one. Costs one incr and one get per request.
+    """
+
+    def __init__(self, alias: str = 'default'):
+        self.alias = alias
+
+    def hit(self, key: str, limit: int, period: int, capacity: int) -> Optional[float]:
+        cache = caches[self.alias]
+        current = time.time()
+        window, offset = divmod(current, period)
+        elapsed = offset / period
+        current_key = f'{key}:{int(window)}'
+        try:
+            count = cache.incr(current_key)
+        except ValueError:
+            # First hit of the window; add() loses to a concurrent first hit, so incr again
+            count = 1 if cache.add(current_key, 1, period * 2) else cache.incr(current_key)
+        previous = cache.get(f'{key}:{int(window) - 1}', 0)
+
+        if previous * (1 - elapsed) + count <= limit:
+            return None
+        if count > limit:
+            return (1 - elapsed) * period
+        # Wait until enough of the previous window has slid out
+        return max((1 - (limit - count) / previous - elapsed) * period, 0.0)
+
+
+_backends: Dict[str, object] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name: str):
+    with _backends_lock:
+        if name not in _backends:
+            if name == 'local':
+                _backends[name] = LocalRateLimitBackend(getattr(settings, 'RATE_LIMIT_LOCAL_MAX_KEYS', 100000))
+            elif name == 'cache':
+                _backends[name] = CacheRateLimitBackend(getattr(settings, 'RATE_LIMIT_CACHE_ALIAS', 'default'))
+            else:
+                raise ValueError(f"Unknown rate limit backend '{name}'.")
+        return _backends[name]
+
+
+def rate_limit_wait(scope: str, ident: str) -> Optional[float]:
+    """
+    Count one request of `ident` against the RATE_LIMITS entry `scope`.
+    Returns None when it is allowed, else the seconds to wait. Scopes without
+    a configured rate are not limited; shared backend failures let the
+    request through.
+    """
+    config = getattr(settings, 'RATE_LIMITS', {}).get(scope)
+    if not config or not config.get('rate'):
+        return None
+    limit, period = parse_rate(config['rate'])
+    try:
+        return get_backend(config.get('backend', 'local')).hit(
+            f'ratelimit:{scope}:{ident}', limit, period, config.get('burst', limit),
+        )
+    except Exception as e:
+        logger.error(f"Rate limiter for {scope} failed: {e}")
+        return None
+
+
+def get_client_address(request) -> Tuple[Optional[str], bool]:
+    """
+    (ip, is_routable) of the client making `request`. Forwarding headers such
+    as X-Forwarded-For are only read behind the reverse proxies configured by
+    CLIENT_IP_PROXY_COUNT / CLIENT_IP_TRUSTED_PROXIES (django-ipware's
+    proxy_count and proxy_trusted_ips). Otherwise, or when the headers do not
+    match that setup, the socket address is used, which clients cannot spoof.
+    """
+    proxy_count = getattr(settings, 'CLIENT_IP_PROXY_COUNT', None)
+    trusted_proxies = list(getattr(settings, 'CLIENT_IP_TRUSTED_PROXIES', ()))
+    if proxy_count is not None or trusted_proxies:
+        ip, is_routable = get_client_ip(request, proxy_count=proxy_count, proxy_trusted_ips=trusted_proxies or None)
+        if ip:
+            return ip, is_routable
+    address = request.META.get('REMOTE_ADDR')
+    try:
+        return address, ipaddress.ip_address(address).is_global
+    except ValueError:
+        return None, False
+
+
+def get_request_ip(request) -> Optional[str]:
+    """Client IP of a request, see get_client_address(), resolved at most once per request."""
+    if not hasattr(request, '_client_ip'):
+        request._client_ip = get_client_address(request)[0]
+    return request._client_ip
+
+
+def identifier_key(identifier) -> Optional[str]:
+    """Bounded, cache-safe key for a login identifier (email or contact number)."""
+    if not isinstance(identifier, str) or not identifier.strip():
+        return None
+    return hashlib.blake2b(identifier.strip().lower().encode(), digest_size=12).hexdigest()
+
+
+class RateLimitThrottle(BaseThrottle):
+    """
+    DRF throttle backed by rate_limit_wait(). Subclasses set `scope`, the
+    RATE_LIMITS entry, and get_ident_key(), what requests are counted by.
+    """
+    scope: str = None
+
+    def get_ident_key(self, request) -> Optional[str]:
+        raise NotImplementedError
+
+    def allow_request(self, request, view) -> bool:
+        ident = self.get_ident_key(request)
+        self._wait = rate_limit_wait(self.scope, ident) if ident else None
+        return self._wait is None
+
+    def wait(self) -> Optional[float]:
+        return self._wait
+
+
+class IpRateLimit(RateLimitThrottle):
+    def get_ident_key(self, request) -> Optional[str]:
+        return get_request_ip(request)
+
+
+class IdentifierRateLimit(RateLimitThrottle):
+    """Counts requests per login identifier, whichever IPs they come from."""
+    identifier_field = 'identifier'
+
+    def get_ident_key(self, request) -> Optional[str]:
+        data = request.data
+        return identifier_key(data.get(self.identifier_field) if hasattr(data, 'get') else None)
+
+
+class LoginIpRateLimit(IpRateLimit):
+    scope = 'login_ip'
+
+
+class LoginIdentifierRateLimit(IdentifierRateLimit):
+    scope = 'login_identifier'
+
+
+class SignupIpRateLimit(IpRateLimit):
+    scope = 'signup_ip'
+
+
+class NearbySearchIpRateLimit(IpRateLimit):
+    scope = 'nearby_search_ip'
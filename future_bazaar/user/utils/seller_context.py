@@ -0,0 +1,29 @@
+from typing import Optional
+
+from django.core.exceptions import ObjectDoesNotExist
+
+
+def get_user_seller(user) -> Optional[object]:
+    """
+    Return the seller profile of `user`, or None.
+
+    CustomJWTAuthentication preloads the profile with the user snapshot, so
+    this normally costs no query; otherwise the reverse one-to-one lookup
+    runs once and Django caches its result, including "no profile", on the
+    user instance.
+    """
+    if user is None or not user.is_authenticated:
+        return None
+    try:
+        return user.seller_profile
+    except ObjectDoesNotExist:
+        return None
+
+
+def get_request_seller(request) -> Optional[object]:
+    """Return the seller making `request`, resolved at most once per request."""
+    # Memoize on the Django request so DRF and plain views share the result
+    http_request = getattr(request, '_request', request)
+    if not hasattr(http_request, '_seller_context'):
+        http_request._seller_context = get_user_seller(request.user)
+    return http_request._seller_context
@@ -0,0 +1,218 @@
+import logging
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .geo_utils import EARTH_RADIUS_KM
+
+
+logger = logging.getLogger(__name__)
+
+PRECISION_HAVERSINE = 'haversine'
+PRECISION_GEODESIC = 'geodesic'
+
+
+def haversine_km(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Haversine distances from (lat, lng) to each of the points in `lats`, `lngs`, all in degrees."""
+    lat_rad, lats = np.radians(lat), np.radians(lats)
+    a = np.sin((lats - lat_rad) / 2) ** 2 + np.cos(lat_rad) * np.cos(lats) * np.sin(np.radians(lngs - lng) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class SellerLocationSnapshot:
+    """
+    In-memory snapshot of active seller coordinates kept in compact NumPy
+    arrays, so a nearby search is a single vectorized haversine pass.
+
+    The snapshot is loaded lazily, patched incrementally from Seller signals
+    and fully reloaded after NEARBY_SELLERS_SNAPSHOT_MAX_AGE seconds to pick
+    up changes made by other processes or bulk updates. Reloads build new
+    arrays without holding the lock and swap them in, so searches keep
+    using the current ones meanwhile.
+    """
+    # Attributes replaced together when a reload swaps in new arrays
+    STATE = ('_size', '_slots', '_ids', '_lat', '_lng', '_cos_lat', '_category', '_category_codes')
+
+    def __init__(self):
+        self._lock = threading.RLock()  # Guards the arrays
+        self._load_lock = threading.Lock()  # One reload at a time
+        self._loaded_at: Optional[float] = None
+        self._changes: Optional[list] = None  # Changes made while a reload reads the database
+        self._reset(0)
+
+    def _reset(self, capacity: int) -> None:
+        self._size = 0
+        self._slots = {}  # seller_id -> row in the arrays
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._lat = np.empty(capacity, dtype=np.float64)  # radians
+        self._lng = np.empty(capacity, dtype=np.float64)  # radians
+        self._cos_lat = np.empty(capacity, dtype=np.float64)
+        self._category = np.empty(capacity, dtype=np.int16)
+        self._category_codes = {}  # seller_category -> code stored in _category
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def load(self) -> None:
+        """(Re)build the snapshot from the database."""
+        with self._load_lock:
+            self._load()
+
+    def _load(self) -> None:
+        from ..models import Seller
+
+        with self._lock:
+            self._changes = []
+        try:
+            rows = list(
+                Seller.objects.filter(
+                    is_active=True,
+                    is_approved=True,
+                    geo_location_lat__isnull=False,
+                    geo_location_lng__isnull=False,
+                ).values_list('seller_id', 'geo_location_lat', 'geo_location_lng', 'seller_category')
+            )
+            fresh = SellerLocationSnapshot()
+            fresh._reset(max(len(rows), 1024))
+            for seller_id, lat, lng, category in rows:
+                fresh._append(seller_id, lat, lng, category)
+            with self._lock:
+                for change in self._changes:
+                    fresh._apply(*change)
+                for name in self.STATE:
+                    setattr(self, name, getattr(fresh, name))
+                self._loaded_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._changes = None
+        logger.info(f"Loaded {len(rows)} sellers into the location snapshot")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset(0)
+            self._loaded_at = None
+
+    def _ensure_loaded(self) -> None:
+        max_age = getattr(settings, 'NEARBY_SELLERS_SNAPSHOT_MAX_AGE', 300)
+        if self._loaded_at is None:
+            with self._load_lock:
+                if self._loaded_at is None:  # Unless a concurrent first search loaded it meanwhile
+                    self._load()
+        elif time.monotonic() - self._loaded_at > max_age and self._load_lock.acquire(blocking=False):
+            # One caller reloads; the others keep searching the current arrays
+            try:
+                self._load()
+            finally:
+                self._load_lock.release()
+
+    def _append(self, seller_id: int, lat: float, lng: float, category: str) -> None:
+        if self._size == len(self._ids):
+            capacity = max(2 * len(self._ids), 1024)
+            for name in ('_ids', '_lat', '_lng', '_cos_lat', '_category'):
+                grown = np.empty(capacity, dtype=getattr(self, name).dtype)
+                grown[:self._size] = getattr(self, name)[:self._size]
+                setattr(self, name, grown)
+        row = self._size
+        self._slots[seller_id] = row
+        self._set_row(row, seller_id, lat, lng, category)
+        self._size += 1
+
+    def _set_row(self, row: int, seller_id: int, lat: float, lng: float, category: str) -> None:
+        lat_rad = np.radians(lat)
+        self._ids[row] = seller_id
+        self._lat[row] = lat_rad
+        self._lng[row] = np.radians(lng)
+        self._cos_lat[row] = np.cos(lat_rad)
+        self._category[row] = self._category_codes.setdefault(category, len(self._category_codes))
+
+    def _apply(self, seller_id: int, location: Optional[Tuple[float, float, str]]) -> None:
+        if location is None:
+            self._discard(seller_id)
+            return
+        row = self._slots.get(seller_id)
+        if row is None:
+            self._append(seller_id, *location)
+        else:
+            self._set_row(row, seller_id, *location)
+
+    def _discard(self, seller_id: int) -> None:
+        # Move the last row into the freed slot
+        row = self._slots.pop(seller_id, None)
+        if row is None:
+            return
+        last = self._size - 1
+        if row != last:
+            moved_id = int(self._ids[last])
+            for array in (self._ids, self._lat, self._lng, self._cos_lat, self._category):
+                array[row] = array[last]
+            self._slots[moved_id] = row
+        self._size = last
+
+    def _change(self, seller_id: int, location: Optional[Tuple[float, float, str]]) -> None:
+        with self._lock:
+            if self._changes is not None:
+                self._changes.append((seller_id, location))
+            if self.is_loaded:
+                self._apply(seller_id, location)
+
+    def upsert(self, seller_id: int, lat: float, lng: float, category: str) -> None:
+        """Add a seller or move it to new coordinates."""
+        self._change(seller_id, (lat, lng, category))
+
+    def discard(self, seller_id: int) -> None:
+        """Remove a seller."""
+        self._change(seller_id, None)
+
+    def _within(self, lat: float, lng: float, radius_km: float, category: Optional[str]) -> Tuple[np.ndarray, np.ndarray]:
+        # Haversine distances of every row and the mask of those in range; the caller holds the lock
+        size = self._size
+        lat_rad = np.radians(lat)
+        half_dlat = (self._lat[:size] - lat_rad) / 2
+        half_dlng = (self._lng[:size] - np.radians(lng)) / 2
+        a = np.sin(half_dlat) ** 2 + np.cos(lat_rad) * self._cos_lat[:size] * np.sin(half_dlng) ** 2
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+        mask = distances <= radius_km
+        if category is not None:
+            mask &= self._category[:size] == self._category_codes.get(category, -1)
+        return distances, mask
+
+    def within(self, lat: float, lng: float, radius_km: float,
+               category: Optional[str] = None) -> List[Tuple[int, float, float]]:
+        """Return (seller_id, lat, lng) of every seller within `radius_km`, unordered."""
+        self._ensure_loaded()
+        with self._lock:
+            rows = np.flatnonzero(self._within(lat, lng, radius_km, category)[1])
+            return list(zip(self._ids[rows].tolist(), np.degrees(self._lat[rows]).tolist(),
+                            np.degrees(self._lng[rows]).tolist()))
+
+    def nearest(self, lat: float, lng: float, radius_km: float, limit: Optional[int] = None,
+                after: Optional[Tuple[float, int]] = None, category: Optional[str] = None) -> List[Tuple[int, float]]:
+        """
+        Return up to `limit` (seller_id, distance_km) pairs within `radius_km`,
+        ordered by (distance_km, seller_id) and starting after the `after` key,
+        optionally restricted to one seller category. Distances are haversine.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            distances, mask = self._within(lat, lng, radius_km, category)
+            ids = self._ids[:self._size]
+            if after is not None:
+                after_distance, after_id = after
+                mask &= (distances > after_distance) | ((distances == after_distance) & (ids > after_id))
+            rows = np.flatnonzero(mask)
+            if limit is not None and len(rows) > limit:
+                # Keep every row tied with the cutoff distance, the ids decide among them below
+                cutoff = np.partition(distances[rows], limit - 1)[limit - 1]
+                rows = rows[distances[rows] <= cutoff]
+            ids = ids[rows]
+            distances = distances[rows]
+
+        order = np.lexsort((ids, distances))[:limit]
+        return [(int(ids[i]), float(distances[i])) for i in order]
+
+
+seller_locations = SellerLocationSnapshot()
@@ -0,0 +1,109 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.timezone import now
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from ..models import BlacklistedAccessToken
+
+
+logger = logging.getLogger(__name__)
+
+PURGE_LOCK_KEY = 'token-purge:lock'
+
+_scheduler: Optional[threading.Thread] = None
+_scheduler_lock = threading.Lock()
+
+
+def _purge_in_chunks(queryset, batch_size: int, pause: float) -> int:
+    """
+    Delete the rows of `queryset` in primary key order, `batch_size` at a
+    time, each chunk in its own short transaction so writers from live
+    traffic are never blocked for long.
+    """
+    queryset = queryset.order_by('pk')
+    removed = 0
+    last_pk = None
+    while True:
+        # Keyset over the primary key: every chunk resumes the scan where the last one stopped
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        ids = list(chunk.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return removed
+        last_pk = ids[-1]
+        with transaction.atomic():
+            # Re-applying the filter skips rows changed since they were selected
+            removed += queryset.filter(pk__in=ids).delete()[0]
+        if pause:
+            time.sleep(pause)
+
+
+def purge_expired_tokens(batch_size: int = 1000, pause: float = 0.0) -> Dict[str, object]:
+    """
+    Delete blacklist and outstanding token rows whose token has expired.
+
+    An expired token is rejected on its signature claims alone, so these rows
+    can go without affecting which tokens are accepted. Returns the number of
+    rows removed per table and the time taken.
+    """
+    started = time.monotonic()
+    cutoff = now()
+    removed = {
+        'access_tokens': _purge_in_chunks(
+            BlacklistedAccessToken.objects.filter(expires_at__lte=cutoff), batch_size, pause,
+        ),
+        # Blacklist rows first, so deleting outstanding tokens has nothing left to cascade to
+        'blacklisted_tokens': _purge_in_chunks(
+            BlacklistedToken.objects.filter(token__expires_at__lte=cutoff), batch_size, pause,
+        ),
+        'outstanding_tokens': _purge_in_chunks(
+            OutstandingToken.objects.filter(expires_at__lte=cutoff), batch_size, pause,
+        ),
+    }
+    return {'removed': removed, 'elapsed_seconds': round(time.monotonic() - started, 3)}
+
+
+def _run_scheduled_purge(interval: int) -> None:
+    # With a shared cache only one process purges per interval
+    if not cache.add(PURGE_LOCK_KEY, True, max(interval - 1, 1)):
+        return
+    try:
+        result = purge_expired_tokens(
+            batch_size=getattr(settings, 'TOKEN_PURGE_BATCH_SIZE', 1000),
+            pause=getattr(settings, 'TOKEN_PURGE_PAUSE', 0.05),
+        )
+        logger.info(f"Purged expired tokens: {result['removed']} in {result['elapsed_seconds']}s")
+    except Exception as e:
+        logger.error(f"Expired token purge failed: {e}")
+    finally:
+        # The thread outlives any request cycle that would close its connection
+        connection.close()
+
+
+def _scheduler_loop(interval: int) -> None:
+    while True:
+        time.sleep(interval)
+        _run_scheduled_purge(interval)
+
+
+def start_purge_scheduler(**kwargs) -> None:
+    """
+    Start the background thread purging expired tokens every
+    TOKEN_PURGE_INTERVAL seconds. Does nothing when the setting is unset or
+    the thread already runs.
+    """
+    global _scheduler
+    interval = getattr(settings, 'TOKEN_PURGE_INTERVAL', None)
+    if not interval or _scheduler is not None:
+        return
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = threading.Thread(
+                target=_scheduler_loop, args=(interval,), name='token-purge', daemon=True,
+            )
+            _scheduler.start()
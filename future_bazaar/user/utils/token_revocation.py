@@ -0,0 +1,186 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.utils.timezone import now
+from rest_framework_simplejwt.settings import api_settings
+
+
+logger = logging.getLogger(__name__)
+
+SYNC_OVERLAP_IDS = 64
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. Membership tests never give false
+    negatives; false positives occur at about `error_rate` while fewer than
+    `capacity` items have been added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(round(self.size / capacity * math.log(2)), 1)
+        self._bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def _hashes(self, item: str) -> Tuple[int, int]:
+        # Double hashing: bit i is (first + i * second) % size
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        return (int.from_bytes(digest[:8], 'little') % self.size,
+                int.from_bytes(digest[8:], 'little') % self.size or 1)
+
+    def add(self, item: str) -> None:
+        self.add_many([item])
+
+    def add_many(self, items: Iterable[str]) -> None:
+        hashes = np.array([self._hashes(item) for item in items], dtype=np.int64).reshape(-1, 2)
+        positions = (hashes[:, :1] + np.arange(self.hash_count) * hashes[:, 1:]) % self.size
+        positions = positions.ravel()
+        np.bitwise_or.at(self._bits, positions >> 3, (1 << (positions & 7)).astype(np.uint8))
+
+    def __contains__(self, item: str) -> bool:
+        first, second = self._hashes(item)
+        bits = self._bits
+        for i in range(self.hash_count):
+            position = (first + i * second) % self.size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class RevokedTokenRegistry:
+    """
+    Process-local view of BlacklistedAccessToken for the per-request check.
+
+    A Bloom filter of every unexpired revoked jti answers the common "not
+    revoked" case without touching the database. Possible hits are resolved
+    by an indexed lookup whose answer is kept in a small LRU. New rows are
+    pulled in every TOKEN_REVOCATION_SYNC_INTERVAL seconds by id, and the
+    filter is rebuilt every TOKEN_REVOCATION_REBUILD_INTERVAL seconds so
+    entries of expired tokens drop out.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._bloom: Optional[BloomFilter] = None
+        self._lru = OrderedDict()  # jti -> revoked
+        self._high_water = 0  # Highest BlacklistedAccessToken id in the filter
+        self._synced_at = self._built_at = 0.0
+        self._rebuilding = False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bloom = None
+            self._lru.clear()
+            self._high_water = 0
+
+    def _remember(self, jti: str, revoked: bool) -> None:
+        self._lru[jti] = revoked
+        self._lru.move_to_end(jti)
+        if len(self._lru) > getattr(settings, 'TOKEN_REVOCATION_LRU_SIZE', 10000):
+            self._lru.popitem(last=False)
+
+    def _rebuild(self) -> None:
+        """Build a fresh filter of the unexpired revoked tokens and swap it in."""
+        from ..models import BlacklistedAccessToken
+
+        # Read the high-water mark first, so rows added during the scan are left to _sync()
+        high_water = BlacklistedAccessToken.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        active = BlacklistedAccessToken.objects.filter(id__lte=high_water, expires_at__gt=now())
+        capacity = getattr(settings, 'TOKEN_REVOCATION_BLOOM_CAPACITY', 1_000_000)
+        bloom = BloomFilter(max(capacity, 2 * active.count()))
+        batch = []
+        for jti in active.values_list('jti', flat=True).iterator(chunk_size=10000):
+            batch.append(jti)
+            if len(batch) == 10000:
+                bloom.add_many(batch)
+                batch = []
+        bloom.add_many(batch)
+
+        with self._lock:
+            revoked_meanwhile = [jti for jti, revoked in self._lru.items() if revoked]
+            bloom.add_many(revoked_meanwhile)
+            self._bloom, self._high_water = bloom, high_water
+            self._lru = OrderedDict((jti, True) for jti in revoked_meanwhile)
+            self._built_at = self._synced_at = time.monotonic()
+        logger.info(f"Rebuilt the revoked token filter up to id {high_water}")
+
+    def _sync(self) -> None:
+        """Add rows created since the last sync. Called with the lock held."""
+        from ..models import BlacklistedAccessToken
+
+        # Re-read a few ids below the mark in case inserts committed out of id order
+        rows = BlacklistedAccessToken.objects.filter(
+            id__gt=self._high_water - SYNC_OVERLAP_IDS, expires_at__gt=now(),
+        ).values_list('id', 'jti')
+        for token_id, jti in rows:
+            self._bloom.add(jti)
+            if not self._lru.get(jti, False):
+                self._remember(jti, True)  # Overrides a cached "not revoked" answer
+            self._high_water = max(self._high_water, token_id)
+        self._synced_at = time.monotonic()
+
+    def _refresh(self) -> None:
+        elapsed = time.monotonic()
+        with self._lock:
+            if self._bloom is not None:
+                rebuild_due = elapsed - self._built_at > getattr(settings, 'TOKEN_REVOCATION_REBUILD_INTERVAL', 3600)
+                if rebuild_due and not self._rebuilding:
+                    self._rebuilding = True
+                elif elapsed - self._synced_at > getattr(settings, 'TOKEN_REVOCATION_SYNC_INTERVAL', 2):
+                    self._sync()
+                    return
+                else:
+                    return
+        # First load or periodic rebuild, done outside the lock so concurrent
+        # requests keep using the current filter in the meantime
+        try:
+            self._rebuild()
+        finally:
+            self._rebuilding = False
+
+    def is_revoked(self, jti: str) -> bool:
+        self._refresh()
+        with self._lock:
+            if jti not in self._bloom:
+                return False
+            if jti in self._lru:
+                self._lru.move_to_end(jti)
+                return self._lru[jti]
+
+        from ..models import BlacklistedAccessToken
+
+        revoked = BlacklistedAccessToken.objects.filter(jti=jti).exists()
+        with self._lock:
+            self._remember(jti, revoked)
+        return revoked
+
+    def revoke(self, jti: str, expires_at: datetime) -> None:
+        from ..models import BlacklistedAccessToken
+
+        BlacklistedAccessToken.objects.get_or_create(jti=jti, defaults={'expires_at': expires_at})
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+            self._remember(jti, True)
+
+
+revoked_tokens = RevokedTokenRegistry()
+
+
+def is_token_revoked(jti: Optional[str]) -> bool:
+    """Whether the access token with this jti has been revoked by a logout."""
+    return jti is not None and revoked_tokens.is_revoked(jti)
+
+
+def revoke_access_token(token) -> None:
+    """Revoke a validated access token until it expires."""
+    revoked_tokens.revoke(token[api_settings.JTI_CLAIM], datetime.fromtimestamp(token['exp'], tz=timezone.utc))
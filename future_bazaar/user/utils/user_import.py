@@ -0,0 +1,211 @@
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from ..models import UserModel
+from ..serializers import UserSerializer
+from .password_utils import init_hashing_process
+
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+
+class UserImportSerializer(UserSerializer):
+    """
+    Validates one imported row like signup does, minus the uniqueness
+    queries: UserImport checks those for a whole batch at once.
+    """
+    profile_photo = None
+    profile_photo_url = None
+    # Declared without the per-row UniqueValidator queries of the model fields
+    email = serializers.EmailField(max_length=254)
+    contact_number = serializers.CharField(max_length=15)
+    password = serializers.CharField(required=False, write_only=True)
+    password_hash = serializers.CharField(required=False, write_only=True)
+
+    class Meta(UserSerializer.Meta):
+        fields = ['first_name', 'last_name', 'email', 'contact_number', 'password', 'password_hash']
+
+    def validate_email(self, value: str) -> str:
+        return value
+
+    def validate_contact_number(self, value: str) -> str:
+        if len(value) < 10 or len(value) > 15:
+            raise serializers.ValidationError("Contact number must be between 10 and 15 digits.")
+        return value
+
+    def validate_password_hash(self, value: str) -> str:
+        try:
+            identify_hasher(value)
+        except ValueError:
+            raise serializers.ValidationError("Not a password hash of a configured hasher.")
+        return value
+
+    def validate(self, data: dict) -> dict:
+        if not data.get('password') and not data.get('password_hash'):
+            raise serializers.ValidationError("Either password or password_hash is required.")
+        return data
+
+
+def detect_import_format(file_name: Optional[str]) -> str:
+    extension = os.path.splitext(file_name or '')[1].lower().lstrip('.')
+    return 'jsonl' if extension in ('jsonl', 'ndjson', 'json') else 'csv'
+
+
+def read_import_rows(stream, fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Stream (line number, row, parse error) from a binary CSV (with a header
+    row) or JSON Lines file without loading it whole.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if key and value != ''}, None
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+            continue
+        if isinstance(row, dict):
+            yield line_number, row, None
+        else:
+            yield line_number, None, "Each line must be a JSON object."
+
+
+class UserImport:
+    """
+    Create users from an iterable of read_import_rows() tuples in batches:
+    one validation pass, two uniqueness queries, parallel password hashing
+    and one bulk insert per batch.
+
+    run() yields a report entry for every rejected row; counters are kept on
+    the instance and summarised by summary().
+    """
+
+    def __init__(self, batch_size: int = 500, hash_workers: Optional[int] = None):
+        self.batch_size = batch_size
+        self.hash_workers = hash_workers or getattr(settings, 'USER_IMPORT_HASH_WORKERS', None) or os.cpu_count()
+        self.created = 0
+        self.failed = 0
+        self.hashed = 0
+        self._seen_emails = set()
+        self._seen_contacts = set()
+        self._started = None
+
+    def summary(self) -> dict:
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        processed = self.created + self.failed
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'passwords_hashed': self.hashed,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(processed / elapsed, 1) if elapsed else None,
+        }
+
+    def run(self, rows: Iterable[Tuple[int, Optional[dict], Optional[str]]]) -> Iterator[dict]:
+        self._started = time.monotonic()
+        executor = ProcessPoolExecutor(
+            max_workers=self.hash_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_hashing_process,
+        )
+        try:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    yield from self._import_batch(batch, executor)
+                    batch = []
+            if batch:
+                yield from self._import_batch(batch, executor)
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def _reject(self, line: int, errors, row: Optional[dict] = None) -> dict:
+        self.failed += 1
+        entry = {'line': line, 'errors': errors}
+        if row and row.get('email'):
+            entry['email'] = row['email']
+        return entry
+
+    def _import_batch(self, batch: List[tuple], executor: ProcessPoolExecutor) -> Iterator[dict]:
+        validator = UserImportSerializer()
+        valid = []
+        for line, row, parse_error in batch:
+            if parse_error:
+                yield self._reject(line, {'non_field_errors': [parse_error]})
+                continue
+            try:
+                valid.append((line, validator.run_validation(row)))
+            except serializers.ValidationError as e:
+                yield self._reject(line, e.detail, row)
+
+        # Set-based uniqueness: one query per column for the whole batch
+        emails = UserModel.objects.filter(email__in=[data['email'] for _, data in valid])
+        contacts = UserModel.objects.filter(contact_number__in=[data['contact_number'] for _, data in valid])
+        taken_emails = set(emails.values_list('email', flat=True))
+        taken_contacts = set(contacts.values_list('contact_number', flat=True))
+
+        accepted = []
+        for line, data in valid:
+            errors = {}
+            if data['email'] in taken_emails or data['email'] in self._seen_emails:
+                errors['email'] = ["A user with this email already exists."]
+            if data['contact_number'] in taken_contacts or data['contact_number'] in self._seen_contacts:
+                errors['contact_number'] = ["A user with this contact number already exists."]
+            if errors:
+                yield self._reject(line, errors, data)
+                continue
+            self._seen_emails.add(data['email'])
+            self._seen_contacts.add(data['contact_number'])
+            accepted.append((line, data))
+
+        to_hash = [data['password'] for _, data in accepted if not data.get('password_hash')]
+        chunksize = max(len(to_hash) // (self.hash_workers * 4), 1)
+        hashes = iter(executor.map(make_password, to_hash, chunksize=chunksize))
+        self.hashed += len(to_hash)
+
+        users = []
+        for line, data in accepted:
+            password_hash = data.pop('password_hash', None)
+            data.pop('password', None)
+            users.append((line, UserModel(password=password_hash or next(hashes), **data)))
+        yield from self._insert(users)
+
+    def _insert(self, users: List[Tuple[int, UserModel]]) -> Iterator[dict]:
+        try:
+            with transaction.atomic():
+                UserModel.objects.bulk_create([user for _, user in users])
+            self.created += len(users)
+            return
+        except IntegrityError:
+            # A concurrent signup took an email or number: find the rows one by one
+            pass
+        for line, user in users:
+            try:
+                with transaction.atomic():
+                    user.save(force_insert=True)
+                self.created += 1
+            except IntegrityError as e:
+                yield self._reject(line, {'non_field_errors': [f"Conflicts with an existing user: {e}"]},
+                                   {'email': user.email})
@@ -1,18 +1,31 @@
 from ..serializers import UserSerializer, SellerSerializer
+from asgiref.sync import sync_to_async
 from django.db import transaction
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth.hashers import make_password
 from typing import Optional
 from rest_framework.request import Request
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.exceptions import ValidationError, PermissionDenied
-from ..models import UserModel, BlacklistedAccessToken, Seller
+from ..models import UserModel, Seller
 from rest_framework.exceptions import NotFound, ValidationError
-from typing import Union
+from typing import List, Union, Tuple
 from rest_framework import serializers
 from geopy.distance import geodesic
+import numpy as np
+from django.db.models import Q
+from django.conf import settings
+from .geo_utils import bounding_box, cells_for_bounding_box, ring_cells, ring_coverage_km
+from .seller_locator import haversine_km, seller_locations, PRECISION_GEODESIC, PRECISION_HAVERSINE
+from .nearby_cache import get_cached_nearby_candidates
+from .password_utils import password_verifier
+from .seller_context import get_user_seller
+from .token_revocation import revoke_access_token
+
+
+NEARBY_SELLERS_RADIUS_KM = 40
 
 
 
@@ -49,25 +62,14 @@ def user_sign_up(request: Request) -> Optional[Response]:
     
 
 
-def authenticate_user(identifier: str, password: str) -> dict:
-
+def _login_lookup(identifier: str, password: str) -> dict:
     if not identifier or not password:
         raise AuthenticationFailed("Identifier (email/contact_number) and password are required.")
+    # Find the user by email or contact_number
+    return {'email': identifier} if '@' in identifier else {'contact_number': identifier}
 
-    try:
-        # Find the user by email or contact_number
-        user = (
-            UserModel.objects.get(email=identifier)
-            if '@' in identifier
-            else UserModel.objects.get(contact_number=identifier)
-        )
-    except UserModel.DoesNotExist:
-        raise AuthenticationFailed("Invalid credentials.")
-
-    # Verify password
-    if not user.check_password(password):
-        raise AuthenticationFailed("Invalid credentials.")
 
+def _login_payload(user: UserModel) -> dict:
     if not user.is_active:
         raise AuthenticationFailed("Your account is deactive.")
 
@@ -85,6 +87,43 @@ def authenticate_user(identifier: str, password: str) -> dict:
     }
 
 
+def authenticate_user(identifier: str, password: str) -> dict:
+    """
+    Verify login credentials and issue tokens. The password is checked on
+    the bounded hasher pool, which raises LoginBusy when saturated; hashes
+    from an outdated hasher or work factor are upgraded on success.
+    """
+    user = UserModel.objects.filter(**_login_lookup(identifier, password)).first()
+    if user is None:
+        raise AuthenticationFailed("Invalid credentials.")
+
+    # Verify password
+    is_correct, upgraded_password = password_verifier.verify(password, user.password)
+    if not is_correct:
+        raise AuthenticationFailed("Invalid credentials.")
+    if upgraded_password:
+        user.password = upgraded_password
+        user.save(update_fields=['password'])
+
+    return _login_payload(user)
+
+
+async def aauthenticate_user(identifier: str, password: str) -> dict:
+    """authenticate_user() for async views: hashing is awaited, not blocking the event loop."""
+    user = await UserModel.objects.filter(**_login_lookup(identifier, password)).afirst()
+    if user is None:
+        raise AuthenticationFailed("Invalid credentials.")
+
+    is_correct, upgraded_password = await password_verifier.averify(password, user.password)
+    if not is_correct:
+        raise AuthenticationFailed("Invalid credentials.")
+    if upgraded_password:
+        user.password = upgraded_password
+        await user.asave(update_fields=['password'])
+
+    return await sync_to_async(_login_payload)(user)
+
+
 def update_user_details(user: UserModel, data: dict) -> Response:
     """Helper function to update user details including password."""
     serializer = UserSerializer(user, data=data, partial=True)
@@ -152,8 +191,8 @@ def blacklist_tokens(refresh_token: str, access_token: str) -> Response:
         token = RefreshToken(refresh_token)
         token.blacklist()
 
-        # Blacklist access token
-        BlacklistedAccessToken.objects.create(token=access_token)
+        # Revoke the access token by its jti until it expires
+        revoke_access_token(AccessToken(access_token))
 
         return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
     
@@ -211,9 +250,8 @@ def get_seller_profile_and_update(user, data):
     if user.user_type != "seller":
         raise serializers.ValidationError("Only users with type 'seller' can update a seller profile.")
 
-    try:
-        seller_profile = Seller.objects.get(user_id=user.id)
-    except Seller.DoesNotExist:
+    seller_profile = get_user_seller(user)
+    if seller_profile is None:
         raise serializers.ValidationError("Seller profile does not exist for this user.")
 
     serializer = SellerSerializer(instance=seller_profile, data=data, partial=True)
@@ -224,21 +262,139 @@ def get_seller_profile_and_update(user, data):
 
 
 
-def get_nearby_sellers(user_lat: float, user_lng: float):
+def _bounding_box_filter(min_lat: float, max_lat: float, lng_ranges: list, category: Optional[str]) -> Q:
+    """Visible sellers inside a bounding_box, optionally of one category."""
+    lng_filter = Q()
+    for min_lng, max_lng in lng_ranges:
+        lng_filter |= Q(geo_location_lng__range=(min_lng, max_lng))
+    box = Q(lng_filter, geo_location_lat__range=(min_lat, max_lat), is_active=True, is_approved=True)
+    if category is not None:
+        box &= Q(seller_category=category)
+    return box
+
+
+def _nearby_sellers_from_database(user_lat: float, user_lng: float, radius_km: float,
+                                  limit: Optional[int] = None, after: Optional[Tuple[float, int]] = None,
+                                  category: Optional[str] = None) -> list:
     """
-    Fetch nearby sellers within a 30 km radius, sorted by distance.
+    Return up to `limit` (seller_id, distance_km) pairs within `radius_km`,
+    ordered by (distance_km, seller_id) and starting after the `after` key.
+
+    Grid cells are searched in square rings expanding outward from the user's
+    cell, one indexed query per ring, and the search stops as soon as `limit`
+    matches are closer than anything an unvisited ring could contain.
     """
     user_location = (user_lat, user_lng)
-    nearby_sellers = []
+    min_lat, max_lat, lng_ranges = bounding_box(user_lat, user_lng, radius_km)
+    remaining_cells = set(cells_for_bounding_box(min_lat, max_lat, lng_ranges))
+    box = _bounding_box_filter(min_lat, max_lat, lng_ranges, category)
+
+    matches = []
+    ring = 0
+    while remaining_cells:
+        cells = [cell for cell in ring_cells(user_lat, user_lng, ring) if cell in remaining_cells]
+        remaining_cells.difference_update(cells)
+
+        if cells:
+            candidates = Seller.objects.filter(box, geo_cell__in=cells) \
+                .values_list('seller_id', 'geo_location_lat', 'geo_location_lng')
+
+            for seller_id, lat, lng in candidates:
+                distance_km = geodesic(user_location, (lat, lng)).km
+                if distance_km <= radius_km and (after is None or (distance_km, seller_id) > after):
+                    matches.append((distance_km, seller_id))
+            matches.sort()
+
+        if limit is not None and len(matches) >= limit and matches[limit - 1][0] <= ring_coverage_km(user_lat, user_lng, ring):
+            break
+        ring += 1
+
+    return [(seller_id, distance_km) for distance_km, seller_id in matches[:limit]]
+
+
+def _nearby_candidates(lat: float, lng: float, radius_km: float, category: Optional[str]) -> list:
+    """(seller_id, lat, lng) of every visible seller within `radius_km`, from the configured engine."""
+    if getattr(settings, 'NEARBY_SELLERS_ENGINE', 'memory') == 'memory':
+        return seller_locations.within(lat, lng, radius_km, category=category)
+
+    location = (lat, lng)
+    min_lat, max_lat, lng_ranges = bounding_box(lat, lng, radius_km)
+    candidates = Seller.objects.filter(
+        _bounding_box_filter(min_lat, max_lat, lng_ranges, category),
+        geo_cell__in=cells_for_bounding_box(min_lat, max_lat, lng_ranges),
+    ).values_list('seller_id', 'geo_location_lat', 'geo_location_lng')
+    return [candidate for candidate in candidates if geodesic(location, candidate[1:]).km <= radius_km]
+
+
+def _rank_candidates(user_lat: float, user_lng: float, candidates: list, radius_km: float, limit: Optional[int],
+                     after: Optional[Tuple[float, int]]) -> List[Tuple[int, float]]:
+    """Measure candidates from the user's location the way the engine does, and rank them like it."""
+    if not candidates:
+        return []
+    ids, lats, lngs = zip(*candidates)
+    if getattr(settings, 'NEARBY_SELLERS_ENGINE', 'memory') == 'memory':
+        distances = haversine_km(user_lat, user_lng, np.array(lats), np.array(lngs)).tolist()
+    else:
+        distances = [geodesic((user_lat, user_lng), (lat, lng)).km for lat, lng in zip(lats, lngs)]
+    matches = sorted(
+        (distance_km, seller_id) for seller_id, distance_km in zip(ids, distances)
+        if distance_km <= radius_km and (after is None or (distance_km, seller_id) > after)
+    )
+    return [(seller_id, distance_km) for distance_km, seller_id in matches[:limit]]
+
+
+def _rank_nearby_sellers(user_lat: float, user_lng: float, radius_km: float, limit: Optional[int],
+                         after: Optional[Tuple[float, int]], category: Optional[str]) -> Tuple[list, Optional[Tuple[float, int]]]:
+    """Rank seller ids for one page and return them with the next page key."""
+    fetch_limit = None if limit is None else limit + 1
+    candidates = get_cached_nearby_candidates(
+        user_lat, user_lng, radius_km, category,
+        lambda lat, lng, candidate_radius_km: _nearby_candidates(lat, lng, candidate_radius_km, category),
+    )
+    if candidates is not None:
+        matches = _rank_candidates(user_lat, user_lng, candidates, radius_km, fetch_limit, after)
+    elif getattr(settings, 'NEARBY_SELLERS_ENGINE', 'memory') == 'memory':
+        matches = seller_locations.nearest(user_lat, user_lng, radius_km, limit=fetch_limit, after=after, category=category)
+    else:
+        matches = _nearby_sellers_from_database(user_lat, user_lng, radius_km, limit=fetch_limit, after=after, category=category)
+
+    next_after = None
+    if limit is not None and len(matches) > limit:
+        matches = matches[:limit]
+        next_after = (matches[-1][1], matches[-1][0])
+    return matches, next_after
+
 
-    for seller in Seller.objects.all():
-        seller_location = (seller.geo_location_lat, seller.geo_location_lng)
-        distance_km = geodesic(user_location, seller_location).km
-        print("dista",distance_km)
-        if distance_km <= 40:  # Within 30 km radius
-            nearby_sellers.append((seller, distance_km))
+def get_nearby_sellers(user_lat: float, user_lng: float, radius_km: float = NEARBY_SELLERS_RADIUS_KM,
+                       limit: Optional[int] = None, after: Optional[Tuple[float, int]] = None,
+                       category: Optional[str] = None) -> Tuple[list, Optional[Tuple[float, int]]]:
+    """
+    Fetch active sellers within `radius_km`, closest first.
+
+    Results are ordered by the (distance_km, seller_id) key. Returns a list of
+    (seller, distance_km) pairs and the key to pass as `after` for the next
+    page (None when there are no more results).
 
-    return sorted(nearby_sellers, key=lambda x: x[1])
+    The NEARBY_SELLERS_ENGINE setting selects the in-memory vectorized
+    snapshot ("memory") or the indexed ring search ("database"). The sellers
+    around each quantized location cell are cached (see nearby_cache) and
+    measured from the user's own location on every request.
+    """
+    matches, next_after = _rank_nearby_sellers(user_lat, user_lng, radius_km, limit, after, category)
+
+    sellers = Seller.objects.in_bulk([seller_id for seller_id, _ in matches])
+    nearby_sellers = [(sellers[seller_id], distance_km) for seller_id, distance_km in matches if seller_id in sellers]
+
+    if (getattr(settings, 'NEARBY_SELLERS_ENGINE', 'memory') == 'memory'
+            and getattr(settings, 'NEARBY_SELLERS_PRECISION', PRECISION_HAVERSINE) == PRECISION_GEODESIC):
+        # Re-measure only the selected page; the cursor stays on the ranking key
+        user_location = (user_lat, user_lng)
+        nearby_sellers = sorted(
+            ((seller, geodesic(user_location, (seller.geo_location_lat, seller.geo_location_lng)).km)
+             for seller, _ in nearby_sellers),
+            key=lambda x: (x[1], x[0].seller_id),
+        )
+    return nearby_sellers, next_after
 
 
 
@@ -248,12 +404,11 @@ def delete_seller_helper(user, seller_id=None):
 
     # Seller: Delete their own profile
     if user_type == "seller":
-        try:
-            seller = Seller.objects.get(user=user)  # Assuming `Seller` links to `User`
-            seller.delete()
-            return {"message": "Your profile has been successfully deleted."}
-        except Seller.DoesNotExist:
+        seller = get_user_seller(user)
+        if seller is None:
             raise NotFound("Seller profile not found for the authenticated user.")
+        seller.delete()
+        return {"message": "Your profile has been successfully deleted."}
 
     # Admin: Delete a specific seller profile
     elif user_type == "admin":
@@ -261,7 +416,7 @@ def delete_seller_helper(user, seller_id=None):
             raise ValidationError("Seller ID is required for admin deletion.")
 
         try:
-            seller = Seller.objects.get(id=seller_id)
+            seller = Seller.objects.get(seller_id=seller_id)
             seller.delete()
             return {"message": f"Seller with ID {seller_id} has been successfully deleted."}
         except Seller.DoesNotExist:
@@ -293,13 +448,12 @@ def deactivate_seller_helper(user, seller_id=None):
 
     # Seller: Deactivate their own profile
     if user_type == "seller":
-        try:
-            seller = Seller.objects.get(user=user)  # Assuming `Seller` links to `User`
-            seller.is_active = False
-            seller.save()
-            return {"message": "Your profile has been successfully deactivated."}
-        except Seller.DoesNotExist:
+        seller = get_user_seller(user)
+        if seller is None:
             raise NotFound("Seller profile not found for the authenticated user.")
+        seller.is_active = False
+        seller.save()
+        return {"message": "Your profile has been successfully deactivated."}
 
     # Admin: Deactivate a specific seller profile
     elif user_type == "admin":
@@ -307,7 +461,7 @@ def deactivate_seller_helper(user, seller_id=None):
             raise ValidationError("Seller ID is required for admin deactivation.")
 
         try:
-            seller = Seller.objects.get(id=seller_id)
+            seller = Seller.objects.get(seller_id=seller_id)
             seller.is_active = False
             seller.save()
             return {"message": f"Seller with ID {seller_id} has been successfully deactivated."}
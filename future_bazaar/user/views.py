@@ -1,25 +1,33 @@
 # Standard Library
+import json
 import logging
+import math
 
 # Django Modules
+from django.conf import settings
 from django.db import IntegrityError
+from django.http import JsonResponse, StreamingHttpResponse
 
 # DRF Modules
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework import status, serializers
 from rest_framework.request import Request
 from rest_framework.exceptions import ValidationError, AuthenticationFailed, PermissionDenied, NotFound
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from drf_yasg import openapi
 
 # DRF Extensions
 from drf_yasg.utils import swagger_auto_schema
 
 # Local Modules
-from .models import UserModel
-from .serializers import UserSerializer, UserLoginRequestSerializer,  LogoutSerializer, SellerSerializer, CustomPagination
-from .utils.user_utils import user_sign_up, authenticate_user, deactivate_user_account, update_user_details, create_seller_profile, blacklist_tokens, get_seller_profile_and_update, get_nearby_sellers, delete_seller_helper, deactivate_seller_helper
+from .models import UserModel, Seller
+from .serializers import UserSerializer, UserLoginRequestSerializer,  LogoutSerializer, SellerSerializer, NearbySellerCursorPagination
+from .utils.nearby_cache import get_nearby_cache_stats
+from .utils.password_utils import LoginBusy
+from .utils.user_import import UserImport, detect_import_format, read_import_rows
+from .utils.rate_limit import LoginIpRateLimit, LoginIdentifierRateLimit, SignupIpRateLimit, NearbySearchIpRateLimit, get_request_ip, identifier_key, rate_limit_wait
+from .utils.user_utils import user_sign_up, authenticate_user, aauthenticate_user, deactivate_user_account, update_user_details, create_seller_profile, blacklist_tokens, get_seller_profile_and_update, get_nearby_sellers, delete_seller_helper, deactivate_seller_helper, NEARBY_SELLERS_RADIUS_KM
 
 # Set up logging for exception handling
 logger = logging.getLogger(__name__)
@@ -44,6 +52,7 @@ def private_api(request):
     responses={201: "User Created", 400: "Invalid Input", 500: "Internal Server Error"}
 )
 @api_view(['POST'])
+@throttle_classes([SignupIpRateLimit])
 def user_signup(request: Request) -> Response:
     """Handles the POST request for user signup."""
     try:  
@@ -78,6 +87,7 @@ def user_signup(request: Request) -> Response:
 )
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginIpRateLimit, LoginIdentifierRateLimit])
 def login_user(request: Request) -> Response:
     """
     Handles user login using either email or contact_number and returns JWT tokens.
@@ -97,11 +107,60 @@ def login_user(request: Request) -> Response:
         }, status=status.HTTP_200_OK)
     except AuthenticationFailed as e:
         return Response({'error': str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+    except LoginBusy as e:
+        return Response({'error': str(e.detail)}, status=e.status_code, headers={'Retry-After': str(e.retry_after)})
     except Exception as e:
         logging.error(f"Unexpected error in login: {str(e)}")
         return Response({'error': 'An unexpected error occurred.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+async def login_user_async(request) -> JsonResponse:
+    """
+    Async variant of login_user for the ASGI app: the event loop keeps
+    serving other requests while the password is being hashed.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'Request body must be JSON.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Same limits as the throttles of login_user
+    identifier = identifier_key(data.get('identifier') if isinstance(data, dict) else None)
+    for scope, ident in ((LoginIpRateLimit.scope, get_request_ip(request)), (LoginIdentifierRateLimit.scope, identifier)):
+        wait = rate_limit_wait(scope, ident) if ident else None
+        if wait is not None:
+            break
+    if wait is not None:
+        response = JsonResponse({'error': 'Request was throttled.'}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        response['Retry-After'] = str(max(math.ceil(wait), 1))
+        return response
+
+    serializer = UserLoginRequestSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        user_data = await aauthenticate_user(
+            serializer.validated_data.get('identifier'), serializer.validated_data.get('password'),
+        )
+        return JsonResponse({"message": "Login successful", **user_data}, status=status.HTTP_200_OK)
+    except AuthenticationFailed as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+    except LoginBusy as e:
+        response = JsonResponse({'error': str(e.detail)}, status=e.status_code)
+        response['Retry-After'] = str(e.retry_after)
+        return response
+    except Exception as e:
+        logging.error(f"Unexpected error in login: {str(e)}")
+        return JsonResponse({'error': 'An unexpected error occurred.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# Token API like the DRF views; csrf_exempt() itself only wraps sync views in Django 4.2
+login_user_async.csrf_exempt = True
+
+
 
 @swagger_auto_schema(
     method='put',
@@ -235,10 +294,25 @@ def update_seller(request):
             required=True,
         ),
         openapi.Parameter(
-            "page",
+            "radius_km",
             openapi.IN_QUERY,
-            description="Page number for pagination (default is 1).",
-            type=openapi.TYPE_INTEGER,
+            description=f"Search radius in km (default is {NEARBY_SELLERS_RADIUS_KM}).",
+            type=openapi.TYPE_NUMBER,
+            required=False,
+        ),
+        openapi.Parameter(
+            "category",
+            openapi.IN_QUERY,
+            description="Only return sellers of this category.",
+            type=openapi.TYPE_STRING,
+            enum=[choice for choice, _ in Seller.CATEGORY],
+            required=False,
+        ),
+        openapi.Parameter(
+            "cursor",
+            openapi.IN_QUERY,
+            description="Opaque cursor taken from the `next` link of the previous page.",
+            type=openapi.TYPE_STRING,
             required=False,
         ),
         openapi.Parameter(
@@ -253,33 +327,42 @@ def update_seller(request):
 )
 @api_view(["GET"])
 # @permission_classes([IsAuthenticated])
+@throttle_classes([NearbySearchIpRateLimit])
 def fetch_nearby_sellers(request):
     try:
-        # Extract latitude and longitude from query parameters
+        # Extract latitude, longitude and search radius from query parameters
         user_lat = float(request.query_params.get("latitude"))
         user_lng = float(request.query_params.get("longitude"))
-        page = int(request.query_params.get("page", 1))  # Default to page 1
-        page_size = int(request.query_params.get("page_size", 10))  # Default to 10
-
-        # Call the helper function to fetch nearby sellers
-        nearby_sellers = get_nearby_sellers(user_lat, user_lng)
-
-        # Paginate the results
-        paginator = CustomPagination()
-        paginator.page_size = page_size  # Set custom page size
-        paginated_sellers = paginator.paginate_queryset(nearby_sellers, request)
+        radius_km = float(request.query_params.get("radius_km", NEARBY_SELLERS_RADIUS_KM))
+        if not (-90 <= user_lat <= 90 and -180 <= user_lng <= 180):
+            raise ValueError("Latitude or longitude out of range.")
+        max_radius_km = getattr(settings, "NEARBY_SELLERS_MAX_RADIUS_KM", 100)
+        if not 0 < radius_km <= max_radius_km:
+            raise ValueError(f"radius_km must be between 0 and {max_radius_km}.")
+        category = request.query_params.get("category") or None
+        if category is not None and category not in dict(Seller.CATEGORY):
+            raise ValueError(f"Unknown seller category '{category}'.")
+
+        paginator = NearbySellerCursorPagination()
+        page_size = paginator.get_page_size(request)
+        after = paginator.decode_cursor(request)
+
+        # Only the sellers needed for this page are ranked and loaded
+        nearby_sellers, next_position = get_nearby_sellers(
+            user_lat, user_lng, radius_km, limit=page_size, after=after, category=category
+        )
 
-        # Prepare paginated response data
         seller_data = [
-            {"seller": SellerSerializer(seller[0]).data, "distance_km": seller[1]}
-            for seller in paginated_sellers
+            {"seller": SellerSerializer(seller).data, "distance_km": distance_km}
+            for seller, distance_km in nearby_sellers
         ]
 
-        # Return paginated response
         return paginator.get_paginated_response(
-            {"message": "Nearby sellers fetched successfully", "data": seller_data}
+            request,
+            {"message": "Nearby sellers fetched successfully", "data": seller_data},
+            next_position,
         )
-    except ValueError as e:
+    except (TypeError, ValueError) as e:
         return Response(
             {"error": "Invalid input in query parameters", "details": str(e)}, status=400
         )
@@ -290,6 +373,59 @@ def fetch_nearby_sellers(request):
     
 
 
+@swagger_auto_schema(
+    method="get",
+    responses={200: "Nearby sellers cache counters.", 403: "Admin access required."},
+)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def nearby_sellers_cache_stats(request):
+    """
+    Returns the hit/miss counters of the nearby sellers result cache.
+    """
+    return Response(get_nearby_cache_stats(), status=status.HTTP_200_OK)
+
+
+@swagger_auto_schema(
+    method="post",
+    manual_parameters=[
+        openapi.Parameter(
+            "file",
+            openapi.IN_FORM,
+            description="CSV (with a header row) or JSON Lines file of users: first_name, last_name, email, "
+                        "contact_number and password or password_hash.",
+            type=openapi.TYPE_FILE,
+            required=True,
+        ),
+    ],
+    responses={
+        200: "JSON Lines report: one line per rejected row, then a summary line.",
+        400: "No file uploaded.",
+        403: "Admin access required.",
+    },
+)
+@api_view(["POST"])
+@permission_classes([IsAdminUser])
+def import_users(request):
+    """
+    Bulk-creates end users from an uploaded file. The report is streamed as
+    the import progresses, so large files do not hit idle timeouts.
+    """
+    upload = request.FILES.get("file")
+    if upload is None:
+        return Response({"error": "Upload the users in the 'file' field."}, status=status.HTTP_400_BAD_REQUEST)
+
+    importer = UserImport(batch_size=getattr(settings, "USER_IMPORT_BATCH_SIZE", 500))
+    rows = read_import_rows(upload, detect_import_format(upload.name))
+
+    def report():
+        for rejected in importer.run(rows):
+            yield json.dumps(rejected) + "\n"
+        yield json.dumps({"summary": importer.summary()}) + "\n"
+
+    return StreamingHttpResponse(report(), content_type="application/x-ndjson")
+
+
 @swagger_auto_schema(
     method="delete",
     request_body=openapi.Schema(